@@ -1,22 +1,18 @@
-import os, math, pandas as pd
-import psycopg2, psycopg2.extras
+import math, pandas as pd
+import psycopg2.extras
 import plotly.graph_objects as go
 import dash
 from dash import dcc, html, Input, Output, State, callback_context, dash_table
 import dash_bootstrap_components as dbc
 from dotenv import load_dotenv
+from app.core.db import db_pool
 load_dotenv()
 
-DB_URL = os.getenv("DATABASE_URL","")
-if DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://","postgresql://",1)
-
+# Callbacks run ~15 queries each; they share the process-wide pool instead of a connection per query
 def fetch(sql, params=None):
     try:
-        conn = psycopg2.connect(DB_URL, connect_timeout=10)
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params or ()); rows=[dict(r) for r in cur.fetchall()]
-        conn.close(); return rows
+        with db_pool.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(sql, params or ()); return [dict(r) for r in cur.fetchall()]
     except Exception as e: print(f"[DB] {e}"); return []
 
 def fetch_one(sql, params=None):
@@ -792,5 +788,6 @@ def update_all(state,blocks_data,tab):
         make_table(tab, state),
     )
 
+# Run from the repo root so the shared app.core.db pool imports: python -m app.api.dashboard
 if __name__=="__main__":
     app.run(debug=True,port=8050,host="0.0.0.0")
\ No newline at end of file
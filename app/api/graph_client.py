@@ -0,0 +1,198 @@
+# app/api/graph_client.py
+
+import os
+import random
+import asyncio
+import logging
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Point this at a local mock (scripts/mock_graph_server.py) for tests and benchmarks
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.facebook.com/v21.0").rstrip("/")
+WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Safe to repeat after a timeout or 5xx; a repeated POST /messages is a duplicate WhatsApp message
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Raised before the request left this host, so even a POST can be retried
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (optional: pip install httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+
+class GraphClient:
+    """
+    One long-lived httpx.AsyncClient for every call to the Meta Graph API.
+    Keeps TCP+TLS connections alive between replies and media fetches,
+    and retries 429 (plus 5xx and transport errors on idempotent requests)
+    with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str = GRAPH_API_BASE,
+        token: str = WHATSAPP_TOKEN,
+        max_connections: int = int(os.getenv("GRAPH_MAX_CONNECTIONS", "20")),
+        max_keepalive: int = int(os.getenv("GRAPH_MAX_KEEPALIVE", "10")),
+        keepalive_expiry: float = float(os.getenv("GRAPH_KEEPALIVE_EXPIRY", "60")),
+        http2: bool = os.getenv("GRAPH_HTTP2", "0") == "1",
+        max_retries: int = int(os.getenv("GRAPH_MAX_RETRIES", "3")),
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Short connect timeout, generous read timeout for media downloads
+        self.timeout = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0)
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("⚠️ GRAPH_HTTP2=1 but the 'h2' package is missing. Using HTTP/1.1.")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self._client = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    # --- LIFECYCLE ---
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._build()
+            logger.info(f"📡 Graph client ready (HTTP/2: {self.http2}, pool: {self.limits.max_connections})")
+        return self
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # Lazy start for scripts that run outside the app lifespan
+            self._client = self._build()
+        return self._client
+
+    # --- REQUESTS ---
+
+    def _backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when Meta sends it."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _retryable(self, method: str, response: httpx.Response = None, error: Exception = None) -> bool:
+        """
+        A POST may already have been accepted after a read timeout or a 5xx, so
+        it is retried only if it never went out, or on 429 (Meta refused it).
+        """
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if error is not None:
+            return idempotent or isinstance(error, UNSENT_ERRORS)
+        return response.status_code == 429 or (idempotent and response.status_code in RETRYABLE_STATUS)
+
+    async def request(self, method: str, url: str, max_retries: int = None, **kwargs) -> httpx.Response:
+        """
+        Sends a request, retrying what _retryable() allows.
+        Pass max_retries=0 when the caller runs its own retry policy.
+        """
+        if not url.startswith("http"):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        if max_retries is None:
+            max_retries = self.max_retries
+
+        attempt = 0
+        while True:
+            self.requests += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                response, error = None, e
+            else:
+                error = None
+            finally:
+                self._in_flight -= 1
+
+            if error is None and response.status_code not in RETRYABLE_STATUS:
+                return response
+
+            if attempt >= max_retries or not self._retryable(method, response, error):
+                self.failures += 1
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            reason = error or f"HTTP {response.status_code}"
+            logger.warning(f"🔁 Graph API {method} retry {attempt + 1}/{max_retries} in {delay:.2f}s ({reason})")
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def post_json(self, path: str, payload: dict, max_retries: int = None) -> httpx.Response:
+        return await self.request("POST", path, max_retries=max_retries, json=payload)
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    # --- OBSERVABILITY ---
+
+    def stats(self) -> dict:
+        pool = {"open": 0, "idle": 0, "active": 0}
+        try:
+            # httpcore internals: best effort, the counters below don't depend on it
+            for conn in self._client._transport._pool.connections:
+                pool["open"] += 1
+                if conn.is_idle():
+                    pool["idle"] += 1
+                else:
+                    pool["active"] += 1
+        except AttributeError:
+            pass
+
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "pool_utilisation": round(self._in_flight / self.limits.max_connections, 3),
+            "connections": pool,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+# Process-wide instance, started and closed by the FastAPI lifespan in main.py
+graph_client = GraphClient()
@@ -0,0 +1,339 @@
+# app/api/outbound.py
+
+import os
+import time
+import random
+import asyncio
+import logging
+import itertools
+from collections import OrderedDict
+import httpx
+from app.api.graph_client import graph_client, UNSENT_ERRORS
+from app.utils.scheduler import TimingStats
+from app.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+
+# --- PRIORITY LANES (lower number is sent first) ---
+PRIORITY_SAFETY = 0   # Safety-report confirmations
+PRIORITY_REPLY = 1    # Normal advice / job replies
+PRIORITY_MENU = 2     # District / Block / Village menus
+
+# Meta error codes that tell us which limit we hit
+PAIR_RATE_LIMIT_CODE = 131056      # Too many messages to one recipient
+THROUGHPUT_LIMIT_CODES = {130429, 80007, 4}
+RATE_LIMIT_CODES = THROUGHPUT_LIMIT_CODES | {PAIR_RATE_LIMIT_CODE}
+
+
+class TokenBucket:
+    """
+    Reservation-style token bucket. Callers always take a token and get back
+    how long to wait for it, so concurrent waiters queue fairly.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def wait_time(self) -> float:
+        """Seconds until a token is free, without taking one."""
+        self._refill(time.monotonic())
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def penalize(self, seconds: float):
+        """Pushes the bucket into debt after Meta tells us we are over the limit."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class OutboundDispatcher:
+    """
+    Asyncio send queue in front of the Graph API.
+    - Token buckets per PHONE_NUMBER_ID (Meta throughput tier) and per recipient (pair rate limit).
+    - Priority lanes so safety confirmations overtake menus during a burst.
+    - Bounded buffer: send() fails fast instead of queueing without limit. Every
+      undelivered message holds a slot, including those waiting out a rate limit
+      or retry backoff outside the queue.
+    - Delivery retries with jittered backoff, but only when a retry can't duplicate
+      the message: on 429 / rate-limit codes, or when the request never went out.
+    """
+
+    def __init__(
+        self,
+        phone_rate: float = float(os.getenv("OUTBOUND_PHONE_RATE", "50")),
+        phone_burst: float = float(os.getenv("OUTBOUND_PHONE_BURST", "50")),
+        recipient_rate: float = float(os.getenv("OUTBOUND_RECIPIENT_RATE", "1")),
+        recipient_burst: float = float(os.getenv("OUTBOUND_RECIPIENT_BURST", "5")),
+        max_buffer: int = int(os.getenv("OUTBOUND_MAX_BUFFER", "1000")),
+        workers: int = int(os.getenv("OUTBOUND_WORKERS", "8")),
+        max_attempts: int = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "4")),
+        enqueue_timeout: float = 5.0,
+        max_recipient_buckets: int = 10000,
+        client=graph_client,
+    ):
+        self.phone_rate, self.phone_burst = phone_rate, phone_burst
+        self.recipient_rate, self.recipient_burst = recipient_rate, recipient_burst
+        self.max_buffer = max_buffer
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.enqueue_timeout = enqueue_timeout
+        self.max_recipient_buckets = max_recipient_buckets
+        self.client = client
+
+        self._queue = None
+        self._slots = None
+        self._tasks = []
+        self._seq = itertools.count()
+        self._phone_buckets = {}
+        self._recipient_buckets = OrderedDict()
+        self._deferred = {}       # key -> (TimerHandle, job) for jobs waiting outside the queue
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.pending = 0
+        self.rate_limited = 0
+        self.latency = TimingStats()
+
+    # --- LIFECYCLE ---
+
+    async def start(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue(maxsize=self.max_buffer)
+            self._slots = asyncio.Semaphore(self.max_buffer)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            logger.info(f"📬 Outbound dispatcher ready ({self.workers} workers, {self.phone_rate}/s per number)")
+        return self
+
+    async def stop(self, timeout: float = 10.0):
+        if self._queue is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Deferred jobs (rate-limit waits, retry backoff) come back through the queue
+        while loop.time() < deadline:
+            try:
+                await asyncio.wait_for(self._queue.join(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if not self._deferred:
+                break
+            await asyncio.sleep(0.05)
+
+        pending = self._queue.qsize() + len(self._deferred)
+        if pending:
+            logger.warning(f"⚠️ Outbound dispatcher stopped with {pending} sends pending")
+        for handle, job in self._deferred.values():
+            handle.cancel()
+            self._finish(job, None)
+        self._deferred.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            self._finish(job, None)
+        self._queue, self._slots, self._tasks = None, None, []
+
+    # --- BUCKETS ---
+
+    def _phone_bucket(self, phone_number_id: str) -> TokenBucket:
+        if phone_number_id not in self._phone_buckets:
+            self._phone_buckets[phone_number_id] = TokenBucket(self.phone_rate, self.phone_burst)
+        return self._phone_buckets[phone_number_id]
+
+    def _recipient_bucket(self, to: str) -> TokenBucket:
+        bucket = self._recipient_buckets.get(to)
+        if bucket is None:
+            bucket = TokenBucket(self.recipient_rate, self.recipient_burst)
+            self._recipient_buckets[to] = bucket
+            if len(self._recipient_buckets) > self.max_recipient_buckets:
+                self._evict_recipient_bucket()
+        else:
+            self._recipient_buckets.move_to_end(to)
+        return bucket
+
+    def _evict_recipient_bucket(self, scan: int = 32):
+        """
+        Drops the least recently used full bucket (a full bucket carries no state)
+        among the oldest few, or the oldest one outright, so the map stays bounded.
+        """
+        victim = next(iter(self._recipient_buckets))
+        for to, bucket in itertools.islice(self._recipient_buckets.items(), scan):
+            if bucket.is_full():
+                victim = to
+                break
+        self._recipient_buckets.pop(victim)
+
+    # --- PUBLIC API ---
+
+    async def send(self, to: str, payload: dict, priority: int = PRIORITY_REPLY,
+                   phone_number_id: str = None):
+        """
+        Queues a message and waits for the delivery outcome.
+        Returns the Graph API JSON response, or None if the send failed or the buffer was full.
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        job = {
+            "to": to,
+            "payload": payload,
+            "phone_number_id": phone_number_id or PHONE_NUMBER_ID,
+            "priority": priority,
+            "attempt": 0,
+            "enqueued_at": time.perf_counter(),
+            "future": future,
+        }
+        # Queue wait, rate-limit pauses and retries all count towards the send span
+        with span("http", "graph_api.send", priority=priority) as s:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                s.error = "buffer_full"
+                logger.error(f"❌ Outbound buffer full ({self.max_buffer}). Dropping message to {to}.")
+                return None
+            # Held until _finish, so deferred jobs count towards the buffer too and
+            # the queue itself can never be full when one comes back
+            job["slots"] = self._slots
+            self.pending += 1
+            self._queue.put_nowait((priority, next(self._seq), job))
+            result = await future
+            if result is None:
+                s.error = "send_failed"
+            return result
+
+    # --- WORKERS ---
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            except Exception as e:
+                logger.error(f"❌ Outbound worker error: {e}", exc_info=True)
+                self._finish(job, None)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: dict):
+        phone_bucket = self._phone_bucket(job["phone_number_id"])
+        recipient_bucket = self._recipient_bucket(job["to"])
+        # Park a job that has to wait outside the queue instead of sleeping in a worker,
+        # so one chatty recipient can't hold every worker; no token is spent until both are free
+        wait = max(recipient_bucket.wait_time(), phone_bucket.wait_time())
+        if wait > 0:
+            self._defer(job, wait)
+            return
+        recipient_bucket.reserve()
+        phone_bucket.reserve()
+
+        unsent = False
+        try:
+            response = await self.client.post_json(
+                f"{job['phone_number_id']}/messages", job["payload"], max_retries=0
+            )
+            status = response.status_code
+        except UNSENT_ERRORS as e:
+            response, status, unsent = None, None, True
+            logger.warning(f"⚠️ Outbound send to {job['to']} never left this host: {e}")
+        except httpx.TransportError as e:
+            # The body may have reached Meta; resending could deliver it twice
+            self.failed += 1
+            logger.error(f"❌ Outbound send to {job['to']} failed after sending, not retried: {e!r}")
+            self._finish(job, None)
+            return
+
+        if status is not None and status < 400:
+            self.sent += 1
+            self._finish(job, response.json())
+            return
+
+        error_code = self._error_code(response) if response is not None else None
+        rate_limited = status == 429 or error_code in RATE_LIMIT_CODES
+        if rate_limited:
+            self.rate_limited += 1
+            # Back the offending bucket off so the other workers slow down too
+            bucket = recipient_bucket if error_code == PAIR_RATE_LIMIT_CODE else phone_bucket
+            bucket.penalize(1.0)
+
+        # A 5xx after the request was sent may still have been delivered, so it is not retried
+        retryable = unsent or rate_limited
+        if retryable and job["attempt"] + 1 < self.max_attempts:
+            job["attempt"] += 1
+            self.retried += 1
+            self._defer(job, random.uniform(0.5, 1.0) * min(8.0, 2 ** job["attempt"]))
+            return
+
+        self.failed += 1
+        logger.error(f"❌ Outbound send to {job['to']} failed (HTTP {status}, code {error_code})")
+        self._finish(job, None)
+
+    def _defer(self, job: dict, delay: float):
+        key = next(self._seq)
+        handle = asyncio.get_running_loop().call_later(delay, self._requeue, job, key)
+        self._deferred[key] = (handle, job)
+
+    def _requeue(self, job: dict, key: int):
+        self._deferred.pop(key, None)
+        if self._queue is None:
+            self.failed += 1
+            self._finish(job, None)
+            return
+        self._queue.put_nowait((job["priority"], next(self._seq), job))
+
+    def _finish(self, job: dict, result):
+        if not job["future"].done():
+            job["future"].set_result(result)
+        slots = job.pop("slots", None)
+        if slots is not None:
+            slots.release()
+            self.pending -= 1
+            self.latency.add(time.perf_counter() - job["enqueued_at"])
+
+    @staticmethod
+    def _error_code(response: httpx.Response):
+        try:
+            return response.json().get("error", {}).get("code")
+        except Exception:
+            return None
+
+    # --- OBSERVABILITY ---
+
+    def stats(self) -> dict:
+        return {
+            "buffered": self._queue.qsize() if self._queue else 0,
+            "pending": self.pending,
+            "max_buffer": self.max_buffer,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "deferred": len(self._deferred),
+            "recipient_buckets": len(self._recipient_buckets),
+            "delivery_latency": self.latency.snapshot(),
+        }
+
+
+# Process-wide instance, started and stopped by the FastAPI lifespan in main.py
+outbound = OutboundDispatcher()
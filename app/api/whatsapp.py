@@ -1,142 +1,211 @@
 # app/api/whatsapp.py
 
 import os
-import httpx
-import uuid
+import hashlib
 import logging
+import tempfile
 from fastapi import Request
-from app.core.whisper import transcribe_audio
+from app.core.whisper import atranscribe_voice_note, TranscriptionError
+from app.core.transcript_cache import transcript_cache, ogg_duration_seconds
+from app.api.graph_client import graph_client
+from app.api.outbound import outbound, PRIORITY_REPLY, PRIORITY_MENU
 
 logger = logging.getLogger(__name__)
 
 # Constants - Ensure these are in your .env
-WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN")
 PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
 
+# WhatsApp caps audio at 16 MB; voice notes are usually far below the spill threshold
+MAX_MEDIA_BYTES = int(os.getenv("MAX_MEDIA_BYTES", str(16 * 1024 * 1024)))
+MEDIA_SPILL_BYTES = int(os.getenv("MEDIA_SPILL_BYTES", str(2 * 1024 * 1024)))
+
 async def download_whatsapp_media(media_id: str):
     """
-    Downloads media from Meta Graph API (v21.0) and saves it locally.
-    Used for processing audio messages via Whisper.
+    Streams media from Meta Graph API (v21.0) into a size-capped buffer.
+    The buffer stays in memory and only spills to disk above MEDIA_SPILL_BYTES.
+    Returns (buffer, mime_type, sha256_hex), or None if the media is missing or too large.
     """
-    headers = {"Authorization": f"Bearer {WHATSAPP_TOKEN}"}
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            # Step 1: Get the media URL
-            url_res = await client.get(
-                f"https://graph.facebook.com/v21.0/{media_id}", 
-                headers=headers
-            )
-            media_url = url_res.json().get("url")
-            
-            if not media_url:
-                logger.error(f"❌ Failed to get media URL for ID: {media_id}")
-                return None
-
-            # Step 2: Download the binary file
-            media_res = await client.get(media_url, headers=headers)
-            temp_filename = f"temp_audio_{uuid.uuid4()}.ogg"
-            
-            with open(temp_filename, "wb") as f:
-                f.write(media_res.content)
-            
-            return temp_filename
-        except Exception as e:
-            logger.error(f"❌ Media Download Error: {e}")
+    try:
+        # Step 1: Get the media URL
+        url_res = await graph_client.get(media_id)
+        meta = url_res.json()
+        media_url = meta.get("url")
+
+        if not media_url:
+            logger.error(f"❌ Failed to get media URL for ID: {media_id}")
+            return None
+        if (meta.get("file_size") or 0) > MAX_MEDIA_BYTES:
+            logger.error(f"❌ Media {media_id} is {meta['file_size']} bytes, above the {MAX_MEDIA_BYTES} cap")
             return None
 
-async def handle_whatsapp_message(request: Request):
+        # Step 2: Stream the binary (same pooled client, auth header included)
+        buffer = tempfile.SpooledTemporaryFile(max_size=MEDIA_SPILL_BYTES)
+        digest = hashlib.sha256()
+        size = 0
+        async with graph_client.client.stream("GET", media_url) as media_res:
+            media_res.raise_for_status()
+            async for chunk in media_res.aiter_bytes():
+                size += len(chunk)
+                if size > MAX_MEDIA_BYTES:
+                    buffer.close()
+                    logger.error(f"❌ Media {media_id} exceeded the {MAX_MEDIA_BYTES} byte cap mid-stream")
+                    return None
+                buffer.write(chunk)
+                digest.update(chunk)
+
+        buffer.seek(0)
+        return buffer, meta.get("mime_type", "audio/ogg").split(";")[0], digest.hexdigest()
+    except Exception as e:
+        logger.error(f"❌ Media Download Error: {e}")
+        return None
+
+def normalize_message(message: dict):
     """
-    Parses incoming Meta Webhook JSON. 
+    Converts one Meta message object into the event dict the swarm expects.
     Supports: Text, Location pins, Audio (Voice notes), and Interactive List selection.
+    Audio events carry a 'media_id'; the background worker transcribes them.
+    """
+    user_phone = message.get('from')
+    msg_id = message.get('id')
+    msg_type = message.get('type')
+
+    # --- 1. INTERACTIVE LIST REPLY (Dropdowns) ---
+    if msg_type == 'interactive':
+        interactive_res = message.get('interactive', {})
+        if interactive_res.get('type') == 'list_reply':
+            # The row 'id' is the canonical path (e.g. 'BLOCK|NADIA|RANAGHAT') and is
+            # resolved without an LLM; the 'title' may be translated and is kept for history
+            reply = interactive_res['list_reply']
+            return {"id": msg_id, "sender": user_phone, "type": msg_type,
+                    "content": reply.get('title'), "selection": reply.get('id')}
+
+    # --- 2. TEXT MESSAGES ---
+    elif msg_type == 'text':
+        user_input = message['text'].get('body')
+        return {"id": msg_id, "sender": user_phone, "type": msg_type, "content": user_input}
+
+    # --- 3. LOCATION PINS (GPS) ---
+    elif msg_type == 'location':
+        loc = message['location']
+        lat, lon = loc.get('latitude'), loc.get('longitude')
+        # Format as text so Memory Node can extract coordinates
+        user_input = f"Lat: {lat}, Lon: {lon}"
+        return {"id": msg_id, "sender": user_phone, "type": msg_type, "content": user_input}
+
+    # --- 4. AUDIO / VOICE NOTES ---
+    elif msg_type == 'audio':
+        media_id = message['audio'].get('id')
+        return {"id": msg_id, "sender": user_phone, "type": msg_type, "content": None, "media_id": media_id}
+
+    return None
+
+def _dicts(container: dict, key: str) -> list:
+    """The dict elements of container[key]; anything else is logged and skipped."""
+    items = container.get(key) or []
+    if not isinstance(items, list):
+        items = [items]
+    for item in items:
+        if not isinstance(item, dict):
+            logger.error(f"❌ Skipping malformed webhook {key} element: {item!r:.80}")
+    return [item for item in items if isinstance(item, dict)]
+
+def iter_webhook_messages(data: dict):
+    """
+    Yields every supported message in a webhook payload.
+    Meta batches several messages (across entries and changes) into one POST under load.
+    """
+    for entry in _dicts(data, 'entry'):
+        for change in _dicts(entry, 'changes'):
+            value = change.get('value')
+            if not isinstance(value, dict):
+                continue
+            for message in value.get('messages') or []:
+                try:
+                    event = normalize_message(message)
+                except (KeyError, TypeError, AttributeError) as e:
+                    msg_id = message.get('id') if isinstance(message, dict) else None
+                    logger.error(f"❌ Skipping malformed message {msg_id}: {e}")
+                    continue
+                if event:
+                    yield event
+
+async def transcribe_voice_note(event: dict):
+    """
+    Downloads and transcribes an audio event in place (runs in the background worker,
+    never on the webhook ack path). Returns None if the media could not be downloaded.
+    """
+    media_id = event["media_id"]
+
+    # A media ID we've transcribed before needs no download at all
+    cached = await transcript_cache.lookup_media(media_id)
+    if cached is not None:
+        event["content"] = cached
+        return event
+
+    media = await download_whatsapp_media(media_id)
+    if not media:
+        return None
+    buffer, mime_type, audio_sha256 = media
+    try:
+        # Forwarded / re-sent recordings hit on the audio hash
+        cached = await transcript_cache.lookup_audio(audio_sha256, media_id)
+        if cached is not None:
+            event["content"] = cached
+            return event
+
+        # Transcribe the worker's voice note to text. An empty transcript still
+        # reaches the supervisor so it knows the audio was unreadable; a partial
+        # one is answered but never cached, so a re-send gets another try.
+        audio = buffer.read()
+        try:
+            event["content"] = await atranscribe_voice_note(audio, mime_type=mime_type)
+        except TranscriptionError as e:
+            logger.error(f"❌ Voice note {media_id} only partly transcribed: {e}")
+            event["content"] = e.partial
+            return event
+        if event["content"]:
+            seconds = ogg_duration_seconds(audio[-65536:], len(audio))
+            await transcript_cache.store_transcript(audio_sha256, event["content"], seconds, media_id)
+        return event
+    finally:
+        buffer.close()
+
+async def handle_whatsapp_message(request: Request) -> list:
+    """
+    Parses incoming Meta Webhook JSON into a list of normalized message events,
+    one per message in the batch. Nothing here waits on media or transcription.
     """
     try:
         data = await request.json()
-        entry = data.get('entry', [{}])[0]
-        changes = entry.get('changes', [{}])[0]
-        value = changes.get('value', {})
-        
-        if 'messages' in value:
-            message = value['messages'][0]
-            user_phone = message.get('from')
-            msg_id = message.get('id')
-            msg_type = message.get('type')
-
-            # --- 1. INTERACTIVE LIST REPLY (Dropdowns) ---
-            if msg_type == 'interactive':
-                interactive_res = message.get('interactive', {})
-                if interactive_res.get('type') == 'list_reply':
-                    # Extract the 'title' (e.g., 'NORTH 24 PARGANAS' or 'AMDANGA')
-                    # This is passed to the Swarm as user input
-                    selection = interactive_res['list_reply'].get('title')
-                    return {"id": msg_id, "sender": user_phone, "content": selection}
-
-            # --- 2. TEXT MESSAGES ---
-            elif msg_type == 'text':
-                user_input = message['text'].get('body')
-                return {"id": msg_id, "sender": user_phone, "content": user_input}
-            
-            # --- 3. LOCATION PINS (GPS) ---
-            elif msg_type == 'location':
-                loc = message['location']
-                lat, lon = loc.get('latitude'), loc.get('longitude')
-                # Format as text so Memory Node can extract coordinates
-                user_input = f"Lat: {lat}, Lon: {lon}"
-                return {"id": msg_id, "sender": user_phone, "content": user_input}
-            
-            # --- 4. AUDIO / VOICE NOTES ---
-            elif msg_type == 'audio':
-                media_id = message['audio'].get('id')
-                file_path = await download_whatsapp_media(media_id)
-                if file_path:
-                    try:
-                        # Transcribe the worker's voice note to text
-                        transcribed_text = transcribe_audio(file_path)
-                        return {"id": msg_id, "sender": user_phone, "content": transcribed_text}
-                    finally:
-                        # Cleanup temp file
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                            
+        return list(iter_webhook_messages(data))
     except Exception as e:
         logger.error(f"❌ Webhook Parsing Error: {e}")
-    
-    return None
+        return []
 
-async def send_whatsapp_message(to: str, text: str):
+async def send_whatsapp_message(to: str, text: str, priority: int = PRIORITY_REPLY):
     """
     Sends a standard text message back to the user.
+    Goes through the rate-limited outbound dispatcher; returns None if delivery failed.
     """
-    url = f"https://graph.facebook.com/v21.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}", 
-        "Content-Type": "application/json"
-    }
     payload = {
         "messaging_product": "whatsapp",
         "to": to,
         "type": "text",
         "text": {"body": text}
     }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload)
-            return response.json()
-        except Exception as e:
-            logger.error(f"❌ Failed to send WhatsApp text: {e}")
-            return None
 
-async def send_whatsapp_list(to: str, body_text: str, button_label: str, sections: list):
+    try:
+        return await outbound.send(to, payload, priority=priority, phone_number_id=PHONE_NUMBER_ID)
+    except Exception as e:
+        logger.error(f"❌ Failed to send WhatsApp text: {e}")
+        return None
+
+async def send_whatsapp_list(to: str, body_text: str, button_label: str, sections: list,
+                             priority: int = PRIORITY_MENU):
     """
     Sends an interactive List Message (Dropdown menu).
     Used for District, Block, and Village selection.
     """
-    url = f"https://graph.facebook.com/v21.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}", 
-        "Content-Type": "application/json"
-    }
     payload = {
         "messaging_product": "whatsapp",
         "to": to,
@@ -151,11 +220,11 @@ async def send_whatsapp_list(to: str, body_text: str, button_label: str, section
         }
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload)
+    try:
+        result = await outbound.send(to, payload, priority=priority, phone_number_id=PHONE_NUMBER_ID)
+        if result:
             logger.info(f"📡 Interactive List Sent to {to}")
-            return response.json()
-        except Exception as e:
-            logger.error(f"❌ Failed to send WhatsApp list: {e}")
-            return None
\ No newline at end of file
+        return result
+    except Exception as e:
+        logger.error(f"❌ Failed to send WhatsApp list: {e}")
+        return None
\ No newline at end of file
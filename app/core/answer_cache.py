@@ -0,0 +1,296 @@
+# app/core/answer_cache.py
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.core.stores import SQLiteStore, PostgresStore, select_store, backend_name
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 86400)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "20000"))
+DEFAULT_SQLITE_PATH = os.getenv("ANSWER_CACHE_PATH", ".cache/legal_answers.sqlite3")
+LRU_SIZE = int(os.getenv("ANSWER_CACHE_LRU_SIZE", "2000"))
+# How often a worker checks whether an ingest has bumped the corpus generation
+REFRESH_SECONDS = int(os.getenv("ANSWER_CACHE_REFRESH_SECONDS", "60"))
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+def query_key(query: str) -> str:
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+# --- 1. BACKENDS ---
+# One row per normalized query. Every row carries the corpus generation it was
+# answered against; ingesting new law documents bumps the generation, so older
+# answers stop matching everywhere at once. Matching is on the exact text only:
+# templated queries for other skills or districts differ by a word or two but
+# carry different minimum wages.
+
+class SQLiteAnswerStore(SQLiteStore):
+    PRUNE_EVERY = 200
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS legal_answer_cache (
+            query_key   TEXT PRIMARY KEY,
+            query_text  TEXT NOT NULL,
+            answer      TEXT NOT NULL,
+            generation  INTEGER NOT NULL,
+            created_at  REAL NOT NULL,
+            last_used   REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS legal_corpus_generation (
+            id          INTEGER PRIMARY KEY CHECK (id = 1),
+            generation  INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO legal_corpus_generation (id, generation) VALUES (1, 1);
+        CREATE INDEX IF NOT EXISTS idx_legal_answer_cache_last_used ON legal_answer_cache (last_used);
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        super().__init__(path)
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT generation FROM legal_corpus_generation WHERE id = 1;").fetchone()[0]
+
+    def bump_generation(self) -> int:
+        with self._lock:
+            self._conn.execute("UPDATE legal_corpus_generation SET generation = generation + 1 WHERE id = 1;")
+            self._conn.execute("DELETE FROM legal_answer_cache;")
+            return self._conn.execute("SELECT generation FROM legal_corpus_generation WHERE id = 1;").fetchone()[0]
+
+    def get(self, key: str, generation: int, now: float):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer FROM legal_answer_cache "
+                "WHERE query_key = ? AND generation = ? AND created_at >= ?;",
+                (key, generation, now - self.ttl_seconds),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE legal_answer_cache SET last_used = ? WHERE query_key = ?;", (now, key))
+            return row[0] if row else None
+
+    def put(self, key: str, query: str, answer: str, generation: int, now: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO legal_answer_cache "
+                "(query_key, query_text, answer, generation, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?);",
+                (key, query, answer, generation, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM legal_answer_cache WHERE created_at < ?;", (now - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM legal_answer_cache WHERE query_key IN (
+                SELECT query_key FROM legal_answer_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            );
+        """, (self.max_entries,))
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM legal_answer_cache;").fetchone()[0]
+
+
+class PostgresAnswerStore(PostgresStore):
+    """Shared store so an audit made on any host answers the same question everywhere."""
+    PRUNE_EVERY = 200
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS legal_answer_cache (
+            query_key   TEXT PRIMARY KEY,
+            query_text  TEXT NOT NULL,
+            answer      TEXT NOT NULL,
+            generation  INTEGER NOT NULL,
+            created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_used   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS legal_corpus_generation (
+            id          INTEGER PRIMARY KEY CHECK (id = 1),
+            generation  INTEGER NOT NULL
+        );
+        INSERT INTO legal_corpus_generation (id, generation) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
+        CREATE INDEX IF NOT EXISTS idx_legal_answer_cache_last_used ON legal_answer_cache (last_used);
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        super().__init__()
+
+    def generation(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT generation FROM legal_corpus_generation WHERE id = 1;")
+            return cur.fetchone()[0]
+
+    def bump_generation(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("UPDATE legal_corpus_generation SET generation = generation + 1 WHERE id = 1 RETURNING generation;")
+            generation = cur.fetchone()[0]
+            cur.execute("DELETE FROM legal_answer_cache;")
+            return generation
+
+    def get(self, key: str, generation: int, now: float):
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                UPDATE legal_answer_cache SET last_used = TO_TIMESTAMP(%s)
+                WHERE query_key = %s AND generation = %s AND created_at >= TO_TIMESTAMP(%s)
+                RETURNING answer;
+            """, (now, key, generation, now - self.ttl_seconds))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def put(self, key: str, query: str, answer: str, generation: int, now: float):
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                INSERT INTO legal_answer_cache
+                    (query_key, query_text, answer, generation, created_at, last_used)
+                VALUES (%s, %s, %s, %s, TO_TIMESTAMP(%s), TO_TIMESTAMP(%s))
+                ON CONFLICT (query_key) DO UPDATE SET
+                    query_text = EXCLUDED.query_text,
+                    answer = EXCLUDED.answer,
+                    generation = EXCLUDED.generation,
+                    created_at = EXCLUDED.created_at,
+                    last_used = EXCLUDED.last_used;
+            """, (key, query, answer, generation, now, now))
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                cur.execute("DELETE FROM legal_answer_cache WHERE created_at < TO_TIMESTAMP(%s);",
+                            (now - self.ttl_seconds,))
+                cur.execute("""
+                    DELETE FROM legal_answer_cache WHERE query_key IN (
+                        SELECT query_key FROM legal_answer_cache ORDER BY last_used DESC OFFSET %s
+                    );
+                """, (self.max_entries,))
+
+    def size(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM legal_answer_cache;")
+            return cur.fetchone()[0]
+
+# --- 2. THE CACHE ---
+
+class AnswerCache:
+    """
+    Exact-match cache in front of empower_search. The normalized query text is
+    looked up before any embedding is made, so a templated question that any
+    worker already asked skips the pgvector scan and the GPT-4o audit.
+    """
+
+    def __init__(self, store, lru_size: int = LRU_SIZE, refresh_seconds: int = REFRESH_SECONDS):
+        self.store = store
+        self.lru_size = lru_size
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._generation = None
+        self._refreshed_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self.store, method)(*args)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Answer Cache Error: {e}")
+            return None
+
+    def _refresh(self):
+        """Picks up a new corpus generation after an ingest on any worker."""
+        now = time.time()
+        if self._generation is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        generation = self._call("generation")
+        if generation is None:
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._lru.clear()
+            self._generation = generation
+            self._refreshed_at = now
+
+    def _remember(self, key: str, answer: str):
+        with self._lock:
+            self._lru[key] = answer
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, query: str):
+        """Cached answer for this exact (normalized) query, or None (a miss)."""
+        self._refresh()
+        if self._generation is None:
+            self.misses += 1
+            return None
+        key = query_key(query)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+        answer = self._call("get", key, self._generation, time.time())
+        if answer is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, answer)
+        return answer
+
+    def put(self, query: str, answer: str):
+        if self._generation is None:
+            return
+        key = query_key(query)
+        self._remember(key, answer)
+        self._call("put", key, query, answer, self._generation, time.time())
+
+    def invalidate(self) -> int:
+        """Drops every cached answer on every worker; call after new law documents are ingested."""
+        generation = self._call("bump_generation")
+        with self._lock:
+            self._lru.clear()
+            self._generation = generation
+            self._refreshed_at = time.time()
+        self.invalidations += 1
+        logger.info(f"🧹 Legal answer cache invalidated (generation {generation})")
+        return generation
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": backend_name(self.store),
+            "generation": self._generation,
+            "lru_entries": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def build_answer_cache(kind: str = None) -> AnswerCache:
+    """Creates the cache selected by ANSWER_CACHE_BACKEND (postgres or sqlite); the store opens on first use."""
+    kind = kind or os.getenv("ANSWER_CACHE_BACKEND", "postgres")
+    return AnswerCache(select_store("Answer cache", kind, PostgresAnswerStore, SQLiteAnswerStore))
+
+
+answer_cache = build_answer_cache()
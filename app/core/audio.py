@@ -0,0 +1,121 @@
+# app/core/audio.py
+
+import os
+import shutil
+import asyncio
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg is optional: without it voice notes are uploaded to Whisper unchanged
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+
+SAMPLE_RATE = 16000          # Whisper resamples to 16 kHz mono internally anyway
+FRAME_MS = 20
+SILENCE_DBFS = float(os.getenv("AUDIO_SILENCE_DBFS", "-40"))
+PAD_MS = 200                 # Keep a little air around speech so words aren't clipped
+CHUNK_TARGET_S = float(os.getenv("AUDIO_CHUNK_TARGET_S", "30"))
+CHUNK_MAX_S = float(os.getenv("AUDIO_CHUNK_MAX_S", "45"))
+OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "16k")
+# Encoder effort 0-10. At speech bitrates 0 is ~7x faster than 10 for the same size.
+OPUS_COMPLEXITY = os.getenv("AUDIO_OPUS_COMPLEXITY", "0")
+
+
+async def _ffmpeg(args: list, data: bytes) -> bytes:
+    proc = await asyncio.create_subprocess_exec(
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", *args,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await proc.communicate(data)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {err.decode(errors='ignore').strip()[:200]}")
+    return out
+
+
+async def decode_to_pcm(data: bytes) -> np.ndarray:
+    """Decodes any container to 16 kHz mono int16 (downmix + resample in one pass)."""
+    raw = await _ffmpeg(["-i", "pipe:0", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"], data)
+    return np.frombuffer(raw, dtype=np.int16)
+
+
+async def encode_opus(pcm: np.ndarray) -> bytes:
+    """Encodes 16 kHz mono PCM as a compact speech-tuned OGG/Opus file."""
+    return await _ffmpeg([
+        "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+        "-compression_level", OPUS_COMPLEXITY, "-f", "ogg", "pipe:1",
+    ], pcm.tobytes())
+
+
+def frame_energy_dbfs(pcm: np.ndarray) -> np.ndarray:
+    """RMS level of each 20 ms frame in dBFS."""
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    n_frames = len(pcm) // frame
+    if n_frames == 0:
+        return np.zeros(0)
+    frames = pcm[: n_frames * frame].astype(np.float32).reshape(n_frames, frame) / 32768.0
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10
+    return 20 * np.log10(rms)
+
+
+def trim_silence(pcm: np.ndarray) -> np.ndarray:
+    """Drops leading and trailing silence, keeping PAD_MS of padding."""
+    energy = frame_energy_dbfs(pcm)
+    voiced = np.nonzero(energy > SILENCE_DBFS)[0]
+    if len(voiced) == 0:
+        return pcm[:0]
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    pad = SAMPLE_RATE * PAD_MS // 1000
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(pcm), (voiced[-1] + 1) * frame + pad)
+    return pcm[start:end]
+
+
+def split_at_silence(pcm: np.ndarray, target_s: float = CHUNK_TARGET_S, max_s: float = CHUNK_MAX_S) -> list:
+    """
+    Splits long audio into chunks of roughly target_s seconds, cutting at the
+    quietest frame between target_s and max_s so no word is cut in half.
+    """
+    total_s = len(pcm) / SAMPLE_RATE
+    if total_s <= max_s:
+        return [pcm]
+
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    energy = frame_energy_dbfs(pcm)
+    frames_per_s = 1000 // FRAME_MS
+
+    chunks, start_frame = [], 0
+    while (len(energy) - start_frame) / frames_per_s > max_s:
+        lo = start_frame + int(target_s * frames_per_s)
+        hi = start_frame + int(max_s * frames_per_s)
+        cut = lo + int(np.argmin(energy[lo:hi]))
+        chunks.append(pcm[start_frame * frame: cut * frame])
+        start_frame = cut
+    chunks.append(pcm[start_frame * frame:])
+    return chunks
+
+
+async def prepare_for_transcription(data: bytes) -> list:
+    """
+    Voice note bytes -> list of upload-ready OGG/Opus chunks in playback order.
+    Trims silence, downmixes to mono 16 kHz and splits long recordings at pauses.
+    Returns [data] unchanged when ffmpeg is unavailable or decoding fails.
+    """
+    if not FFMPEG_BINARY:
+        return [data]
+    try:
+        pcm = trim_silence(await decode_to_pcm(data))
+        if len(pcm) == 0:
+            return []
+        chunks = split_at_silence(pcm)
+        encoded = await asyncio.gather(*[encode_opus(c) for c in chunks])
+        # Never upload more than the original for a short, already-compact note
+        if len(encoded) == 1 and len(encoded[0]) >= len(data):
+            return [data]
+        return list(encoded)
+    except Exception as e:
+        logger.warning(f"⚠️ Audio preprocessing skipped: {e}")
+        return [data]
@@ -0,0 +1,226 @@
+# app/core/context_packer.py
+
+import os
+import re
+import json
+from dataclasses import dataclass, field
+import numpy as np
+import tiktoken
+
+# Token budget for the law context sent to the GPT-4o audit
+CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "3000"))
+# Target size of one passage; retrieved rows are whole documents
+PASSAGE_TOKENS = int(os.getenv("RAG_PASSAGE_TOKENS", "250"))
+# 1.0 = pure relevance, 0.0 = pure diversity
+MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+# Word-shingle Jaccard above which two passages count as the same text
+DUPLICATE_JACCARD = float(os.getenv("RAG_DUPLICATE_JACCARD", "0.8"))
+# Passages embedded for MMR, after a cheap lexical pre-filter
+MAX_CANDIDATES = int(os.getenv("RAG_MAX_CANDIDATES", "120"))
+
+_encoding = None
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model("gpt-4o")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text or ""))
+
+
+@dataclass
+class Passage:
+    text: str
+    source: str
+    tokens: int
+    position: int
+    shingles: frozenset = field(default=frozenset(), repr=False)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    passages: list
+    candidate_passages: int = 0
+    duplicates_dropped: int = 0
+    sources: list = field(default_factory=list)
+
+# --- 1. PASSAGES ---
+
+def split_passages(text: str, source: str, target_tokens: int = PASSAGE_TOKENS) -> list:
+    """
+    Cuts a document into ~target_tokens passages on line boundaries (PDF text
+    rarely has paragraph breaks). Over-long lines are cut by tokens.
+    """
+    enc = get_encoding()
+    passages, lines, size = [], [], 0
+
+    def flush():
+        nonlocal lines, size
+        body = "\n".join(lines).strip()
+        if body:
+            passages.append(Passage(body, source, count_tokens(body), len(passages)))
+        lines, size = [], 0
+
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        n = len(enc.encode(line))
+        if n > target_tokens:
+            flush()
+            ids = enc.encode(line)
+            for i in range(0, len(ids), target_tokens):
+                lines, size = [enc.decode(ids[i:i + target_tokens])], 0
+                flush()
+            continue
+        if size + n > target_tokens:
+            flush()
+        lines.append(line)
+        size += n
+    flush()
+    return passages
+
+
+def _shingles(text: str, k: int = 5) -> frozenset:
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + k]) for i in range(len(words) - k + 1))
+
+
+def _drop_exact_duplicates(passages: list) -> list:
+    """Keeps the first passage of each normalized text; linear, so it runs before the prefilter."""
+    kept, seen = [], set()
+    for p in passages:
+        key = " ".join(_WORD.findall(p.text.lower()))
+        if key and key not in seen:
+            seen.add(key)
+            kept.append(p)
+    return kept
+
+
+def drop_near_duplicates(passages: list, threshold: float = DUPLICATE_JACCARD) -> list:
+    """Keeps the first of any group of passages whose shingle sets overlap above threshold."""
+    kept = []
+    seen_exact = set()
+    for p in passages:
+        key = " ".join(_WORD.findall(p.text.lower()))
+        if not key or key in seen_exact:
+            continue
+        p.shingles = _shingles(p.text)
+        duplicate = False
+        for q in kept:
+            inter = len(p.shingles & q.shingles)
+            if inter and inter / len(p.shingles | q.shingles) >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            seen_exact.add(key)
+            kept.append(p)
+    return kept
+
+
+def _lexical_prefilter(query: str, passages: list, limit: int) -> list:
+    """Keeps the passages sharing the most query terms (ties keep retrieval order)."""
+    if len(passages) <= limit:
+        return passages
+    terms = {w for w in _WORD.findall(query.lower()) if len(w) > 2}
+    scored = sorted(
+        enumerate(passages),
+        key=lambda ip: (-len(terms & set(_WORD.findall(ip[1].text.lower()))), ip[0]),
+    )
+    return [p for _, p in scored[:limit]]
+
+# --- 2. MAXIMAL MARGINAL RELEVANCE ---
+
+def mmr_select(query_vector, passage_vectors, token_counts: list, budget: int,
+               lambda_mult: float = MMR_LAMBDA) -> list:
+    """
+    Greedy MMR under a token budget. Each step picks the passage maximizing
+    lambda * sim(query) - (1 - lambda) * max sim(already picked); passages
+    that no longer fit are skipped rather than ending the selection.
+    """
+    if not len(passage_vectors):
+        return []
+    matrix = np.asarray(passage_vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-8)
+    q = np.asarray(query_vector, dtype=np.float32)
+    q = q / max(float(np.linalg.norm(q)), 1e-8)
+
+    relevance = matrix @ q
+    redundancy = np.full(len(matrix), -1.0, dtype=np.float32)
+    available = np.ones(len(matrix), dtype=bool)
+    chosen, used = [], 0
+
+    while available.any():
+        penalty = np.where(redundancy > -1.0, redundancy, 0.0)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+        if used + token_counts[best] > budget:
+            continue
+        chosen.append(best)
+        used += token_counts[best]
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+    return chosen
+
+# --- 3. THE BUILDER ---
+
+def build_context(query: str, query_vector, documents: list, embed_many, budget: int = CONTEXT_TOKENS,
+                  separator: str = "\n---\n") -> PackedContext:
+    """
+    Packs retrieved (content, metadata) rows into at most `budget` tokens:
+    split into passages, drop near-duplicates, pick by MMR against the query,
+    then lay them out in document order so clauses read naturally.
+    """
+    passages = []
+    for rank, (content, metadata) in enumerate(documents):
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata or "{}")
+        source = (metadata or {}).get("source")
+        for p in split_passages(content, source or f"doc{rank}"):
+            p.position += rank * 100000
+            passages.append(p)
+
+    # The shingle comparison is pairwise, so it only sees the prefilter's survivors;
+    # exact copies go first so they cannot crowd distinct passages out of the limit.
+    unique = _drop_exact_duplicates(passages)
+    survivors = _lexical_prefilter(query, unique, MAX_CANDIDATES)
+    candidates = drop_near_duplicates(survivors)
+    packed = PackedContext(
+        text="", tokens=0, passages=[],
+        candidate_passages=len(passages),
+        duplicates_dropped=len(passages) - len(unique) + len(survivors) - len(candidates),
+    )
+    if not candidates:
+        return packed
+
+    separator_tokens = count_tokens(separator)
+    vectors = embed_many([p.text for p in candidates])
+    picked = mmr_select(query_vector, vectors, [p.tokens + separator_tokens for p in candidates], budget)
+    chosen = sorted((candidates[i] for i in picked), key=lambda p: p.position)
+
+    packed.passages = chosen
+    packed.text = separator.join(p.text for p in chosen)
+    packed.tokens = count_tokens(packed.text)
+    packed.sources = list(dict.fromkeys(p.source for p in chosen))
+    return packed
+
+
+def pack_by_chars(documents: list, max_chars: int = 22000, separator: str = "\n---\n") -> str:
+    """The previous packing: whole documents in retrieval order up to a character cap."""
+    parts, total = [], 0
+    for content, _ in documents:
+        if total + len(content) > max_chars:
+            break
+        parts.append(content)
+        total += len(content)
+    return separator.join(parts)
@@ -0,0 +1,362 @@
+# app/core/db.py
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+from app.utils.tracing import traced_connect, Histogram
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DB_URL = os.getenv("DATABASE_URL", "")
+if DB_URL.startswith("postgres://"):
+    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
+
+# --- POOL SETTINGS ---
+# One pool per process. Neon caps connections per compute, so size it to the
+# number of threads that query at once (swarm workers + cache stores).
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Longest a caller waits for a free connection before PoolTimeout
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+# Idle connections are pinged before reuse after this long (Neon drops idle TCP)
+HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))
+# Connections are recycled after this age, and closed after this long unused
+MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+
+# Checkout waits are mostly sub-millisecond; queries and transactions longer
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class PoolClosed(Exception):
+    """The pool was closed (shutdown) and hands out no more connections."""
+
+
+class _Slot:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of traced, autocommit psycopg2 connections.
+    - A checkout waits up to `timeout` for a free connection.
+    - Connections idle longer than `health_check_after` are pinged first.
+    - Closed, broken, or old connections are replaced instead of being reused.
+    The async helpers run the blocking work on a worker thread.
+    """
+
+    def __init__(self, dsn: str = DB_URL, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE,
+                 timeout: float = POOL_TIMEOUT):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.health_check_failures = 0
+        self.connect_errors = 0
+        self.wait_seconds = Histogram(WAIT_BUCKETS)
+        self.checkout_seconds = Histogram()
+
+    # --- connections ---
+
+    def _connect(self) -> _Slot:
+        try:
+            conn = traced_connect(
+                self.dsn, connect_timeout=CONNECT_TIMEOUT,
+                keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+            )
+        except Exception:
+            self.connect_errors += 1
+            raise
+        conn.autocommit = True
+        self.connections_opened += 1
+        return _Slot(conn)
+
+    def _close(self, slot: _Slot):
+        self.connections_closed += 1
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def _usable(self, slot: _Slot) -> bool:
+        """Drops closed or expired connections and pings ones that sat idle."""
+        now = time.monotonic()
+        if slot.conn.closed or now - slot.created_at > MAX_LIFETIME or now - slot.last_used > MAX_IDLE:
+            return False
+        if now - slot.last_used > HEALTH_CHECK_AFTER:
+            try:
+                with slot.conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+            except Exception as e:
+                self.health_check_failures += 1
+                logger.warning(f"⚠️ Pooled DB connection failed its health check, replacing it: {e}")
+                return False
+        return True
+
+    def getconn(self, timeout: float = None):
+        """Checks out a connection; every getconn must be paired with putconn."""
+        started = time.perf_counter()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        slot = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolClosed("database connection pool is closed")
+                if self._idle:
+                    slot = self._idle.pop()  # most recently used first, so spares age out
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"no database connection free after {time.perf_counter() - started:.1f}s "
+                        f"({self._size} open, max {self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            if slot is not None and not self._usable(slot):
+                self._close(slot)
+                slot = None
+            if slot is None:
+                slot = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.checkouts += 1
+            self.wait_seconds.observe(time.perf_counter() - started)
+            self._in_use[id(slot.conn)] = (slot, time.perf_counter())
+        return slot.conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Returns a connection; one left mid-transaction is rolled back first."""
+        with self._cond:
+            slot, checked_out = self._in_use.pop(id(conn), (None, None))
+            if slot is not None:
+                self.checkout_seconds.observe(time.perf_counter() - checked_out)
+            discard = discard or self._closed
+        if slot is None:
+            conn.close()
+            return
+
+        if not discard and not conn.closed:
+            try:
+                status = conn.info.transaction_status
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if not conn.autocommit:
+                    conn.autocommit = True
+            except Exception:
+                discard = True
+
+        if discard or conn.closed:
+            self._close(slot)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        slot.last_used = time.monotonic()
+        with self._cond:
+            if not self._closed:
+                self._idle.append(slot)
+                self._cond.notify()
+                return
+            self._size -= 1
+        self._close(slot)
+
+    # --- context managers ---
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """An autocommit connection: each statement commits on its own."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    @contextmanager
+    def cursor(self, cursor_factory=None, timeout: float = None, statement_timeout: float = None):
+        """
+        A cursor on an autocommit connection. With `statement_timeout` (seconds)
+        the statements share one transaction and Postgres cancels any that runs
+        longer, so an abandoned caller does not leave the query running.
+        """
+        if statement_timeout is None:
+            with self.connection(timeout) as conn, conn.cursor(cursor_factory=cursor_factory) as cur:
+                yield cur
+            return
+        with self.transaction(timeout) as conn, conn.cursor(cursor_factory=cursor_factory) as cur:
+            cur.execute("SET LOCAL statement_timeout = %s;", (max(1, int(statement_timeout * 1000)),))
+            yield cur
+
+    @contextmanager
+    def transaction(self, timeout: float = None):
+        """A connection whose statements commit together, or roll back on error."""
+        with self.connection(timeout) as conn:
+            conn.autocommit = False
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                if not conn.closed:
+                    conn.autocommit = True
+
+    # --- async ---
+
+    def run(self, fn, *args, **kwargs):
+        """Calls fn(conn, *args, **kwargs) on a pooled connection."""
+        with self.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    async def arun(self, fn, *args, **kwargs):
+        """Async variant of run(): the checkout and the queries happen on a worker thread."""
+        return await asyncio.to_thread(self.run, fn, *args, **kwargs)
+
+    async def afetchall(self, sql: str, params=None, cursor_factory=None) -> list:
+        def _fetch(conn):
+            with conn.cursor(cursor_factory=cursor_factory) as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+        return await self.arun(_fetch)
+
+    # --- lifecycle & health ---
+
+    def warm(self) -> int:
+        """Opens min_size connections so the first turns skip the TLS handshake."""
+        opened = [self.getconn() for _ in range(max(1, self.min_size))]
+        for conn in opened:
+            self.putconn(conn)
+        return len(opened)
+
+    def check(self) -> dict:
+        """Round trip on a pooled connection; raises if the database is unreachable."""
+        started = time.perf_counter()
+        with self.cursor() as cur:
+            cur.execute("SELECT 1;")
+            cur.fetchone()
+        return {"ok": True, "ms": round(1000 * (time.perf_counter() - started), 1)}
+
+    async def acheck(self) -> dict:
+        return await asyncio.to_thread(self.check)
+
+    def close(self):
+        """Closes idle connections (shutdown); checked-out ones close when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for slot in idle:
+            self._close(slot)
+
+    # --- metrics ---
+
+    def stats(self) -> dict:
+        with self._cond:
+            size, idle, in_use, waiting = self._size, len(self._idle), len(self._in_use), self._waiting
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": in_use,
+            "waiting": waiting,
+            "max_size": self.max_size,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "opened": self.connections_opened,
+            "closed": self.connections_closed,
+            "health_check_failures": self.health_check_failures,
+            "connect_errors": self.connect_errors,
+            "avg_wait_ms": round(1000 * self.wait_seconds.sum / self.wait_seconds.count, 2)
+            if self.wait_seconds.count else 0.0,
+            "avg_checkout_ms": round(1000 * self.checkout_seconds.sum / self.checkout_seconds.count, 2)
+            if self.checkout_seconds.count else 0.0,
+        }
+
+    def render_prometheus(self) -> str:
+        s = self.stats()
+        lines = []
+        for name, value, help_text in (
+            ("size", s["size"], "Open connections."),
+            ("in_use", s["in_use"], "Connections checked out."),
+            ("idle", s["idle"], "Connections ready for reuse."),
+            ("waiting", s["waiting"], "Callers waiting for a connection."),
+            ("max_size", s["max_size"], "Pool capacity."),
+        ):
+            lines += [f"# HELP empowernet_db_pool_{name} {help_text}", f"# TYPE empowernet_db_pool_{name} gauge",
+                      f"empowernet_db_pool_{name} {value}"]
+        for name, value, help_text in (
+            ("timeouts_total", s["timeouts"], "Checkouts that gave up waiting."),
+            ("connections_opened_total", s["opened"], "Connections opened."),
+            ("health_check_failures_total", s["health_check_failures"], "Idle connections that failed a ping."),
+        ):
+            lines += [f"# HELP empowernet_db_pool_{name} {help_text}", f"# TYPE empowernet_db_pool_{name} counter",
+                      f"empowernet_db_pool_{name} {value}"]
+        for name, h, help_text in (
+            ("wait_seconds", self.wait_seconds, "Time spent waiting for a connection."),
+            ("checkout_seconds", self.checkout_seconds, "Time a connection was held by a caller."),
+        ):
+            lines += [f"# HELP empowernet_db_pool_{name} {help_text}", f"# TYPE empowernet_db_pool_{name} histogram"]
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f'empowernet_db_pool_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'empowernet_db_pool_{name}_bucket{{le="+Inf"}} {h.count}')
+            lines.append(f"empowernet_db_pool_{name}_sum {h.sum:.6f}")
+            lines.append(f"empowernet_db_pool_{name}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def register_once(conn, name: str, setup):
+    """Runs a per-connection setup (e.g. pgvector's register_vector) once per pooled connection."""
+    done = getattr(conn, "_empowernet_setup", None)
+    if done is None:
+        done = conn._empowernet_setup = set()
+    if name not in done:
+        setup(conn)
+        done.add(name)
+
+
+db_pool = ConnectionPool()
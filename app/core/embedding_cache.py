@@ -0,0 +1,242 @@
+# app/core/embedding_cache.py
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from app.core.stores import SQLiteStore, PostgresStore, select_store, backend_name
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "text-embedding-3-small"
+DEFAULT_SQLITE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "5000"))
+# Inputs per embeddings request on a miss (the API accepts up to 2048)
+EMBED_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+# Keys per store round trip
+LOOKUP_BATCH_SIZE = 500
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-only normalization; case and punctuation change the embedding."""
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def to_blob(vector) -> bytes:
+    """Packs a vector as float32 (6 KB for text-embedding-3-small)."""
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_blob(blob) -> np.ndarray:
+    return np.frombuffer(bytes(blob), dtype=np.float32)
+
+# --- 1. BACKENDS ---
+# One row per (model, SHA-256 of normalized text). Embeddings are deterministic
+# for a given model, so rows never expire; a new model simply gets new keys.
+
+class SQLiteEmbeddingStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS text_embeddings (
+            model       TEXT NOT NULL,
+            text_sha256 TEXT NOT NULL,
+            embedding   BLOB NOT NULL,
+            created_at  REAL NOT NULL,
+            PRIMARY KEY (model, text_sha256)
+        );
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        super().__init__(path)
+
+    def get_many(self, model: str, keys: list) -> dict:
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT text_sha256, embedding FROM text_embeddings "
+                f"WHERE model = ? AND text_sha256 IN ({placeholders});",
+                (model, *keys),
+            ).fetchall()
+        return {k: from_blob(e) for k, e in rows}
+
+    def put_many(self, model: str, vectors: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO text_embeddings (model, text_sha256, embedding, created_at) "
+                "VALUES (?, ?, ?, ?);",
+                [(model, key, to_blob(v), now) for key, v in vectors.items()],
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM text_embeddings;").fetchone()[0]
+
+
+class PostgresEmbeddingStore(PostgresStore):
+    """Shared store: a text embedded on any host is never embedded again."""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS text_embeddings (
+            model       TEXT NOT NULL,
+            text_sha256 TEXT NOT NULL,
+            embedding   BYTEA NOT NULL,
+            created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (model, text_sha256)
+        );
+    """
+
+    def get_many(self, model: str, keys: list) -> dict:
+        with self._pool.cursor() as cur:
+            cur.execute(
+                "SELECT text_sha256, embedding FROM text_embeddings "
+                "WHERE model = %s AND text_sha256 = ANY(%s);",
+                (model, list(keys)),
+            )
+            return {k: from_blob(e) for k, e in cur.fetchall()}
+
+    def put_many(self, model: str, vectors: dict):
+        import psycopg2
+        from psycopg2.extras import execute_values
+
+        with self._pool.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO text_embeddings (model, text_sha256, embedding) VALUES %s
+                ON CONFLICT (model, text_sha256) DO NOTHING;
+            """, [(model, key, psycopg2.Binary(to_blob(v))) for key, v in vectors.items()])
+
+    def size(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM text_embeddings;")
+            return cur.fetchone()[0]
+
+# --- 2. THE CACHE ---
+
+class EmbeddingCache:
+    """
+    In-process LRU in front of the text_embeddings table. Lookups for many
+    texts cost one store round trip; only the texts never seen before are
+    sent to the embeddings API, in as few requests as possible.
+    """
+
+    def __init__(self, store, lru_size: int = LRU_SIZE, batch_size: int = EMBED_BATCH_SIZE):
+        self.store = store
+        self.lru_size = lru_size
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self.lru_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.errors = 0
+
+    def _remember(self, model: str, vectors: dict):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._lru[(model, key)] = vector
+                self._lru.move_to_end((model, key))
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _from_store(self, model: str, keys: list) -> dict:
+        found = {}
+        for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            try:
+                found.update(self.store.get_many(model, keys[i:i + LOOKUP_BATCH_SIZE]))
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Embedding Store Error: {e}")
+        return found
+
+    def _embed(self, model: str, texts: dict) -> dict:
+        """Calls the embeddings API for {key: normalized text}."""
+        from app.core.llm import get_openai_client, tracked_call
+
+        client = get_openai_client()
+        keys = list(texts)
+        vectors = {}
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i:i + self.batch_size]
+            with tracked_call(model) as call:
+                resp = call.response = client.embeddings.create(input=[texts[k] for k in batch], model=model)
+            self.api_calls += 1
+            for item in resp.data:
+                vectors[batch[item.index]] = np.asarray(item.embedding, dtype=np.float32)
+        return vectors
+
+    def embed_many(self, texts: list, model: str = DEFAULT_MODEL) -> list:
+        """Returns one float32 vector per text, in order."""
+        normalized = [normalize_text(t) for t in texts]
+        keys = [text_key(t) for t in normalized]
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if (model, key) in self._lru:
+                    self._lru.move_to_end((model, key))
+                    found[key] = self._lru[(model, key)]
+                    self.lru_hits += 1
+                else:
+                    missing.append(key)
+
+        if missing:
+            stored = self._from_store(model, missing)
+            self.store_hits += len(stored)
+            self._remember(model, stored)
+            found.update(stored)
+            missing = [k for k in missing if k not in stored]
+
+        if missing:
+            self.misses += len(missing)
+            by_key = dict(zip(keys, normalized))
+            fresh = self._embed(model, {k: by_key[k] for k in missing})
+            self._remember(model, fresh)
+            found.update(fresh)
+            try:
+                self.store.put_many(model, fresh)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Embedding write-back failed: {e}")
+
+        return [found[k] for k in keys]
+
+    def embed(self, text: str, model: str = DEFAULT_MODEL) -> np.ndarray:
+        return self.embed_many([text], model)[0]
+
+    def stats(self) -> dict:
+        """Counts the stored rows too, which scans the table: call it off the event loop."""
+        hits = self.lru_hits + self.store_hits
+        total = hits + self.misses
+        try:
+            stored = self.store.size()
+        except Exception:
+            stored = None
+        return {
+            "backend": backend_name(self.store),
+            "lru_entries": len(self._lru),
+            "stored_entries": stored,
+            "lru_hits": self.lru_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "api_calls": self.api_calls,
+            "errors": self.errors,
+        }
+
+
+def build_embedding_cache(kind: str = None) -> EmbeddingCache:
+    """Creates the cache selected by EMBEDDING_CACHE_BACKEND (postgres or sqlite); the store opens on first use."""
+    kind = kind or os.getenv("EMBEDDING_CACHE_BACKEND", "postgres")
+    return EmbeddingCache(select_store("Embedding", kind, PostgresEmbeddingStore, SQLiteEmbeddingStore))
+
+
+embedding_cache = build_embedding_cache()
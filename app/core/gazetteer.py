@@ -0,0 +1,355 @@
+# app/core/gazetteer.py
+
+import os
+import re
+import time
+import asyncio
+import logging
+import unicodedata
+from array import array
+from typing import NamedTuple, Optional
+from dotenv import load_dotenv
+from app.core.db import db_pool
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+TRIGRAM_MIN_SCORE = float(os.getenv("GAZETTEER_TRIGRAM_MIN_SCORE", "0.6"))
+TRIGRAM_TIE_MARGIN = 0.05    # Fuzzy candidates this close to the best one are a tie
+PHONETIC_MIN_SCORE = 0.4     # Skeletons collide easily, so matches also need sound-alike overlap
+LEVELS = ("district", "block", "gram_panchayat", "village")
+
+
+class Place(NamedTuple):
+    level: str
+    name: str
+    district: str
+    block: Optional[str] = None
+    gram_panchayat: Optional[str] = None
+
+    @property
+    def path(self) -> tuple:
+        """(district[, block[, village]]) as stored on user_profile."""
+        if self.level == "district":
+            return (self.district,)
+        if self.level == "village":
+            return (self.district, self.block, self.name)
+        return (self.district, self.block)
+
+
+class Match(NamedTuple):
+    places: tuple
+    method: str     # "exact", "casefold", "transliterated" or "trigram"
+    score: float
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.places) != 1
+
+# --- NORMALISATION ---
+
+_BN_VOWELS = {
+    "অ": "a", "আ": "a", "ই": "i", "ঈ": "i", "উ": "u", "ঊ": "u", "ঋ": "ri",
+    "এ": "e", "ঐ": "oi", "ও": "o", "ঔ": "ou",
+}
+_BN_SIGNS = {
+    "া": "a", "ি": "i", "ী": "i", "ু": "u", "ূ": "u", "ৃ": "ri",
+    "ে": "e", "ৈ": "oi", "ো": "o", "ৌ": "ou",
+}
+_BN_CONSONANTS = {
+    "ক": "k", "খ": "kh", "গ": "g", "ঘ": "gh", "ঙ": "ng", "চ": "ch", "ছ": "chh",
+    "জ": "j", "ঝ": "jh", "ঞ": "n", "ট": "t", "ঠ": "th", "ড": "d", "ঢ": "dh",
+    "ণ": "n", "ত": "t", "থ": "th", "দ": "d", "ধ": "dh", "ন": "n", "প": "p",
+    "ফ": "ph", "ব": "b", "ভ": "bh", "ম": "m", "য": "j", "র": "r", "ল": "l",
+    "শ": "sh", "ষ": "sh", "স": "s", "হ": "h", "ড়": "r", "ঢ়": "rh", "য়": "y",
+}
+_BN_OTHER = {"ৎ": "t", "ং": "ng", "ঃ": "h", "ঁ": "", "়": ""}
+_VIRAMA = "্"
+_NUKTA_FORMS = {"ড": "ড়", "ঢ": "ঢ়", "য": "য়"}
+
+
+def romanize_bengali(text: str) -> str:
+    """
+    Rough Bengali-script to Latin romanisation, enough to line typed Bengali up
+    with the English names in administrative_hierarchy ("বারুইপুর" -> "baruipur").
+    """
+    chars = list(text)
+    out = []
+    i = 0
+    while i < len(chars):
+        ch = chars[i]
+        if ch == _VIRAMA and i + 1 < len(chars) and chars[i + 1] == "য":
+            i += 2  # ya-phala only colours the vowel (ক্যানিং -> kaning)
+            continue
+        if ch in _NUKTA_FORMS and i + 1 < len(chars) and chars[i + 1] == "়":
+            ch = _NUKTA_FORMS[ch]
+            i += 1
+        if ch in _BN_CONSONANTS:
+            out.append(_BN_CONSONANTS[ch])
+            nxt = chars[i + 1] if i + 1 < len(chars) else ""
+            # Inherent vowel, except before a vowel sign / virama and at word end
+            if nxt and nxt not in _BN_SIGNS and nxt != _VIRAMA and nxt != "়" and not nxt.isspace():
+                out.append("a")
+        elif ch in _BN_SIGNS:
+            out.append(_BN_SIGNS[ch])
+        elif ch in _BN_VOWELS:
+            out.append(_BN_VOWELS[ch])
+        elif ch in _BN_OTHER:
+            out.append(_BN_OTHER[ch])
+        elif ch != _VIRAMA:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+_NON_WORD = re.compile(r"[^\wঀ-৿]+")
+_BENGALI = re.compile(r"[ঀ-৿]")
+
+
+def fold(text: str) -> str:
+    """Case-folded, accent-free, punctuation-free form with single spaces."""
+    if text.isascii():
+        return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c) or "ঀ" <= c <= "৿")
+    text = unicodedata.normalize("NFC", text)  # Recompose split Bengali vowel signs (ে + া -> ো)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def to_latin(text: str) -> str:
+    folded = fold(text)
+    return fold(romanize_bengali(folded)) if _BENGALI.search(folded) else folded
+
+
+# Aspirated pairs and common romanisation swaps collapse to one letter; longest first
+_MERGES = {
+    "chh": "c", "ch": "c", "sh": "s", "kh": "k", "gh": "g", "jh": "j", "th": "t", "dh": "d",
+    "ph": "p", "bh": "b", "rh": "r", "c": "k", "f": "p", "v": "b", "z": "j", "q": "k", "x": "ks",
+}
+_MERGE_RE = re.compile("|".join(sorted(_MERGES, key=len, reverse=True)))
+_INNER_H = re.compile(r"\Bh")
+_VOWELS_TO_A = str.maketrans({"e": "a", "i": "a", "o": "a", "u": "a", "w": "a", "y": "a", " ": None})
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def _sound_from_latin(latin: str) -> str:
+    key = _MERGE_RE.sub(lambda m: _MERGES[m.group()], latin)
+    return _REPEATS.sub(r"\1", _INNER_H.sub("", key).translate(_VOWELS_TO_A))
+
+
+def _skeleton(sound: str) -> str:
+    return _REPEATS.sub(r"\1", sound.replace("a", ""))
+
+
+def sound_alike(text: str) -> str:
+    """Consonant merges with every vowel collapsed to 'a' ("howrah", "হাওড়া" -> "hara")."""
+    return _sound_from_latin(to_latin(text))
+
+
+def phonetic_key(text: str) -> str:
+    """
+    Spelling-insensitive consonant skeleton: merges aspirated pairs and v/b, f/ph,
+    drops vowels and doubled letters, so "Boruipore", "baruipur" and "বারুইপুর" agree.
+    """
+    return _skeleton(sound_alike(text))
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a: str, b: str) -> float:
+    ga, gb = trigrams(a), trigrams(b)
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+# --- INDEX ---
+
+class Gazetteer:
+    """
+    Compact in-process index over administrative_hierarchy.
+    Names are stored once; every lookup table maps a key to entry ids, and the
+    trigram postings are packed uint32 arrays.
+    """
+
+    def __init__(self, rows):
+        self.places = []
+        seen = set()
+        for district, block, gram_panchayat, village in rows:
+            for place in (
+                Place("district", district, district),
+                Place("block", block, district, block),
+                Place("gram_panchayat", gram_panchayat, district, block, gram_panchayat),
+                Place("village", village, district, block, gram_panchayat),
+            ):
+                if place.name and place not in seen:
+                    seen.add(place)
+                    self.places.append(place)
+
+        self.exact, self.folded, self.phonetic = {}, {}, {}
+        self.latins, self.sounds = [], []
+        self.scopes = {}          # ("block", district, block) / ("district", district) -> ids
+        self._scope_postings = {}
+        postings = {}
+        for idx, place in enumerate(self.places):
+            latin = to_latin(place.name)
+            sound = _sound_from_latin(latin)
+            self.latins.append(latin)
+            self.sounds.append(sound)
+            self.exact.setdefault(place.name.strip().upper(), array("I")).append(idx)
+            self.folded.setdefault(latin, array("I")).append(idx)
+            self.phonetic.setdefault(_skeleton(sound), array("I")).append(idx)
+            for gram in trigrams(latin):
+                postings.setdefault(gram, array("I")).append(idx)
+            self.scopes.setdefault(("district", place.district), array("I")).append(idx)
+            if place.block:
+                self.scopes.setdefault(("block", place.district, place.block), array("I")).append(idx)
+        self.trigram_postings = postings
+
+    def __len__(self):
+        return len(self.places)
+
+    def level_counts(self) -> dict:
+        counts = {level: 0 for level in LEVELS}
+        for place in self.places:
+            counts[place.level] += 1
+        return counts
+
+    # --- LOOKUP ---
+
+    def _prefer(self, ids, level, district, block) -> tuple:
+        """
+        Narrows candidates to the expected level/parents when that leaves any, and
+        collapses places that map to the same profile path (same-named villages in
+        two gram panchayats of one block are one answer, not an ambiguity).
+        """
+        candidates = [self.places[i] for i in dict.fromkeys(ids)]
+        for keep in (
+            lambda p: not district or p.district == district,
+            lambda p: not block or p.block == block,
+            lambda p: not level or p.level == level,
+        ):
+            narrowed = [p for p in candidates if keep(p)]
+            if narrowed:
+                candidates = narrowed
+        unique = {}
+        for place in candidates:
+            unique.setdefault((place.level, place.path), place)
+        return tuple(unique.values())
+
+    def _postings_for(self, scope) -> dict:
+        """Trigram postings of one block or district, built on first use."""
+        if scope is None:
+            return self.trigram_postings
+        postings = self._scope_postings.get(scope)
+        if postings is None:
+            postings = {}
+            for idx in self.scopes.get(scope, ()):
+                for gram in trigrams(self.latins[idx]):
+                    postings.setdefault(gram, []).append(idx)
+            self._scope_postings[scope] = postings
+        return postings
+
+    def _fuzzy(self, latin: str, scope=None) -> tuple:
+        grams = trigrams(latin)
+        postings = self._postings_for(scope)
+        shared = {}
+        for gram in grams:
+            for idx in postings.get(gram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+        if not shared:
+            return [], 0.0
+        # Only the best few overlaps can clear the threshold; score just those
+        floor = TRIGRAM_MIN_SCORE * len(grams) / 2
+        scored = [
+            (2 * n / (len(grams) + len(trigrams(self.latins[idx]))), idx)
+            for idx, n in shared.items() if n >= floor
+        ]
+        if not scored:
+            return [], 0.0
+        best = max(scored)[0]
+        if best < TRIGRAM_MIN_SCORE:
+            return [], best
+        return [idx for score, idx in scored if score >= best - TRIGRAM_TIE_MARGIN], best
+
+    def lookup(self, text: str, level: str = None, district: str = None, block: str = None) -> Optional[Match]:
+        """
+        Resolves a typed place name. level/district/block are preferences used to
+        break ties (e.g. the block menu step prefers blocks in the saved district).
+        Returns None if nothing matches; check Match.ambiguous before trusting it.
+        """
+        if not text or not text.strip():
+            return None
+        ids = self.exact.get(text.strip().upper())
+        if ids:
+            return Match(self._prefer(ids, level, district, block), "exact", 1.0)
+
+        latin = to_latin(text)
+        ids = self.folded.get(latin)
+        if ids:
+            return Match(self._prefer(ids, level, district, block), "casefold", 1.0)
+
+        # Skeletons of short names collide a lot, so narrow to the saved parents
+        # before paying for the sound-alike check on each candidate
+        sound = _sound_from_latin(latin)
+        ids = self.phonetic.get(_skeleton(sound), ())
+        for keep in (lambda p: not district or p.district == district, lambda p: not block or p.block == block):
+            narrowed = [i for i in ids if keep(self.places[i])]
+            if narrowed:
+                ids = narrowed
+        ids = [i for i in ids if dice(sound, self.sounds[i]) >= PHONETIC_MIN_SCORE]
+        if ids:
+            return Match(self._prefer(ids, level, district, block), "transliterated", 1.0)
+
+        # Fuzzy search the saved block first, then the district, then the state
+        scopes = []
+        if district and block:
+            scopes.append(("block", district, block))
+        if district:
+            scopes.append(("district", district))
+        for scope in scopes + [None]:
+            ids, score = self._fuzzy(latin, scope)
+            if ids:
+                return Match(self._prefer(ids, level, district, block), "trigram", round(score, 3))
+        return None
+
+# --- PROCESS-WIDE INSTANCE ---
+
+def load_hierarchy_rows() -> list:
+    with db_pool.cursor() as cur:
+        cur.execute(
+            "SELECT DISTINCT district, block, gram_panchayat, village FROM administrative_hierarchy;"
+        )
+        return cur.fetchall()
+
+
+_gazetteer = None
+_load_lock = None
+
+
+def build_gazetteer(rows) -> Gazetteer:
+    started = time.perf_counter()
+    gazetteer = Gazetteer(rows)
+    logger.info(
+        f"🗺️ Gazetteer indexed {len(gazetteer)} places {gazetteer.level_counts()} "
+        f"in {1000 * (time.perf_counter() - started):.0f} ms"
+    )
+    return gazetteer
+
+
+async def get_gazetteer() -> Optional[Gazetteer]:
+    """Builds the index from the database once; returns None if the DB is unreachable."""
+    global _gazetteer, _load_lock
+    if _gazetteer is not None:
+        return _gazetteer
+    if _load_lock is None:
+        _load_lock = asyncio.Lock()
+    async with _load_lock:
+        if _gazetteer is None:
+            try:
+                rows = await asyncio.to_thread(load_hierarchy_rows)
+                if rows:
+                    _gazetteer = await asyncio.to_thread(build_gazetteer, rows)
+            except Exception as e:
+                logger.error(f"❌ Gazetteer load failed: {e}")
+    return _gazetteer
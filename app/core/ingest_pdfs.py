@@ -1,16 +1,17 @@
 import os
 import json
 import base64
-import psycopg2
 from dotenv import load_dotenv
 from pgvector.psycopg2 import register_vector
+from app.core.db import db_pool, register_once
 from pypdf import PdfReader
-from openai import OpenAI
+from app.core.llm import get_openai_client
+from app.core.answer_cache import answer_cache
+from app.core.embedding_cache import embedding_cache
 
 # 1. Setup
 load_dotenv()
-DB_URL = os.getenv("DATABASE_URL")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_openai_client()
 
 def get_ocr_from_gpt(file_path):
     """Fallback for scanned/hybrid pages: Cloud-based Vision OCR."""
@@ -41,15 +42,14 @@ def get_ocr_from_gpt(file_path):
 
 def ingest_all_pdfs():
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor()
-        register_vector(conn)
+        db_pool.check()
         print("✅ Connected to Neon DB.")
     except Exception as e:
         print(f"❌ DB Connection Error: {e}")
         return
 
     pdf_dir = "data/pdfs"
+    ingested = 0
     
     for filename in os.listdir(pdf_dir):
         if not filename.endswith(".pdf"): continue
@@ -72,27 +72,28 @@ def ingest_all_pdfs():
                 print(f"📄 Digital text found ({len(full_text)} chars).")
                 final_content = full_text
 
-            # Step C: Create Embedding (max 8000 chars for safety)
-            emb_resp = client.embeddings.create(
-                input=final_content[:8000], 
-                model="text-embedding-3-small"
-            )
-            vector = emb_resp.data[0].embedding
+            # Step C: Create Embedding (max 8000 chars for safety); unchanged
+            # documents are served from the embedding cache on re-ingestion
+            vector = embedding_cache.embed(final_content[:8000], "text-embedding-3-small")
             
-            # Step D: Save to Neon
-            cur.execute(
-                "INSERT INTO legal_documents (content, metadata, embedding) VALUES (%s, %s, %s)",
-                (final_content, json.dumps({"source": filename, "method": "smart_hybrid"}), vector)
-            )
-            conn.commit()
+            # Step D: Save to Neon (a pooled connection is held only for the insert)
+            with db_pool.connection() as conn:
+                register_once(conn, "vector", register_vector)
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO legal_documents (content, metadata, embedding) VALUES (%s, %s, %s)",
+                        (final_content, json.dumps({"source": filename, "method": "smart_hybrid"}), vector)
+                    )
+            ingested += 1
             print(f"✅ Ingested: {filename}")
 
         except Exception as e:
-            conn.rollback()
             print(f"❌ Failed {filename}: {e}")
 
-    cur.close()
-    conn.close()
+    # Cached audits were answered against the old documents
+    if ingested:
+        generation = answer_cache.invalidate()
+        print(f"🧹 Legal answer cache invalidated (generation {generation}).")
 
 if __name__ == "__main__":
     ingest_all_pdfs()
\ No newline at end of file
@@ -0,0 +1,230 @@
+# app/core/llm.py
+
+import os
+import time
+import threading
+import httpx
+import openai
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from app.utils.scheduler import TimingStats
+from app.utils.tracing import record_span
+
+load_dotenv()
+
+# --- SHARED CONNECTION POOL ---
+# Every chat model and raw OpenAI client reuses these two httpx clients, so a
+# swarm turn never pays for client construction or a fresh TLS handshake.
+_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=60,
+)
+_TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=10.0)
+
+_lock = threading.Lock()
+_http_client = None
+_http_async_client = None
+_sync_client = None
+_async_client = None
+_chat_models = {}
+
+
+def _shared_http_client() -> httpx.Client:
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_LIMITS, timeout=_TIMEOUT)
+        return _http_client
+
+
+def _shared_http_async_client() -> httpx.AsyncClient:
+    global _http_async_client
+    with _lock:
+        if _http_async_client is None:
+            _http_async_client = httpx.AsyncClient(limits=_LIMITS, timeout=_TIMEOUT)
+        return _http_async_client
+
+# --- USAGE TRACKING ---
+
+class ModelUsage:
+    """Per-model counters: calls, in-flight concurrency, latency and tokens."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = TimingStats()
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency": self.latency.snapshot(),
+        }
+
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def _model_usage(model: str) -> ModelUsage:
+    with _usage_lock:
+        if model not in _usage:
+            _usage[model] = ModelUsage()
+        return _usage[model]
+
+
+def call_started(model: str):
+    usage = _model_usage(model)
+    with _usage_lock:
+        usage.calls += 1
+        usage.in_flight += 1
+        usage.peak_in_flight = max(usage.peak_in_flight, usage.in_flight)
+
+
+def call_finished(model: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                  error: bool = False):
+    usage = _model_usage(model)
+    with _usage_lock:
+        usage.in_flight -= 1
+        usage.errors += int(error)
+        usage.prompt_tokens += prompt_tokens or 0
+        usage.completion_tokens += completion_tokens or 0
+        usage.latency.add(seconds)
+    # Every tracked call is also a span on the current turn's trace
+    record_span("llm", model, seconds, model=model, prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens, error="error" if error else None)
+
+
+class tracked_call:
+    """
+    Records a raw OpenAI client call. Assign the response to .response inside
+    the block so its token usage is counted:
+
+        with tracked_call("gpt-4o") as call:
+            call.response = client.chat.completions.create(...)
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.response = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        call_started(self.model)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        usage = getattr(self.response, "usage", None)
+        call_finished(
+            self.model,
+            time.perf_counter() - self.started,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0),
+            completion_tokens=getattr(usage, "completion_tokens", 0),
+            error=exc_type is not None,
+        )
+        return False
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Attached to every registry chat model; runs inline so it adds no executor hop."""
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+        call_started(self.model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        call_finished(
+            self.model,
+            time.perf_counter() - started,
+            prompt_tokens=token_usage.get("prompt_tokens", 0),
+            completion_tokens=token_usage.get("completion_tokens", 0),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            call_finished(self.model, time.perf_counter() - started, error=True)
+
+# --- PUBLIC API ---
+
+def get_chat_model(model: str = "gpt-4o-mini", temperature: float = 0) -> ChatOpenAI:
+    """Returns the long-lived ChatOpenAI for (model, temperature)."""
+    key = (model, float(temperature))
+    chat = _chat_models.get(key)
+    if chat is None:
+        chat = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            http_client=_shared_http_client(),
+            http_async_client=_shared_http_async_client(),
+            callbacks=[UsageCallback(model)],
+        )
+        with _lock:
+            chat = _chat_models.setdefault(key, chat)
+    return chat
+
+
+def get_openai_client() -> openai.OpenAI:
+    """Shared sync OpenAI client (embeddings, Whisper, raw chat completions)."""
+    global _sync_client
+    if _sync_client is None:
+        client = openai.OpenAI(http_client=_shared_http_client())
+        with _lock:
+            if _sync_client is None:
+                _sync_client = client
+    return _sync_client
+
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """Shared async OpenAI client."""
+    global _async_client
+    if _async_client is None:
+        client = openai.AsyncOpenAI(http_client=_shared_http_async_client())
+        with _lock:
+            if _async_client is None:
+                _async_client = client
+    return _async_client
+
+
+async def close_clients():
+    """
+    Closes the shared connection pool on shutdown and forgets every client
+    built on it, so a later get_* call builds fresh ones instead of a closed one.
+    """
+    global _http_client, _http_async_client, _sync_client, _async_client
+    with _lock:
+        http_client, http_async_client = _http_client, _http_async_client
+        _http_client = _http_async_client = None
+        _sync_client = _async_client = None
+        _chat_models.clear()
+    if http_async_client is not None:
+        await http_async_client.aclose()
+    if http_client is not None:
+        http_client.close()
+
+
+def llm_stats() -> dict:
+    with _usage_lock:
+        return {
+            "chat_models": [f"{m}@{t}" for m, t in _chat_models],
+            "models": {model: usage.snapshot() for model, usage in _usage.items()},
+        }
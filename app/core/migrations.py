@@ -0,0 +1,321 @@
+# app/core/migrations.py
+#
+# Versioned schema & index migrations for the tables the tools query.
+# Applied versions are recorded in schema_migrations; every statement is
+# idempotent, so running it against the existing Neon database only adds
+# what is missing. Run it as a release step, not at startup:
+#
+#     python -m app.core.migrations            # apply everything pending
+#     python -m app.core.migrations --list     # applied / pending versions
+#     python -m app.core.migrations --dry-run  # print the SQL instead
+
+import time
+import logging
+import argparse
+from typing import NamedTuple
+from dotenv import load_dotenv
+from app.core.db import db_pool
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Session-level advisory lock, so two hosts deploying at once don't race
+MIGRATION_LOCK_ID = 72_033_001
+
+
+class Index(NamedTuple):
+    name: str
+    table: str
+    definition: str  # everything after "ON <table>"
+
+    def create_sql(self) -> str:
+        # CONCURRENTLY: builds without blocking the tools' reads and writes
+        return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} ON {self.table} {self.definition};"
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: tuple = ()  # run together in one transaction
+    indexes: tuple = ()     # built one by one, outside any transaction
+
+
+# --- 1. MIGRATIONS ---
+
+MIGRATIONS = (
+    Migration(1, "extensions", statements=(
+        "CREATE EXTENSION IF NOT EXISTS vector;",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    )),
+
+    # The tables already exist on Neon; this lets a fresh local Postgres be seeded
+    Migration(2, "baseline_tables", statements=(
+        """
+        CREATE TABLE IF NOT EXISTS administrative_hierarchy (
+            id             SERIAL PRIMARY KEY,
+            district       TEXT NOT NULL,
+            block          TEXT NOT NULL,
+            gram_panchayat TEXT,
+            village        TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS vetted_jobs (
+            id               SERIAL PRIMARY KEY,
+            job_title        TEXT NOT NULL,
+            description      TEXT,
+            category         TEXT,
+            pay_rate_daily   NUMERIC,
+            duration_days    INTEGER,
+            start_date       DATE,
+            district         TEXT,
+            block            TEXT,
+            gram_panchayat   TEXT,
+            village          TEXT,
+            ngo_partner_name TEXT,
+            contact_person   TEXT,
+            contact_number   TEXT,
+            safety_score     REAL NOT NULL DEFAULT 5.0,
+            is_active        BOOLEAN NOT NULL DEFAULT TRUE,
+            created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS self_help_groups (
+            id             SERIAL PRIMARY KEY,
+            shg_name       TEXT NOT NULL,
+            leader_name    TEXT,
+            contact_number TEXT,
+            district       TEXT,
+            block          TEXT,
+            gram_panchayat TEXT,
+            village        TEXT,
+            category       TEXT,
+            formation_date DATE,
+            nrlm_shg_id    TEXT UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS training_programs (
+            id                  SERIAL PRIMARY KEY,
+            course_name         TEXT NOT NULL,
+            agency_name         TEXT,
+            category            TEXT,
+            skill_level         TEXT,
+            duration_hours      INTEGER,
+            enrollment_deadline DATE,
+            course_fee          NUMERIC,
+            stipend_provided    BOOLEAN,
+            certification_type  TEXT,
+            min_wage_guarantee  NUMERIC,
+            district            TEXT,
+            location_details    TEXT,
+            source_url          TEXT
+        );
+        CREATE TABLE IF NOT EXISTS user_profile (
+            phone_number       TEXT PRIMARY KEY,
+            full_name          TEXT,
+            preferred_lang     TEXT,
+            district           TEXT,
+            block              TEXT,
+            village            TEXT,
+            primary_occupation TEXT,
+            skill_level        TEXT
+        );
+        CREATE TABLE IF NOT EXISTS safety_reports (
+            id          SERIAL PRIMARY KEY,
+            user_id     TEXT,
+            description TEXT,
+            category    TEXT,
+            district    TEXT,
+            block       TEXT,
+            village     TEXT,
+            lat         DOUBLE PRECISION,
+            lon         DOUBLE PRECISION,
+            reported_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS legal_documents (
+            id        BIGSERIAL PRIMARY KEY,
+            content   TEXT NOT NULL,
+            metadata  JSONB,
+            embedding vector(1536)
+        );
+        """,
+        # The dashboard's map columns need PostGIS, which a plain local Postgres may lack
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis') THEN
+                ALTER TABLE self_help_groups ADD COLUMN IF NOT EXISTS location_geog geography(Point, 4326);
+                ALTER TABLE administrative_hierarchy ADD COLUMN IF NOT EXISTS village_center_geog geography(Point, 4326);
+            END IF;
+        END $$;
+        """,
+    )),
+
+    Migration(3, "tool_query_indexes", indexes=(
+        # match_local_jobs: one index per OR branch so the planner can BitmapOr them
+        Index("idx_vetted_jobs_active_village", "vetted_jobs", "(village) WHERE is_active"),
+        Index("idx_vetted_jobs_active_district", "vetted_jobs", "(district) WHERE is_active"),
+        # ...the block branch, and the safety-report penalty (village = AND block =)
+        Index("idx_vetted_jobs_block_village", "vetted_jobs", "(block, village)"),
+        # ...and the three ILIKE '%skill%' branches
+        Index("idx_vetted_jobs_active_trgm", "vetted_jobs",
+              "USING gin (job_title gin_trgm_ops, category gin_trgm_ops, description gin_trgm_ops) WHERE is_active"),
+        # find_nearby_shgs: village = OR block = OR district =
+        Index("idx_shg_village", "self_help_groups", "(village)"),
+        Index("idx_shg_block_village", "self_help_groups", "(block, village)"),
+        Index("idx_shg_district_block", "self_help_groups", "(district, block)"),
+        # match_training_programs: district / course_name / category ILIKE
+        Index("idx_training_trgm", "training_programs",
+              "USING gin (district gin_trgm_ops, course_name gin_trgm_ops, category gin_trgm_ops)"),
+        # Location menus: DISTINCT block WHERE district = / DISTINCT village WHERE block =
+        Index("idx_admin_hierarchy_district_block_village", "administrative_hierarchy", "(district, block, village)"),
+        Index("idx_admin_hierarchy_block_village", "administrative_hierarchy", "(block, village)"),
+    )),
+
+    # The dashboard matches on UPPER(district) / UPPER(block), which plain indexes can't serve
+    Migration(4, "dashboard_expression_indexes", indexes=(
+        Index("idx_shg_upper_district_block", "self_help_groups", "(UPPER(district), UPPER(block))"),
+        Index("idx_shg_upper_block_village", "self_help_groups", "(UPPER(block), UPPER(village))"),
+        Index("idx_user_profile_upper_district_block", "user_profile", "(UPPER(district), UPPER(block))"),
+        Index("idx_user_profile_upper_block_village", "user_profile", "(UPPER(block), UPPER(village))"),
+        Index("idx_training_upper_district", "training_programs", "(UPPER(district))"),
+        Index("idx_vetted_jobs_upper_district_block", "vetted_jobs", "(UPPER(district), UPPER(block))"),
+        Index("idx_admin_hierarchy_upper_district_block", "administrative_hierarchy",
+              "(UPPER(district), UPPER(block))"),
+        Index("idx_safety_reports_lat_lon", "safety_reports", "(lat, lon)"),
+    )),
+
+    # retrieve_documents orders by embedding <=> query (cosine distance); without an
+    # ANN index every audit scans and sorts the whole corpus
+    Migration(5, "legal_documents_hnsw", indexes=(
+        Index("idx_legal_documents_embedding_hnsw", "legal_documents",
+              "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"),
+    )),
+)
+
+MANAGED_INDEXES = tuple(index for m in MIGRATIONS for index in m.indexes)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# --- 2. RUNNER ---
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """)
+
+
+def applied_versions() -> dict:
+    """{version: applied_at} for every migration already run."""
+    with db_pool.cursor() as cur:
+        _ensure_table(cur)
+        cur.execute("SELECT version, applied_at FROM schema_migrations ORDER BY version;")
+        return dict(cur.fetchall())
+
+
+def pending(target: int = None) -> list:
+    done = applied_versions()
+    return [m for m in MIGRATIONS if m.version not in done and (target is None or m.version <= target)]
+
+
+def _drop_if_invalid(cur, index: Index):
+    """A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would skip."""
+    cur.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid;
+    """, (index.name,))
+    if cur.fetchone():
+        logger.warning(f"⚠️ Rebuilding invalid index {index.name} left by an interrupted migration")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name};")
+
+
+def _apply(conn, migration: Migration):
+    if migration.statements:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                for sql in migration.statements:
+                    cur.execute(sql)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with conn.cursor() as cur:
+        for index in migration.indexes:
+            started = time.perf_counter()
+            _drop_if_invalid(cur, index)
+            cur.execute(index.create_sql())
+            logger.info(f"🧱 {index.name} ready ({time.perf_counter() - started:.1f}s)")
+        cur.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s) ON CONFLICT (version) DO NOTHING;",
+            (migration.version, migration.name),
+        )
+
+
+def migrate(target: int = None) -> list:
+    """Applies pending migrations up to `target` (default: all) and returns their versions."""
+    applied = []
+    with db_pool.connection(timeout=60) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+        try:
+            with conn.cursor() as cur:
+                _ensure_table(cur)
+                cur.execute("SELECT version FROM schema_migrations;")
+                done = {row[0] for row in cur.fetchall()}
+
+            for migration in MIGRATIONS:
+                if migration.version in done or (target is not None and migration.version > target):
+                    continue
+                started = time.perf_counter()
+                logger.info(f"🛠️ Applying migration {migration.version:03d} {migration.name}...")
+                _apply(conn, migration)
+                applied.append(migration.version)
+                logger.info(
+                    f"✅ Migration {migration.version:03d} {migration.name} applied "
+                    f"({time.perf_counter() - started:.1f}s)"
+                )
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+
+    if applied:
+        # Fresh statistics so the planner costs the new indexes right away
+        with db_pool.cursor() as cur:
+            for table in sorted({index.table for m in MIGRATIONS if m.version in applied for index in m.indexes}):
+                cur.execute(f"ANALYZE {table};")
+    else:
+        logger.info("✅ Schema is up to date.")
+    return applied
+
+
+def render_sql(migrations) -> str:
+    parts = []
+    for m in migrations:
+        parts.append(f"-- {m.version:03d} {m.name}")
+        parts += [sql.strip() for sql in m.statements]
+        parts += [index.create_sql() for index in m.indexes]
+    return "\n\n".join(parts)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Apply EmpowerNet schema & index migrations.")
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    parser.add_argument("--list", action="store_true", help="show applied and pending versions")
+    parser.add_argument("--dry-run", action="store_true", help="print the pending SQL without running it")
+    args = parser.parse_args()
+
+    if args.list:
+        done = applied_versions()
+        for m in MIGRATIONS:
+            status = f"applied {done[m.version]:%Y-%m-%d %H:%M}" if m.version in done else "pending"
+            print(f"{m.version:03d} {m.name:<32} {status}")
+    elif args.dry_run:
+        print(render_sql(pending(args.target)) or "-- nothing pending")
+    else:
+        migrate(args.target)
+    db_pool.close()
@@ -1,89 +1,97 @@
-import os
 import logging
 from dotenv import load_dotenv
-import psycopg2
+from app.core.db import db_pool, register_once
 from pgvector.psycopg2 import register_vector
-from openai import OpenAI
+from app.core.llm import get_openai_client, tracked_call
+from app.core.answer_cache import answer_cache
+from app.core.embedding_cache import embedding_cache
+from app.core.context_packer import build_context, pack_by_chars
 
 # 1. Setup
 load_dotenv()
-DB_URL = os.getenv("DATABASE_URL")
-if DB_URL and DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_openai_client()
 logger = logging.getLogger(__name__)
 
+AUDIT_SYSTEM_PROMPT = (
+    "You are the EmpowerNet Legal Expert specializing in West Bengal Labor Laws (2026). "
+    "Your goal is to audit a worker's situation against the provided law context.\n\n"
+    "Check for the following markers:\n"
+    "1. WAGES: Is the pay below the minimum wage for their skill/zone?\n"
+    "2. OVERTIME: Are they working >48hrs/week or >9hrs/day without double pay?\n"
+    "3. SAFETY: Does the job lack safety gear, night-shift transport, or CCTV?\n"
+    "4. MATERNITY: Are they being denied the 26-week leave or nursing breaks?\n"
+    "5. DISCRIMINATION: Is there a gender pay gap for similar work?\n\n"
+    "Provide a clear audit report identifying any violations."
+)
+
+def retrieve_documents(query_vector, limit: int = 12) -> list:
+    """(content, metadata) rows nearest to the query in pgvector."""
+    with db_pool.connection() as conn:
+        register_once(conn, "vector", register_vector)
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT content, metadata 
+                FROM legal_documents 
+                ORDER BY embedding <=> %s::vector 
+                LIMIT %s
+            """, (query_vector, limit))
+            return cur.fetchall()
+
+def audit_messages(query: str, context: str) -> list:
+    return [
+        {"role": "system", "content": AUDIT_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{context}\n\nWorker's Question/Situation: {query}"}
+    ]
+
+def run_audit(query: str, context: str):
+    """The multi-rights GPT-4o audit; returns the raw completion (usage included)."""
+    with tracked_call("gpt-4o") as call:
+        call.response = client.chat.completions.create(model="gpt-4o", messages=audit_messages(query, context))
+    return call.response
+
 def empower_search(query: str):
     """
     EmpowerNet RAG Search: Retrieves 2026 Labor Laws for wages, 
     safety standards, and worker rights.
     """
     try:
-        # Generate embedding for the query
-        resp = client.embeddings.create(
-            input=query,
-            model="text-embedding-3-small"
-        )
-        query_vector = resp.data[0].embedding
+        # Templated queries repeat across thousands of workers; reuse their audit
+        cached = answer_cache.get(query)
+        if cached is not None:
+            return cached
 
-        # Database connection
-        conn = psycopg2.connect(DB_URL)
-        register_vector(conn)
-        cur = conn.cursor()
+        # Generate embedding for the query (repeats are served from the embedding cache)
+        query_vector = embedding_cache.embed(query, "text-embedding-3-small")
 
         # Semantic Search in pgvector
-        cur.execute("""
-            SELECT content, metadata 
-            FROM legal_documents 
-            ORDER BY embedding <=> %s::vector 
-            LIMIT 12
-        """, (query_vector,))
-        
-        results = cur.fetchall()
+        results = retrieve_documents(query_vector)
         
         if not results:
             return "I couldn't find any specific legal rules for that request."
 
-        # --- TOKEN SAFETY VALVE ---
-        context_parts = []
-        total_chars = 0
-        MAX_CHARS = 22000 # Safety limit for context window
-
-        for res in results:
-            text = res[0]
-            if total_chars + len(text) > MAX_CHARS:
-                break
-            context_parts.append(text)
-            total_chars += len(text)
-        
-        context = "\n---\n".join(context_parts)
+        # --- TOKEN BUDGET ---
+        # Whole documents are split into passages, near-duplicates dropped and
+        # the most relevant, least redundant passages packed up to RAG_CONTEXT_TOKENS
+        try:
+            packed = build_context(
+                query, query_vector, results,
+                embed_many=lambda texts: embedding_cache.embed_many(texts, "text-embedding-3-small"),
+            )
+            context = packed.text
+            logger.info(
+                f"📚 RAG context: {len(packed.passages)}/{packed.candidate_passages} passages, "
+                f"{packed.tokens} tokens, {packed.duplicates_dropped} duplicates dropped"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Context packing failed, using whole documents: {e}")
+            context = ""
+        context = context or pack_by_chars(results)
 
         # 2. THE MULTI-RIGHTS AUDIT PROMPT
-        chat_resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": (
-                        "You are the EmpowerNet Legal Expert specializing in West Bengal Labor Laws (2026). "
-                        "Your goal is to audit a worker's situation against the provided law context.\n\n"
-                        "Check for the following markers:\n"
-                        "1. WAGES: Is the pay below the minimum wage for their skill/zone?\n"
-                        "2. OVERTIME: Are they working >48hrs/week or >9hrs/day without double pay?\n"
-                        "3. SAFETY: Does the job lack safety gear, night-shift transport, or CCTV?\n"
-                        "4. MATERNITY: Are they being denied the 26-week leave or nursing breaks?\n"
-                        "5. DISCRIMINATION: Is there a gender pay gap for similar work?\n\n"
-                        "Provide a clear audit report identifying any violations."
-                    )
-                },
-                {"role": "user", "content": f"Context:\n{context}\n\nWorker's Question/Situation: {query}"}
-            ]
-        )
-        
-        cur.close()
-        conn.close()
-        return chat_resp.choices[0].message.content
+        chat_resp = run_audit(query, context)
+        answer = chat_resp.choices[0].message.content
+        answer_cache.put(query, answer)
+        return answer
 
     except Exception as e:
         logger.error(f"❌ EmpowerNet Search Error: {e}")
@@ -91,4 +99,4 @@ def empower_search(query: str):
 
 if __name__ == "__main__":
     q = input("Ask EmpowerNet a legal or safety question: ")
-    print("\n⚖️ EmpowerNet Audit Result:\n", empower_search(q))
\ No newline at end of file
+    print("\n⚖️ EmpowerNet Audit Result:\n", empower_search(q))
@@ -0,0 +1,147 @@
+# app/core/stores.py
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# While Postgres is unreachable a store serves local disk and retries this often
+REPROBE_SECONDS = float(os.getenv("STORE_REPROBE_SECONDS", "60"))
+
+# --- 1. BASE STORES ---
+# The caches and the checkpointer each keep a SQLite file on local disk and the
+# same tables in Postgres; subclasses only declare the schema and the queries.
+
+class SQLiteStore:
+    """Local-disk store shared by all workers on the host."""
+    SCHEMA = ""
+    PRAGMAS = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        for pragma in self.PRAGMAS:
+            self._conn.execute(f"PRAGMA {pragma};")
+        self._conn.executescript(self.SCHEMA)
+
+
+class PostgresStore:
+    """Store on the shared database, so an entry made on any host serves every host."""
+    SCHEMA = ""
+
+    def __init__(self):
+        from app.core.db import db_pool
+
+        self._pool = db_pool
+        with self._pool.cursor() as cur:
+            cur.execute(self.SCHEMA)
+
+# --- 2. BACKEND SELECTION ---
+
+_opened = []
+
+
+class FallbackStore:
+    """
+    Opens the configured store on first use rather than at import. If the
+    Postgres store can't be reached it serves the SQLite one and re-probes
+    Postgres in the background, so a short outage during a deploy doesn't pin
+    a worker to its local cache for good. Every other attribute is forwarded
+    to the store in use.
+    """
+
+    def __init__(self, label: str, postgres, sqlite, reprobe_seconds: float = REPROBE_SECONDS):
+        self.label = label
+        self._postgres = postgres
+        self._sqlite = sqlite
+        self.reprobe_seconds = reprobe_seconds
+        self._lock = threading.Lock()
+        self._store = None
+        self._local = None
+        self._retry_at = None
+        self._probing = False
+        self.fallbacks = 0
+        _opened.append(self)
+
+    @property
+    def store(self):
+        store = self._store
+        if store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self._open()
+                store = self._store
+        elif self._retry_at is not None and time.monotonic() >= self._retry_at:
+            self._start_reprobe()
+        return store
+
+    @property
+    def backend(self) -> str:
+        return type(self._store).__name__ if self._store is not None else "not opened"
+
+    def _open(self):
+        if self._postgres is None:
+            return self._sqlite()
+        try:
+            return self._postgres()
+        except Exception as e:
+            self.fallbacks += 1
+            logger.error(f"❌ {self.label} store unavailable, using local disk until Postgres is back: {e}")
+            self._retry_at = time.monotonic() + self.reprobe_seconds
+            if self._local is None:
+                self._local = self._sqlite()
+            return self._local
+
+    def _start_reprobe(self):
+        with self._lock:
+            if self._probing or self._retry_at is None or time.monotonic() < self._retry_at:
+                return
+            self._probing = True
+        threading.Thread(target=self._reprobe, name=f"reprobe-{self.label}", daemon=True).start()
+
+    def _reprobe(self):
+        try:
+            store = self._postgres()
+        except Exception as e:
+            logger.warning(f"⚠️ {self.label} store still unavailable, staying on local disk: {e}")
+            with self._lock:
+                self._retry_at = time.monotonic() + self.reprobe_seconds
+                self._probing = False
+            return
+        with self._lock:
+            self._store, self._retry_at, self._probing = store, None, False
+        logger.info(f"✅ {self.label} store back on Postgres")
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def select_store(label: str, kind: str, postgres, sqlite) -> FallbackStore:
+    """Store for `kind` ("postgres" or "sqlite"); postgres and sqlite are the store factories."""
+    return FallbackStore(label, postgres if kind.lower() == "postgres" else None, sqlite)
+
+
+def backend_name(store) -> str:
+    """Class name of the store actually serving, for /stats."""
+    return store.backend if isinstance(store, FallbackStore) else type(store).__name__
+
+
+def open_stores() -> dict:
+    """Opens every selected store (warm-up); blocking, so run it on a worker thread."""
+    opened = {}
+    for selector in list(_opened):
+        try:
+            selector.store
+            opened[selector.label] = selector.backend
+        except Exception as e:
+            opened[selector.label] = f"failed: {e}"
+    return opened
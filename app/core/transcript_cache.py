@@ -0,0 +1,273 @@
+# app/core/transcript_cache.py
+
+import os
+import time
+import struct
+import asyncio
+import logging
+from dotenv import load_dotenv
+from app.core.stores import SQLiteStore, PostgresStore, select_store, backend_name
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(30 * 86400)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "50000"))
+DEFAULT_SQLITE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", ".cache/transcripts.sqlite3")
+
+# whisper-1 list price, used only to report what the cache saves
+WHISPER_USD_PER_MINUTE = 0.006
+# Fallback when the OGG duration can't be read: WhatsApp voice notes are ~16 kbps Opus
+VOICE_NOTE_BYTES_PER_SECOND = 2000
+
+
+def ogg_duration_seconds(tail: bytes, total_bytes: int) -> float:
+    """
+    Reads the duration from the granule position of the last OGG page
+    (Opus always runs at 48 kHz). Falls back to a bitrate estimate.
+    """
+    idx = tail.rfind(b"OggS")
+    if idx != -1 and idx + 14 <= len(tail):
+        granule = struct.unpack_from("<q", tail, idx + 6)[0]
+        if granule > 0:
+            return granule / 48000
+    return total_bytes / VOICE_NOTE_BYTES_PER_SECOND
+
+# --- 1. BACKENDS ---
+# Transcripts are keyed by the SHA-256 of the audio; media IDs are aliases onto that key.
+
+class SQLiteTranscriptStore(SQLiteStore):
+    PRUNE_EVERY = 200
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS audio_transcripts (
+            audio_sha256  TEXT PRIMARY KEY,
+            transcript    TEXT NOT NULL,
+            audio_seconds REAL NOT NULL,
+            created_at    REAL NOT NULL,
+            last_used     REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS audio_media_ids (
+            media_id     TEXT PRIMARY KEY,
+            audio_sha256 TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_audio_transcripts_last_used ON audio_transcripts (last_used);
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        super().__init__(path)
+
+    def get(self, sha256: str, now: float):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT transcript, audio_seconds FROM audio_transcripts WHERE audio_sha256 = ? AND created_at >= ?;",
+                (sha256, now - self.ttl_seconds),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE audio_transcripts SET last_used = ? WHERE audio_sha256 = ?;", (now, sha256))
+            return row
+
+    def get_by_media(self, media_id: str, now: float):
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT t.transcript, t.audio_seconds FROM audio_media_ids m
+                JOIN audio_transcripts t ON t.audio_sha256 = m.audio_sha256
+                WHERE m.media_id = ? AND t.created_at >= ?;
+            """, (media_id, now - self.ttl_seconds)).fetchone()
+            return row
+
+    def alias(self, media_id: str, sha256: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audio_media_ids (media_id, audio_sha256) VALUES (?, ?);",
+                (media_id, sha256),
+            )
+
+    def put(self, sha256: str, transcript: str, audio_seconds: float, now: float):
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO audio_transcripts (audio_sha256, transcript, audio_seconds, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?);
+            """, (sha256, transcript, audio_seconds, now, now))
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        # TTL first, then least-recently-used beyond max_entries, then orphaned aliases
+        self._conn.execute("DELETE FROM audio_transcripts WHERE created_at < ?;", (now - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM audio_transcripts WHERE audio_sha256 IN (
+                SELECT audio_sha256 FROM audio_transcripts ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            );
+        """, (self.max_entries,))
+        self._conn.execute("""
+            DELETE FROM audio_media_ids
+            WHERE audio_sha256 NOT IN (SELECT audio_sha256 FROM audio_transcripts);
+        """)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM audio_transcripts;").fetchone()[0]
+
+
+class PostgresTranscriptStore(PostgresStore):
+    """Shared store so every host benefits from a transcript made by any other."""
+    PRUNE_EVERY = 200
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS audio_transcripts (
+            audio_sha256  TEXT PRIMARY KEY,
+            transcript    TEXT NOT NULL,
+            audio_seconds REAL NOT NULL,
+            created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_used     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS audio_media_ids (
+            media_id     TEXT PRIMARY KEY,
+            audio_sha256 TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_audio_transcripts_last_used ON audio_transcripts (last_used);
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        super().__init__()
+
+    def get(self, sha256: str, now: float):
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                UPDATE audio_transcripts SET last_used = TO_TIMESTAMP(%s)
+                WHERE audio_sha256 = %s AND created_at >= TO_TIMESTAMP(%s)
+                RETURNING transcript, audio_seconds;
+            """, (now, sha256, now - self.ttl_seconds))
+            return cur.fetchone()
+
+    def get_by_media(self, media_id: str, now: float):
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                SELECT t.transcript, t.audio_seconds FROM audio_media_ids m
+                JOIN audio_transcripts t ON t.audio_sha256 = m.audio_sha256
+                WHERE m.media_id = %s AND t.created_at >= TO_TIMESTAMP(%s);
+            """, (media_id, now - self.ttl_seconds))
+            return cur.fetchone()
+
+    def alias(self, media_id: str, sha256: str):
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                INSERT INTO audio_media_ids (media_id, audio_sha256) VALUES (%s, %s)
+                ON CONFLICT (media_id) DO UPDATE SET audio_sha256 = EXCLUDED.audio_sha256;
+            """, (media_id, sha256))
+
+    def put(self, sha256: str, transcript: str, audio_seconds: float, now: float):
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                INSERT INTO audio_transcripts (audio_sha256, transcript, audio_seconds, created_at, last_used)
+                VALUES (%s, %s, %s, TO_TIMESTAMP(%s), TO_TIMESTAMP(%s))
+                ON CONFLICT (audio_sha256) DO UPDATE SET
+                    transcript = EXCLUDED.transcript,
+                    created_at = EXCLUDED.created_at,
+                    last_used = EXCLUDED.last_used;
+            """, (sha256, transcript, audio_seconds, now, now))
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                cur.execute("DELETE FROM audio_transcripts WHERE created_at < TO_TIMESTAMP(%s);",
+                            (now - self.ttl_seconds,))
+                cur.execute("""
+                    DELETE FROM audio_transcripts WHERE audio_sha256 IN (
+                        SELECT audio_sha256 FROM audio_transcripts ORDER BY last_used DESC OFFSET %s
+                    );
+                """, (self.max_entries,))
+                cur.execute("""
+                    DELETE FROM audio_media_ids m WHERE NOT EXISTS (
+                        SELECT 1 FROM audio_transcripts t WHERE t.audio_sha256 = m.audio_sha256
+                    );
+                """)
+
+    def size(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM audio_transcripts;")
+            return cur.fetchone()[0]
+
+# --- 2. THE CACHE ---
+
+class TranscriptCache:
+    """
+    Content-addressed transcript cache in front of Whisper.
+    Forwarded and re-sent voice notes hit by audio hash; a media ID we have
+    seen before hits without downloading the audio at all.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.media_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.seconds_saved = 0.0
+
+    async def _call(self, method: str, *args):
+        # The store is resolved on the worker thread too: opening it may connect to Postgres
+        try:
+            return await asyncio.to_thread(lambda: getattr(self.store, method)(*args))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Transcript Cache Error: {e}")
+            return None
+
+    async def lookup_media(self, media_id: str):
+        """Returns the cached transcript for a Meta media ID, or None."""
+        if not media_id:
+            return None
+        row = await self._call("get_by_media", media_id, time.time())
+        if row:
+            self.media_hits += 1
+            self.seconds_saved += row[1]
+            return row[0]
+        return None
+
+    async def lookup_audio(self, sha256: str, media_id: str = None):
+        """Returns the cached transcript for the audio hash, or None (counted as a miss)."""
+        row = await self._call("get", sha256, time.time())
+        if row:
+            self.hash_hits += 1
+            self.seconds_saved += row[1]
+            if media_id:
+                await self._call("alias", media_id, sha256)
+            logger.info(f"♻️ Transcript cache hit for audio {sha256[:12]}")
+            return row[0]
+        self.misses += 1
+        return None
+
+    async def store_transcript(self, sha256: str, transcript: str, audio_seconds: float, media_id: str = None):
+        await self._call("put", sha256, transcript, audio_seconds, time.time())
+        if media_id:
+            await self._call("alias", media_id, sha256)
+
+    def stats(self) -> dict:
+        hits = self.media_hits + self.hash_hits
+        total = hits + self.misses
+        return {
+            "backend": backend_name(self.store),
+            "media_id_hits": self.media_hits,
+            "hash_hits": self.hash_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "audio_minutes_saved": round(self.seconds_saved / 60, 2),
+            "estimated_usd_saved": round(self.seconds_saved / 60 * WHISPER_USD_PER_MINUTE, 4),
+        }
+
+
+def build_transcript_cache(kind: str = None) -> TranscriptCache:
+    """Creates the cache selected by TRANSCRIPT_CACHE_BACKEND (sqlite or postgres); the store opens on first use."""
+    kind = kind or os.getenv("TRANSCRIPT_CACHE_BACKEND", "sqlite")
+    return TranscriptCache(select_store("Transcript", kind, PostgresTranscriptStore, SQLiteTranscriptStore))
+
+
+transcript_cache = build_transcript_cache()
@@ -0,0 +1,259 @@
+# app/core/translation_cache.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.core.stores import SQLiteStore, PostgresStore, select_store, backend_name
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.getenv("UI_TRANSLATION_PATH", ".cache/ui_translations.sqlite3")
+LRU_SIZE = int(os.getenv("UI_TRANSLATION_LRU_SIZE", "20000"))
+BATCH_SIZE = int(os.getenv("UI_TRANSLATION_BATCH_SIZE", "50"))
+
+# --- 1. BACKENDS ---
+# One row per (canonical English name, language). Place names never change, so
+# rows have no TTL; the bulk job (scripts/translate_hierarchy.py) fills the table.
+
+class SQLiteTranslationStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ui_translations (
+            source_text TEXT NOT NULL,
+            language    TEXT NOT NULL,
+            translated  TEXT NOT NULL,
+            created_at  REAL NOT NULL,
+            PRIMARY KEY (source_text, language)
+        );
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        super().__init__(path)
+
+    def get_many(self, language: str, names: list) -> dict:
+        placeholders = ",".join("?" * len(names))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT source_text, translated FROM ui_translations "
+                f"WHERE language = ? AND source_text IN ({placeholders});",
+                (language, *names),
+            ).fetchall()
+        return dict(rows)
+
+    def put_many(self, language: str, translations: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ui_translations (source_text, language, translated, created_at) "
+                "VALUES (?, ?, ?, ?);",
+                [(name, language, text, now) for name, text in translations.items()],
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ui_translations;").fetchone()[0]
+
+
+class PostgresTranslationStore(PostgresStore):
+    """Shared store: one bulk run serves every host."""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ui_translations (
+            source_text TEXT NOT NULL,
+            language    TEXT NOT NULL,
+            translated  TEXT NOT NULL,
+            created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (source_text, language)
+        );
+    """
+
+    def get_many(self, language: str, names: list) -> dict:
+        with self._pool.cursor() as cur:
+            cur.execute(
+                "SELECT source_text, translated FROM ui_translations "
+                "WHERE language = %s AND source_text = ANY(%s);",
+                (language, list(names)),
+            )
+            return dict(cur.fetchall())
+
+    def put_many(self, language: str, translations: dict):
+        from psycopg2.extras import execute_values
+
+        with self._pool.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO ui_translations (source_text, language, translated) VALUES %s
+                ON CONFLICT (source_text, language) DO UPDATE SET
+                    translated = EXCLUDED.translated,
+                    created_at = NOW();
+            """, [(name, language, text) for name, text in translations.items()])
+
+    def size(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM ui_translations;")
+            return cur.fetchone()[0]
+
+# --- 2. LLM BATCH TRANSLATION (cache misses & bulk job) ---
+
+async def translate_batch(names: list, language: str) -> dict:
+    """
+    Transliterates place names into the target script in one call.
+    Returns {name: translation} for the names the model answered; names it
+    skipped or mangled are simply absent, never positionally misaligned.
+    """
+    from app.core.llm import get_chat_model
+
+    llm = get_chat_model("gpt-4o-mini", temperature=0).bind(response_format={"type": "json_object"})
+    prompt = (
+        f"Write these West Bengal administrative place names in {language} script, as a local "
+        "would spell them. Reply with a JSON object whose keys are the names exactly as given "
+        f"and whose values are the {language} spellings.\n\n" + json.dumps(names, ensure_ascii=False)
+    )
+    data = json.loads((await llm.ainvoke(prompt)).content)
+    return {
+        name: str(data[name]).strip()
+        for name in names
+        if isinstance(data.get(name), str) and data[name].strip()
+    }
+
+# --- 3. THE CACHE ---
+
+class TranslationCache:
+    """
+    In-process LRU in front of the ui_translations table. Misses are translated
+    in batches, served immediately and written back in the background.
+    """
+
+    def __init__(self, store, lru_size: int = LRU_SIZE, batch_size: int = BATCH_SIZE):
+        self.store = store
+        self.lru_size = lru_size
+        self.batch_size = batch_size
+        self._lru = OrderedDict()
+        self._inflight = {}
+        self._write_tasks = set()
+        self.lru_hits = 0
+        self.store_hits = 0
+        self.llm_translated = 0
+        self.llm_calls = 0
+        self.untranslated = 0
+        self.errors = 0
+
+    def _remember(self, language: str, translations: dict):
+        for name, text in translations.items():
+            self._lru[(name, language)] = text
+            self._lru.move_to_end((name, language))
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def _from_store(self, language: str, names: list) -> dict:
+        try:
+            return await asyncio.to_thread(lambda: self.store.get_many(language, names))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ UI Translation Store Error: {e}")
+            return {}
+
+    async def _write_back(self, language: str, translations: dict):
+        try:
+            await asyncio.to_thread(lambda: self.store.put_many(language, translations))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ UI Translation write-back failed: {e}")
+
+    async def _translate_missing(self, language: str, names: list) -> dict:
+        results = {}
+        batches = [names[i:i + self.batch_size] for i in range(0, len(names), self.batch_size)]
+        outcomes = await asyncio.gather(*[translate_batch(b, language) for b in batches], return_exceptions=True)
+        self.llm_calls += len(batches)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                self.errors += 1
+                logger.error(f"❌ UI Translation failed: {outcome}")
+                continue
+            results.update(outcome)
+        if results:
+            self.llm_translated += len(results)
+            task = asyncio.create_task(self._write_back(language, results))
+            self._write_tasks.add(task)
+            task.add_done_callback(self._write_tasks.discard)
+        return results
+
+    async def translate(self, names: list, language: str) -> list:
+        """
+        Returns names in the target script, in order. Anything that cannot be
+        translated right now is shown in its canonical English form.
+        """
+        if not names or not language or language.lower() == "english":
+            return names
+
+        found = {}
+        missing = []
+        for name in dict.fromkeys(names):
+            if (name, language) in self._lru:
+                self._lru.move_to_end((name, language))
+                found[name] = self._lru[(name, language)]
+                self.lru_hits += 1
+            else:
+                missing.append(name)
+
+        if missing:
+            stored = await self._from_store(language, missing)
+            self.store_hits += len(stored)
+            self._remember(language, stored)
+            found.update(stored)
+            missing = [n for n in missing if n not in stored]
+
+        if missing:
+            # Concurrent menus asking for the same names share one LLM batch
+            waiting = {n: self._inflight[(n, language)] for n in missing if (n, language) in self._inflight}
+            todo = [n for n in missing if n not in waiting]
+            if todo:
+                future = asyncio.ensure_future(self._translate_missing(language, todo))
+                for n in todo:
+                    self._inflight[(n, language)] = future
+                try:
+                    fresh = await future
+                finally:
+                    for n in todo:
+                        self._inflight.pop((n, language), None)
+                self._remember(language, fresh)
+                found.update(fresh)
+            for n, future in waiting.items():
+                try:
+                    result = await future
+                except Exception:
+                    continue
+                if n in result:
+                    found[n] = result[n]
+
+        self.untranslated += sum(1 for n in names if n not in found)
+        return [found.get(n, n) for n in names]
+
+    async def flush(self):
+        """Waits for pending write-backs (shutdown and the bulk job)."""
+        if self._write_tasks:
+            await asyncio.gather(*list(self._write_tasks), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "backend": backend_name(self.store),
+            "lru_entries": len(self._lru),
+            "lru_hits": self.lru_hits,
+            "store_hits": self.store_hits,
+            "llm_calls": self.llm_calls,
+            "llm_translated": self.llm_translated,
+            "untranslated": self.untranslated,
+            "pending_writes": len(self._write_tasks),
+            "errors": self.errors,
+        }
+
+
+def build_translation_cache(kind: str = None) -> TranslationCache:
+    """Creates the cache selected by UI_TRANSLATION_BACKEND (postgres or sqlite); the store opens on first use."""
+    kind = kind or os.getenv("UI_TRANSLATION_BACKEND", "postgres")
+    return TranslationCache(select_store("UI translation", kind, PostgresTranslationStore, SQLiteTranslationStore))
+
+
+ui_translations = build_translation_cache()
@@ -0,0 +1,204 @@
+# app/core/ui_catalog.py
+
+import os
+import json
+import string
+import asyncio
+import logging
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.getenv("UI_CATALOG_PATH", "data/ui_catalog.json")
+
+# --- 1. SOURCE TEXT ---
+# English is the source every other language is generated from. Placeholders
+# are filled at send time, so one template serves every district and user.
+
+SOURCE_LANGUAGE = "English"
+
+SOURCE_TEXT = {
+    "INTRO_DISTRICT": (
+        "Welcome to EmpowerNet! 🙏 I can help you find local work, training and "
+        "safety support, and explain your rights. Please select your district from the list below."
+    ),
+    "SELECT_BLOCK": "Thank you! Which block in {district} do you live in? Please select it from the list.",
+    "SELECT_VILLAGE": "Almost done! Please select your village from the list.",
+    "ONBOARDING_DONE": (
+        "Thank you, {user_name}! Your location is saved: {village}, {block}, {district}. "
+        "Ask me about jobs, training, wages and your rights, or tell me about a safety problem at work."
+    ),
+}
+
+FALLBACK_TEXT = "Please select an option:"
+
+
+def template_fields(template: str) -> set:
+    """Placeholder names used by a template, e.g. {'district'}."""
+    return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+
+
+class _BlankMissing(dict):
+    def __missing__(self, key):
+        return ""
+
+# --- 2. GENERATION (admin command & first use of a new language) ---
+
+async def generate_language(language: str) -> dict:
+    """
+    Translates every source template into one language in a single call.
+    Templates whose placeholders do not survive translation are dropped, so
+    they fall back to English instead of rendering broken text.
+    """
+    from app.core.llm import get_chat_model
+
+    llm = get_chat_model("gpt-4o-mini", temperature=0).bind(response_format={"type": "json_object"})
+    prompt = (
+        f"Translate these WhatsApp messages for rural women in West Bengal into warm, simple {language}, "
+        f"written in {language} script. Keep emoji and keep every placeholder in curly braces, such as "
+        "{district}, exactly as written. Reply with a JSON object using the same keys.\n\n"
+        + json.dumps(SOURCE_TEXT, ensure_ascii=False)
+    )
+    data = json.loads((await llm.ainvoke(prompt)).content)
+    templates = {}
+    for key, source in SOURCE_TEXT.items():
+        text = data.get(key)
+        if not isinstance(text, str) or not text.strip():
+            continue
+        try:
+            fields = template_fields(text)
+        except ValueError:
+            fields = None
+        if fields != template_fields(source):
+            logger.warning(f"⚠️ UI catalog: dropped {language}/{key}, placeholders changed")
+            continue
+        templates[key] = text.strip()
+    return templates
+
+# --- 3. THE CATALOG ---
+
+class UICatalog:
+    """
+    Localized onboarding templates keyed by (language, context key), loaded
+    from a JSON file and rendered with str.format at send time. A language
+    missing from the file is generated once and written back.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._languages = {SOURCE_LANGUAGE: dict(SOURCE_TEXT)}
+        self._inflight = {}
+        self._failed = set()
+        self.rendered = 0
+        self.generated_languages = 0
+        self.english_fallbacks = 0
+        self.errors = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            stored = {}
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ UI catalog unreadable at {self.path}: {e}")
+            stored = {}
+        for language, templates in stored.items():
+            if language != SOURCE_LANGUAGE:
+                self._languages[language] = dict(templates)
+        return len(self._languages)
+
+    def save(self):
+        """Writes the catalog atomically so other workers never read half a file."""
+        with self._lock:
+            # Keep languages another worker generated since this one loaded
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except Exception:
+                snapshot = {}
+            snapshot.update({k: v for k, v in self._languages.items() if k != SOURCE_LANGUAGE})
+            snapshot = dict(sorted(snapshot.items()))
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            os.replace(tmp, self.path)
+
+    def languages(self) -> list:
+        return sorted(self._languages)
+
+    def templates(self, language: str) -> dict:
+        return dict(self._languages.get(language, {}))
+
+    def set_language(self, language: str, templates: dict):
+        self._languages[language] = dict(templates)
+        self._failed.discard(language)
+
+    async def ensure_language(self, language: str):
+        """Generates a language once; concurrent first menus share the call."""
+        if language in self._languages or language in self._failed:
+            return
+        future = self._inflight.get(language)
+        if future is None:
+            future = asyncio.ensure_future(generate_language(language))
+            self._inflight[language] = future
+            try:
+                templates = await future
+            except Exception as e:
+                self.errors += 1
+                # One attempt per process; the admin command can fill it in later
+                self._failed.add(language)
+                logger.error(f"❌ UI catalog generation failed for {language}: {e}")
+                return
+            finally:
+                self._inflight.pop(language, None)
+            self.set_language(language, templates)
+            self.generated_languages += 1
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ UI catalog write failed: {e}")
+        else:
+            try:
+                await future
+            except Exception:
+                pass
+
+    def render(self, language: str, key: str, **fields) -> str:
+        """Fills a template without any LLM call; unknown text falls back to English."""
+        template = self._languages.get(language or SOURCE_LANGUAGE, {}).get(key)
+        if template is None:
+            template = SOURCE_TEXT.get(key)
+            if language != SOURCE_LANGUAGE:
+                self.english_fallbacks += 1
+        if template is None:
+            return FALLBACK_TEXT
+        self.rendered += 1
+        return template.format_map(_BlankMissing(fields))
+
+    async def arender(self, language: str, key: str, **fields) -> str:
+        await self.ensure_language(language or SOURCE_LANGUAGE)
+        return self.render(language, key, **fields)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "languages": self.languages(),
+            "rendered": self.rendered,
+            "generated_languages": self.generated_languages,
+            "english_fallbacks": self.english_fallbacks,
+            "errors": self.errors,
+        }
+
+
+ui_catalog = UICatalog()
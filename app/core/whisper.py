@@ -1,16 +1,31 @@
-import openai
 import os
+import time
+import asyncio
+import logging
 from dotenv import load_dotenv
+from app.core.audio import prepare_for_transcription
+from app.utils.scheduler import TimingStats
+from app.core.llm import get_openai_client, get_async_openai_client
+from app.utils.tracing import span
 
 # Load environment variables for the API key
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionError(Exception):
+    """Some chunks of a voice note could not be transcribed; `partial` holds the rest, in order."""
+
+    def __init__(self, message: str, partial: str = ""):
+        super().__init__(message)
+        self.partial = partial
 
 def transcribe_audio(file_path: str) -> str:
     """
     Transcribes audio voice notes (OGG, MP3, etc.) into text 
     to be processed by the VESTA Supervisor agent.
     """
-    client = openai.OpenAI()
+    client = get_openai_client()
     
     try:
         # Open the audio file from the temporary storage
@@ -25,6 +40,83 @@ def transcribe_audio(file_path: str) -> str:
             )
             return transcript.text
     except Exception as e:
-        print(f"Whisper Transcription Error: {e}")
+        logger.error(f"❌ Whisper Transcription Error: {e}")
         # Return an empty string so the supervisor knows the audio was unreadable
-        return ""
\ No newline at end of file
+        return ""
+
+# --- ASYNC, IN-MEMORY PATH ---
+# Voice notes arrive as an in-memory (or spooled) buffer from the webhook worker,
+# so there is no temp file to re-read and no blocking call on the event loop.
+async def atranscribe_audio(audio, filename: str = "voice_note.ogg", mime_type: str = "audio/ogg") -> str:
+    """
+    Async variant of transcribe_audio that takes bytes or a file-like object.
+    Returns an empty string if the audio was unreadable.
+    """
+    try:
+        return await _atranscribe(audio, filename, mime_type)
+    except Exception as e:
+        logger.error(f"❌ Whisper Transcription Error: {e}")
+        return ""
+
+async def _atranscribe(audio, filename: str, mime_type: str) -> str:
+    with span("llm", "whisper-1"):
+        transcript = await get_async_openai_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename, audio, mime_type),
+        )
+    return transcript.text
+
+# --- PREPROCESSED, CHUNKED PATH ---
+# Long voice notes are trimmed, downmixed and split at pauses; the chunks are
+# transcribed concurrently and stitched back together in order.
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+
+transcription_stats = {
+    "notes": 0,
+    "chunks": 0,
+    "failed_chunks": 0,
+    "bytes_received": 0,
+    "bytes_uploaded": 0,
+    "latency": TimingStats(),
+}
+
+async def atranscribe_voice_note(data: bytes, mime_type: str = "audio/ogg") -> str:
+    """
+    Transcribes a whole voice note with preprocessing and parallel chunk uploads.
+    Returns an empty string if the audio was silent. Raises TranscriptionError
+    if any chunk failed, so a truncated transcript is never mistaken for a whole one.
+    """
+    started = time.perf_counter()
+    chunks = await prepare_for_transcription(data)
+    preprocessed = chunks != [data]
+
+    semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+
+    async def _one(i, chunk):
+        async with semaphore:
+            if preprocessed:
+                return await _atranscribe(chunk, f"voice_note_{i}.ogg", "audio/ogg")
+            return await _atranscribe(chunk, "voice_note.ogg", mime_type)
+
+    parts = await asyncio.gather(*[_one(i, c) for i, c in enumerate(chunks)], return_exceptions=True)
+    failed = [i for i, p in enumerate(parts) if isinstance(p, BaseException)]
+
+    transcription_stats["notes"] += 1
+    transcription_stats["chunks"] += len(chunks)
+    transcription_stats["bytes_received"] += len(data)
+    transcription_stats["bytes_uploaded"] += sum(len(c) for c in chunks)
+    transcription_stats["latency"].add(time.perf_counter() - started)
+    text = " ".join(p.strip() for p in parts if isinstance(p, str) and p.strip())
+    if failed:
+        transcription_stats["failed_chunks"] += len(failed)
+        for i in failed:
+            logger.error(f"❌ Whisper Transcription Error (chunk {i + 1}/{len(chunks)}): {parts[i]}")
+        raise TranscriptionError(f"{len(failed)} of {len(chunks)} chunks failed", partial=text)
+    return text
+
+def get_transcription_stats() -> dict:
+    stats = dict(transcription_stats)
+    stats["latency"] = transcription_stats["latency"].snapshot()
+    received = stats["bytes_received"]
+    stats["upload_ratio"] = round(stats["bytes_uploaded"] / received, 3) if received else 0.0
+    return stats
@@ -1,29 +1,63 @@
 
+import os
+import asyncio
+import inspect
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END
 from app.graph.state import AgentState
+from app.utils.tracing import traced
+from app.graph.checkpoint import checkpointer
 
 from app.graph.nodes.memory import memory_node
+from app.graph.history import history_node
 from app.graph.nodes.supervisor import supervisor_node
 from app.graph.nodes.legal import legal_node
 from app.graph.nodes.reporting import reporting_node
 from app.graph.nodes.opportunity import opportunity_node
 from app.graph.nodes.writer import writer_node
 
+# --- SYNC NODE FALLBACK ---
+# The swarm runs via ainvoke on the FastAPI event loop. Any node that is still
+# a plain function is pushed onto this bounded pool so it cannot block webhooks.
+SYNC_NODE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SWARM_SYNC_WORKERS", "8")),
+    thread_name_prefix="swarm-node",
+)
+
+def as_async_node(node):
+    """Returns async nodes unchanged and wraps sync ones to run on SYNC_NODE_POOL."""
+    if inspect.iscoroutinefunction(node):
+        return node
+
+    @functools.wraps(node)
+    async def _run_in_pool(state: AgentState):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(SYNC_NODE_POOL, node, state)
+
+    return _run_in_pool
+
+def instrument(name, node):
+    """Runs the node off the event loop if needed and records it as a span."""
+    return traced("node", name)(as_async_node(node))
+
 
 builder = StateGraph(AgentState)
 
 
-builder.add_node("memory", memory_node)           # Fact extraction & DB retrieval
-builder.add_node("supervisor", supervisor_node)   # Routing & Location Guard
-builder.add_node("legal", legal_node)             # Wage & Rights Specialist
-builder.add_node("reporting", reporting_node)     # Safety & Site Penalty Specialist
-builder.add_node("opportunity", opportunity_node) # Job & Training Specialist
-builder.add_node("writer", writer_node)           # Multilingual Persona & Formatting
+builder.add_node("memory", instrument("memory", memory_node))           # Fact extraction & DB retrieval
+builder.add_node("history", instrument("history", history_node))         # Rolling summary of older turns
+builder.add_node("supervisor", instrument("supervisor", supervisor_node))   # Routing & Location Guard
+builder.add_node("legal", instrument("legal", legal_node))             # Wage & Rights Specialist
+builder.add_node("reporting", instrument("reporting", reporting_node))     # Safety & Site Penalty Specialist
+builder.add_node("opportunity", instrument("opportunity", opportunity_node)) # Job & Training Specialist
+builder.add_node("writer", instrument("writer", writer_node))           # Multilingual Persona & Formatting
 
 
 builder.set_entry_point("memory")
 
-builder.add_edge("memory", "supervisor")
+builder.add_edge("memory", "history")
+builder.add_edge("history", "supervisor")
 
 
 builder.add_conditional_edges(
@@ -45,4 +79,6 @@ builder.add_edge("opportunity", "supervisor")
 
 builder.add_edge("writer", END)
 
-empower_swarm = builder.compile()
\ No newline at end of file
+# One compact snapshot per thread_id: the conversation window and the profile
+# survive between turns, so a returning worker costs one primary-key read
+empower_swarm = builder.compile(checkpointer=checkpointer)
@@ -0,0 +1,445 @@
+# app/graph/checkpoint.py
+
+import os
+import time
+import zlib
+import asyncio
+import logging
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver, CheckpointTuple, WRITES_IDX_MAP, get_checkpoint_id, get_checkpoint_metadata,
+)
+from app.utils.tracing import span
+from app.core.stores import SQLiteStore, PostgresStore, select_store, backend_name
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+# Messages kept in a thread's snapshot; older turns are dropped on save
+MAX_MESSAGES = int(os.getenv("CHECKPOINT_MAX_MESSAGES", "24"))
+# Compressed size cap per thread; whole turns are dropped until it fits
+MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", "32768"))
+# Threads idle this long are deleted (the profile is re-read from user_profile)
+IDLE_DAYS = float(os.getenv("CHECKPOINT_IDLE_DAYS", "30"))
+PRUNE_EVERY = 500
+
+
+def compact_messages(messages: list, max_messages: int = MAX_MESSAGES) -> list:
+    """
+    Keeps the newest max_messages, starting the window on a user turn so no
+    reply is stored without its question. Menu rows are dropped: they are
+    only needed to deliver the reply that has already been sent.
+    """
+    messages = list(messages or [])
+    kept = messages[-max_messages:] if max_messages > 0 else []
+    if len(kept) < len(messages):
+        first_turn = next((i for i, m in enumerate(kept) if isinstance(m, HumanMessage)), 0)
+        kept = kept[first_turn:]
+    return [
+        m.model_copy(update={"additional_kwargs": {k: v for k, v in m.additional_kwargs.items() if k != "rows"}})
+        if m.additional_kwargs.get("rows") else m
+        for m in kept
+    ]
+
+
+def _drop_oldest_turn(messages: list) -> list:
+    """Removes everything before the second user message; the last turn is always kept whole."""
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    return messages[starts[1]:] if len(starts) > 1 else messages
+
+# --- 1. BACKENDS ---
+# One row per (thread, namespace): only the latest snapshot is kept, so a
+# thread costs a few KB no matter how long the worker has been talking.
+
+class SQLiteCheckpointStore(SQLiteStore):
+    PRAGMAS = ("synchronous=NORMAL",)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS graph_checkpoints (
+            thread_id     TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL,
+            checkpoint_id TEXT NOT NULL,
+            parent_id     TEXT,
+            type          TEXT NOT NULL,
+            payload       BLOB NOT NULL,
+            updated_at    REAL NOT NULL,
+            PRIMARY KEY (thread_id, checkpoint_ns)
+        );
+        CREATE INDEX IF NOT EXISTS idx_graph_checkpoints_updated ON graph_checkpoints (updated_at);
+        CREATE TABLE IF NOT EXISTS graph_checkpoint_writes (
+            thread_id     TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL,
+            checkpoint_id TEXT NOT NULL,
+            task_id       TEXT NOT NULL,
+            idx           INTEGER NOT NULL,
+            channel       TEXT NOT NULL,
+            type          TEXT NOT NULL,
+            value         BLOB NOT NULL,
+            task_path     TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        );
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        super().__init__(path)
+
+    def load(self, thread_id: str, ns: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT checkpoint_id, parent_id, type, payload FROM graph_checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ?;",
+                (thread_id, ns),
+            ).fetchone()
+
+    def load_writes(self, thread_id: str, ns: str, checkpoint_id: str) -> list:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT task_id, channel, type, value FROM graph_checkpoint_writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx;",
+                (thread_id, ns, checkpoint_id),
+            ).fetchall()
+
+    def save(self, thread_id: str, ns: str, checkpoint_id: str, parent_id: str, type_: str, payload: bytes):
+        with self._lock:
+            self._conn.execute("BEGIN;")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO graph_checkpoints "
+                "(thread_id, checkpoint_ns, checkpoint_id, parent_id, type, payload, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?);",
+                (thread_id, ns, checkpoint_id, parent_id, type_, payload, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM graph_checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?;",
+                (thread_id, ns, checkpoint_id),
+            )
+            self._conn.execute("COMMIT;")
+
+    def save_writes(self, rows: list, replace: bool):
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.executemany(
+                f"{verb} INTO graph_checkpoint_writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM graph_checkpoints WHERE thread_id = ?;", (thread_id,))
+            self._conn.execute("DELETE FROM graph_checkpoint_writes WHERE thread_id = ?;", (thread_id,))
+
+    def prune(self, idle_seconds: float) -> int:
+        cutoff = time.time() - idle_seconds
+        with self._lock:
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT thread_id FROM graph_checkpoints WHERE updated_at < ?;", (cutoff,)
+            ).fetchall()]
+            self._conn.execute("DELETE FROM graph_checkpoints WHERE updated_at < ?;", (cutoff,))
+            self._conn.executemany("DELETE FROM graph_checkpoint_writes WHERE thread_id = ?;", [(t,) for t in stale])
+        return len(stale)
+
+    def size(self) -> dict:
+        with self._lock:
+            threads, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM graph_checkpoints;"
+            ).fetchone()
+        return {"threads": threads, "bytes": total}
+
+
+class PostgresCheckpointStore(PostgresStore):
+    """Shared store, for when a user's turns may land on different hosts."""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS graph_checkpoints (
+            thread_id     TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL,
+            checkpoint_id TEXT NOT NULL,
+            parent_id     TEXT,
+            type          TEXT NOT NULL,
+            payload       BYTEA NOT NULL,
+            updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (thread_id, checkpoint_ns)
+        );
+        CREATE INDEX IF NOT EXISTS idx_graph_checkpoints_updated ON graph_checkpoints (updated_at);
+        CREATE TABLE IF NOT EXISTS graph_checkpoint_writes (
+            thread_id     TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL,
+            checkpoint_id TEXT NOT NULL,
+            task_id       TEXT NOT NULL,
+            idx           INTEGER NOT NULL,
+            channel       TEXT NOT NULL,
+            type          TEXT NOT NULL,
+            value         BYTEA NOT NULL,
+            task_path     TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        );
+    """
+
+    def load(self, thread_id: str, ns: str):
+        with self._pool.cursor() as cur:
+            cur.execute(
+                "SELECT checkpoint_id, parent_id, type, payload FROM graph_checkpoints "
+                "WHERE thread_id = %s AND checkpoint_ns = %s;",
+                (thread_id, ns),
+            )
+            return cur.fetchone()
+
+    def load_writes(self, thread_id: str, ns: str, checkpoint_id: str) -> list:
+        with self._pool.cursor() as cur:
+            cur.execute(
+                "SELECT task_id, channel, type, value FROM graph_checkpoint_writes "
+                "WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s ORDER BY task_id, idx;",
+                (thread_id, ns, checkpoint_id),
+            )
+            return cur.fetchall()
+
+    def save(self, thread_id: str, ns: str, checkpoint_id: str, parent_id: str, type_: str, payload: bytes):
+        import psycopg2
+
+        # One round trip: the upsert and the clean-up of stale writes share a statement
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                WITH saved AS (
+                    INSERT INTO graph_checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id, type, payload)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (thread_id, checkpoint_ns) DO UPDATE SET
+                        checkpoint_id = EXCLUDED.checkpoint_id,
+                        parent_id = EXCLUDED.parent_id,
+                        type = EXCLUDED.type,
+                        payload = EXCLUDED.payload,
+                        updated_at = NOW()
+                    RETURNING 1
+                )
+                DELETE FROM graph_checkpoint_writes
+                WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id != %s;
+            """, (thread_id, ns, checkpoint_id, parent_id, type_, psycopg2.Binary(payload),
+                  thread_id, ns, checkpoint_id))
+
+    def save_writes(self, rows: list, replace: bool):
+        from psycopg2.extras import execute_values
+
+        conflict = (
+            "DO UPDATE SET channel = EXCLUDED.channel, type = EXCLUDED.type, value = EXCLUDED.value"
+            if replace else "DO NOTHING"
+        )
+        with self._pool.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO graph_checkpoint_writes
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)
+                VALUES %s
+                ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) {conflict};
+            """, rows)
+
+    def delete_thread(self, thread_id: str):
+        with self._pool.cursor() as cur:
+            cur.execute("DELETE FROM graph_checkpoints WHERE thread_id = %s;", (thread_id,))
+            cur.execute("DELETE FROM graph_checkpoint_writes WHERE thread_id = %s;", (thread_id,))
+
+    def prune(self, idle_seconds: float) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute(
+                "DELETE FROM graph_checkpoints WHERE updated_at < NOW() - make_interval(secs => %s) "
+                "RETURNING thread_id;",
+                (idle_seconds,),
+            )
+            stale = [r[0] for r in cur.fetchall()]
+            if stale:
+                cur.execute("DELETE FROM graph_checkpoint_writes WHERE thread_id = ANY(%s);", (stale,))
+        return len(stale)
+
+    def size(self) -> dict:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM graph_checkpoints;")
+            threads, total = cur.fetchone()
+        return {"threads": threads, "bytes": int(total)}
+
+# --- 2. THE SAVER ---
+
+class CompactCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer that keeps one compressed snapshot per thread.
+    Older messages are pruned on save, so loading a returning worker's state
+    is a single primary-key read of a few KB. There is no history to
+    rewind to: get_tuple only answers for the latest checkpoint.
+    """
+
+    def __init__(self, store, max_messages: int = MAX_MESSAGES, max_bytes: int = MAX_BYTES, serde=None):
+        super().__init__(serde=serde)
+        self.store = store
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self.misses = 0
+        self.saves = 0
+        self.messages_pruned = 0
+        self.oversize_trims = 0
+        self.errors = 0
+        self.load_ms = 0.0
+        self.save_ms = 0.0
+
+    @staticmethod
+    def _keys(config) -> tuple:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def _encode(self, value) -> tuple:
+        type_, data = self.serde.dumps_typed(value)
+        return type_, zlib.compress(data, 6)
+
+    def _decode(self, type_: str, payload):
+        return self.serde.loads_typed((type_, zlib.decompress(bytes(payload))))
+
+    def _compact(self, checkpoint: dict, metadata: dict) -> tuple:
+        """Serializes the snapshot with messages pruned to the count and byte caps."""
+        values = dict(checkpoint.get("channel_values") or {})
+        original = values.get("messages")
+        if original is not None:
+            values["messages"] = compact_messages(original, self.max_messages)
+
+        while True:
+            type_, payload = self._encode({"checkpoint": {**checkpoint, "channel_values": values},
+                                           "metadata": metadata})
+            messages = values.get("messages") or []
+            if len(payload) <= self.max_bytes:
+                break
+            shorter = _drop_oldest_turn(messages)
+            if len(shorter) == len(messages):
+                break
+            values["messages"] = shorter
+            self.oversize_trims += 1
+
+        if original is not None:
+            self.messages_pruned += len(original) - len(values["messages"])
+        if len(payload) > self.max_bytes:
+            logger.warning(f"⚠️ Checkpoint for one turn is {len(payload)} bytes (cap {self.max_bytes})")
+        return type_, payload
+
+    # --- sync API ---
+
+    def get_tuple(self, config):
+        thread_id, ns = self._keys(config)
+        started = time.perf_counter()
+        with span("checkpoint", "load"):
+            row = self.store.load(thread_id, ns)
+            wanted = get_checkpoint_id(config)
+            if row and not (wanted and wanted != row[0]):
+                checkpoint_id, parent_id, type_, payload = row
+                snapshot = self._decode(type_, payload)
+                writes = self.store.load_writes(thread_id, ns, checkpoint_id)
+            else:
+                row = None
+        self.loads += 1
+        self.load_ms += 1000 * (time.perf_counter() - started)
+        if row is None:
+            self.misses += 1
+            return None
+
+        def ref(cid):
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=ref(checkpoint_id),
+            checkpoint=snapshot["checkpoint"],
+            metadata=snapshot["metadata"],
+            parent_config=ref(parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, self._decode(t, v)) for task_id, channel, t, v in writes],
+        )
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        """Yields the thread's latest checkpoint, the only one stored."""
+        if config is None or limit == 0:
+            return
+        found = self.get_tuple(config)
+        if not found:
+            return
+        if before and get_checkpoint_id(before) and found.config["configurable"]["checkpoint_id"] >= get_checkpoint_id(before):
+            return
+        if filter and any(found.metadata.get(k) != v for k, v in filter.items()):
+            return
+        yield found
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id, ns = self._keys(config)
+        started = time.perf_counter()
+        with span("checkpoint", "save"):
+            type_, payload = self._compact(checkpoint, get_checkpoint_metadata(config, metadata))
+            self.store.save(thread_id, ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                            type_, payload)
+        self.saves += 1
+        self.save_ms += 1000 * (time.perf_counter() - started)
+
+        if self.saves % PRUNE_EVERY == 0 and IDLE_DAYS > 0:
+            try:
+                pruned = self.store.prune(IDLE_DAYS * 86400)
+                if pruned:
+                    logger.info(f"🧹 Pruned {pruned} idle conversation checkpoints")
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Checkpoint prune failed: {e}")
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id, ns = self._keys(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, payload = self._encode(value)
+            rows.append((thread_id, ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, type_, payload, task_path))
+        if rows:
+            # Special writes (errors, interrupts) replace; regular ones are written once
+            self.store.save_writes(rows, replace=all(channel in WRITES_IDX_MAP for channel, _ in writes))
+
+    def delete_thread(self, thread_id):
+        self.store.delete_thread(str(thread_id))
+
+    # --- async API: blocking I/O runs on a worker thread ---
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for item in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> dict:
+        """Sums the stored snapshots too, which scans the table: call it off the event loop."""
+        try:
+            stored = self.store.size()
+        except Exception:
+            stored = {}
+        return {
+            "backend": backend_name(self.store),
+            "threads": stored.get("threads"),
+            "stored_bytes": stored.get("bytes"),
+            "loads": self.loads,
+            "misses": self.misses,
+            "saves": self.saves,
+            "avg_load_ms": round(self.load_ms / self.loads, 2) if self.loads else 0.0,
+            "avg_save_ms": round(self.save_ms / self.saves, 2) if self.saves else 0.0,
+            "messages_pruned": self.messages_pruned,
+            "oversize_trims": self.oversize_trims,
+            "max_messages": self.max_messages,
+            "max_bytes": self.max_bytes,
+            "errors": self.errors,
+        }
+
+
+def build_checkpointer(kind: str = None) -> CompactCheckpointSaver:
+    """Creates the saver selected by CHECKPOINT_BACKEND (sqlite or postgres); the store opens on first use."""
+    kind = kind or os.getenv("CHECKPOINT_BACKEND", "sqlite")
+    return CompactCheckpointSaver(select_store("Checkpoint", kind, PostgresCheckpointStore, SQLiteCheckpointStore))
+
+
+checkpointer = build_checkpointer()
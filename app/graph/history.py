@@ -0,0 +1,243 @@
+# app/graph/history.py
+
+import os
+import re
+import logging
+import threading
+from collections import deque
+from langchain_core.messages import HumanMessage, AIMessage
+from app.graph.state import AgentState
+
+logger = logging.getLogger(__name__)
+
+# User turns sent verbatim; older ones are folded into the running summary
+HISTORY_TURNS = int(os.getenv("HISTORY_TURNS", "4"))
+# Cap on the running summary; its oldest lines are dropped first
+SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+# History token budget per node, overridable as HISTORY_TOKENS_<NODE>
+NODE_BUDGETS = {"supervisor": 1200}
+DEFAULT_BUDGET = 1000
+# Specialist payloads the prompts only need to know about, not to re-read
+PAYLOAD_PREFIXES = {
+    "LEGAL_AUDIT_REPORT": "legal audit",
+    "OPPORTUNITY_REPORT": "job & training search",
+    "SIGNAL_SUCCESS:SAFETY_REPORT_SUBMITTED": "safety report filed",
+    "SIGNAL_ERROR": "specialist error",
+    "LIST_REQUEST": "location menu",
+}
+REFERENCE_TOKENS = 24     # first line kept from a stripped payload
+OLD_MESSAGE_TOKENS = 150  # cap on each verbatim message outside the current turn
+LINE_TOKENS = 25          # per side of a summary line
+
+_SPACES = re.compile(r"\s+")
+_encoding = None
+_encoding_failed = False
+
+# --- 1. TOKENS ---
+
+def _get_encoding():
+    """The tiktoken encoder, or None if it cannot be loaded (then ~4 chars/token)."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            from app.core.context_packer import get_encoding
+            _encoding = get_encoding()
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning(f"⚠️ Tokenizer unavailable, estimating prompt tokens: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    return len(enc.encode(text or "")) if enc else len(text or "") // 4 + 1
+
+
+def clip(text: str, tokens: int) -> str:
+    """Cuts text to at most `tokens` tokens, marking the cut with an ellipsis."""
+    text = text or ""
+    enc = _get_encoding()
+    if enc:
+        ids = enc.encode(text)
+        return text if len(ids) <= tokens else enc.decode(ids[:tokens]).rstrip() + "…"
+    return text if len(text) <= 4 * tokens else text[:4 * tokens].rstrip() + "…"
+
+
+def message_tokens(messages: list) -> int:
+    """Prompt tokens as billed: content plus ~4 tokens of chat framing per message."""
+    total = 3
+    for m in messages:
+        content = m["content"] if isinstance(m, dict) else m.content
+        total += count_tokens(content if isinstance(content, str) else str(content)) + 4
+    return total
+
+# --- 2. TURNS & PAYLOADS ---
+
+def split_turns(messages: list) -> list:
+    """Groups messages into turns, each starting at a user message."""
+    turns = []
+    for m in messages or []:
+        if isinstance(m, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(m)
+    return turns
+
+
+def payload_kind(message):
+    content = message.content if isinstance(message.content, str) else ""
+    for prefix, kind in PAYLOAD_PREFIXES.items():
+        if content.startswith(prefix):
+            return kind
+    return None
+
+
+def reference(message, kind: str) -> AIMessage:
+    """Replaces a specialist payload with its kind, size and first line."""
+    body = message.content.split(":", 1)[-1].strip()
+    first_line = next((line.strip() for line in body.splitlines() if line.strip()), "")
+    summary = f"[{kind}, {count_tokens(message.content)} tokens omitted]"
+    if first_line:
+        summary += f" {clip(first_line, REFERENCE_TOKENS)}"
+    return AIMessage(content=summary, id=message.id)
+
+
+def compact_message(message, token_cap: int = None):
+    kind = payload_kind(message) if isinstance(message, AIMessage) else None
+    if kind:
+        return reference(message, kind)
+    if token_cap and isinstance(message.content, str) and count_tokens(message.content) > token_cap:
+        return message.model_copy(update={"content": clip(message.content, token_cap)})
+    return message
+
+# --- 3. RUNNING SUMMARY ---
+
+def _flatten(text) -> str:
+    return _SPACES.sub(" ", text if isinstance(text, str) else str(text)).strip()
+
+
+def summarize_turn(turn: list) -> str:
+    """One line per folded turn: what the user asked, who handled it, what was said."""
+    asked = next((m.content for m in turn if isinstance(m, HumanMessage)), "")
+    kinds = list(dict.fromkeys(k for k in (payload_kind(m) for m in turn if isinstance(m, AIMessage)) if k))
+    replies = [m.content for m in turn if isinstance(m, AIMessage) and not payload_kind(m)]
+    line = f'- user: "{clip(_flatten(asked), LINE_TOKENS)}"'
+    if kinds:
+        line += f" | handled by: {', '.join(kinds)}"
+    if replies:
+        line += f' | reply: "{clip(_flatten(replies[-1]), LINE_TOKENS)}"'
+    return line
+
+
+def fold_history(state: AgentState, keep_turns: int = HISTORY_TURNS) -> dict:
+    """
+    Folds turns that have left the verbatim window into history_summary.
+    Runs every turn, so a turn is folded long before the checkpointer prunes
+    it; history_folded_id marks the newest message already folded.
+    """
+    turns = split_turns(state.get("messages") or [])
+    older = turns[:-keep_turns] if keep_turns > 0 else turns
+    if not older:
+        return {}
+
+    folded_id = state.get("history_folded_id")
+    ids = [turn[-1].id for turn in older]
+    # A folded id no longer in the window was pruned, so every remaining turn is newer
+    start = ids.index(folded_id) + 1 if folded_id in ids else 0
+    fresh = older[start:]
+    if not fresh:
+        return {}
+
+    lines = [line for line in (state.get("history_summary") or "").splitlines() if line.strip()]
+    lines += [summarize_turn(turn) for turn in fresh]
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > SUMMARY_TOKENS:
+        lines.pop(0)
+    return {"history_summary": "\n".join(lines), "history_folded_id": ids[-1]}
+
+
+async def history_node(state: AgentState):
+    """Keeps the running summary current before any node builds a prompt."""
+    return fold_history(state)
+
+# --- 4. PROMPT WINDOW ---
+
+def node_budget(node: str) -> int:
+    return int(os.getenv(f"HISTORY_TOKENS_{node.upper()}", NODE_BUDGETS.get(node, DEFAULT_BUDGET)))
+
+
+def history_messages(state: AgentState, node: str, budget: int = None, keep_turns: int = HISTORY_TURNS) -> list:
+    """
+    The last keep_turns turns for `node`'s prompt: specialist payloads become
+    short references, old messages are capped, and whole older turns are
+    dropped until the window fits the node's token budget. The current turn
+    is always kept (clipped if it alone is over budget).
+    """
+    budget = budget or node_budget(node)
+    turns = split_turns(state.get("messages") or [])[-keep_turns:] if keep_turns > 0 else []
+    if not turns:
+        return []
+
+    window = [[compact_message(m, OLD_MESSAGE_TOKENS) for m in turn] for turn in turns[:-1]]
+    window.append([compact_message(m) for m in turns[-1]])
+    while len(window) > 1 and message_tokens([m for turn in window for m in turn]) > budget:
+        window.pop(0)
+
+    messages = [m for turn in window for m in turn]
+    if message_tokens(messages) > budget:
+        share = max(16, budget // max(1, len(messages)) - 4)
+        messages = [compact_message(m, share) for m in messages]
+    return messages
+
+
+def summary_block(state: AgentState) -> str:
+    summary = state.get("history_summary")
+    return f"\n\nEARLIER IN THIS CONVERSATION (summarized):\n{summary}" if summary else ""
+
+# --- 5. PROMPT SIZE PER NODE ---
+
+class PromptStats:
+    """Count / mean / max plus p50 & p95 of prompt tokens over a sliding window."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._samples = deque(maxlen=window)
+
+    def add(self, tokens: int):
+        self.count += 1
+        self.total += tokens
+        self.max = max(self.max, tokens)
+        self._samples.append(tokens)
+
+    def _percentile(self, pct: float) -> int:
+        if not self._samples:
+            return 0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_tokens": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_tokens": self._percentile(0.50),
+            "p95_tokens": self._percentile(0.95),
+            "max_tokens": self.max,
+        }
+
+
+_prompt_lock = threading.Lock()
+_prompt_stats = {}
+
+
+def record_prompt(node: str, messages: list, history: int = 0) -> int:
+    """Logs the prompt size a node is about to send and adds it to /stats."""
+    tokens = message_tokens(messages)
+    with _prompt_lock:
+        _prompt_stats.setdefault(node, PromptStats()).add(tokens)
+    logger.info(f"🧾 Prompt [{node}] {tokens} tokens ({history} history messages)")
+    return tokens
+
+
+def prompt_stats() -> dict:
+    with _prompt_lock:
+        return {node: stats.snapshot() for node, stats in sorted(_prompt_stats.items())}
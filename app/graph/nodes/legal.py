@@ -1,12 +1,12 @@
 import logging
-from langchain_openai import ChatOpenAI
+from app.core.llm import get_chat_model
 from langchain_core.messages import AIMessage
 from app.graph.state import AgentState
 from app.tools.compliance import check_labor_compliance
 
 logger = logging.getLogger(__name__)
 
-def legal_node(state: AgentState):
+async def legal_node(state: AgentState):
     """
     The Legal Specialist: Uses RAG results to audit wages and job compliance.
     """
@@ -23,10 +23,10 @@ def legal_node(state: AgentState):
     search_query = f"2026 minimum wage and labor rights for {user_skills} in {location}, West Bengal"
     
     # 3. Call the Compliance Tool (The RAG Retrieval)
-    legal_data = check_labor_compliance.invoke({"query": search_query})
+    legal_data = await check_labor_compliance.ainvoke({"query": search_query})
 
     # 4. Analysis Logic
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    llm = get_chat_model("gpt-4o-mini", temperature=0)
     
     analysis_prompt = f"""
     You are the Legal Auditor for EmpowerNet. 
@@ -46,7 +46,7 @@ def legal_node(state: AgentState):
     NOTE: Do not talk to the user directly. Just provide the audit report for the next node.
     """
     
-    audit_result = llm.invoke(analysis_prompt).content
+    audit_result = (await llm.ainvoke(analysis_prompt)).content
 
     # 5. Return the report to the state
     return {
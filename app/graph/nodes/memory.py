@@ -1,12 +1,21 @@
+import os
+import time
 import logging
 from typing import Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from app.core.llm import get_chat_model
 from app.graph.state import AgentState
-from app.tools.memory import upsert_user_profile, get_user_context
+from app.tools.memory import aupsert_user_profile, aget_user_context, aset_user_location
+from app.graph.onboarding import (
+    resolve_selection, detect_script_language, resolve_typed_location, row_id_for_path
+)
 
 logger = logging.getLogger(__name__)
 
+# This node is the only writer of user_profile, so the snapshot carried in the
+# thread checkpoint is authoritative; the TTL bounds drift from manual DB edits.
+PROFILE_SNAPSHOT_TTL = float(os.getenv("PROFILE_SNAPSHOT_TTL", "21600"))
+
 class ProfileExtraction(BaseModel):
     """Extracted worker profile information with hierarchical awareness."""
     full_name: Optional[str] = Field(None, description="The user's name")
@@ -19,7 +28,18 @@ class ProfileExtraction(BaseModel):
         description="The primary script: 'Bengali' or 'English'."
     )
 
-def memory_node(state: AgentState):
+def fresh_profile(state: AgentState) -> Optional[dict]:
+    """The profile snapshot from the checkpoint, or None if absent or stale."""
+    profile = state.get("profile")
+    synced_at = state.get("profile_synced_at") or 0
+    if profile is not None and time.time() - synced_at < PROFILE_SNAPSHOT_TTL:
+        return profile
+    return None
+
+def profile_snapshot(profile: dict) -> dict:
+    return {"profile": profile, "profile_synced_at": time.time()}
+
+async def memory_node(state: AgentState):
     """
     The Memory Specialist: Maps selections to the correct hierarchy level.
     """
@@ -27,13 +47,71 @@ def memory_node(state: AgentState):
     messages = state.get("messages", [])
     last_msg = messages[-1].content if messages else ""
 
+    # --- FAST PATH: MENU SELECTION ---
+    # A tapped district/block/village row already names its slot, so it is
+    # written directly and the extraction LLM is skipped.
+    selection = state.get("location_selection")
+    if selection:
+        location = await resolve_selection(selection)
+        if location:
+            saved = await aset_user_location(
+                user_id, location["district"], location["block"], location["village"]
+            )
+            if saved is not None:
+                language = saved.get("preferred_lang") or detect_script_language(last_msg) or "English"
+                logger.info(
+                    f"🧠 Memory Sync (menu): {user_id} | {location['level']} | D: {location['district']} "
+                    f"| B: {location['block']} | V: {location['village']}"
+                )
+                update = {
+                    "district": location["district"],
+                    "block": location["block"],
+                    "village": location["village"],
+                    "language": language,
+                    "user_name": saved.get("full_name") or "Friend",
+                }
+                # The RETURNING row lacks occupation and skill, so only a complete snapshot is refreshed
+                cached = fresh_profile(state)
+                if cached is not None:
+                    update.update(profile_snapshot({
+                        **cached, **saved,
+                        "district": location["district"], "block": location["block"], "village": location["village"],
+                    }))
+                return update
+
     # A. Get existing context to know where we are in the hierarchy
-    existing_profile = get_user_context(user_id) or {}
+    # Served from the checkpointed snapshot on most turns; the DB is read when it is missing or stale
+    snapshot = {}
+    existing_profile = fresh_profile(state)
+    if existing_profile is None:
+        existing_profile = await aget_user_context(user_id) or {}
+        if existing_profile:
+            snapshot = profile_snapshot(existing_profile)
     has_district = existing_profile.get("district") is not None
     has_block = existing_profile.get("block") is not None
+
+    # --- FAST PATH: TYPED PLACE NAME ---
+    # A bare place name is resolved by the gazetteer; only ambiguous names reach the LLM
+    place = await resolve_typed_location(last_msg, existing_profile)
+    if place:
+        path = place.path
+        district, block, village = (path + (None, None))[:3]
+        if await aset_user_location(user_id, district, block, village) is not None:
+            language = existing_profile.get("preferred_lang") or detect_script_language(last_msg) or "English"
+            logger.info(f"🧠 Memory Sync (gazetteer): {user_id} | D: {district} | B: {block} | V: {village}")
+            return {
+                "district": district,
+                "block": block,
+                "village": village,
+                "language": language,
+                "user_name": existing_profile.get("full_name") or "Friend",
+                # Handled from here on exactly like the matching menu tap
+                "location_selection": row_id_for_path(path),
+                **profile_snapshot({**existing_profile, "district": district, "block": block, "village": village}),
+            }
     
     # B. AI Extraction
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    llm = get_chat_model("gpt-4o-mini", temperature=0)
     structured_llm = llm.with_structured_output(ProfileExtraction)
     
     # THE FIX: Contextual Prompting
@@ -50,7 +128,7 @@ def memory_node(state: AgentState):
     )
     
     try:
-        extracted = structured_llm.invoke(extraction_prompt)
+        extracted = await structured_llm.ainvoke(extraction_prompt)
         
         # C. Merge Logic: Prioritize new extraction but keep parents
         updated_district = extracted.district or existing_profile.get("district")
@@ -66,15 +144,28 @@ def memory_node(state: AgentState):
         updated_lang = extracted.language or existing_profile.get("language") or "English"
         
         # D. Save to DB
-        upsert_user_profile(
+        updated_name = extracted.full_name or existing_profile.get("full_name")
+        updated_occupation = extracted.primary_occupation or existing_profile.get("primary_occupation")
+        saved = await aupsert_user_profile(
             phone_number=user_id,
-            name=extracted.full_name or existing_profile.get("full_name"),
+            name=updated_name,
             language=updated_lang,
             district=updated_district,
             block=updated_block,
             village=updated_village,
-            occupation=extracted.primary_occupation or existing_profile.get("primary_occupation")
+            occupation=updated_occupation
         )
+        if saved:
+            # The upsert COALESCEs, so the row now holds exactly these merged values
+            snapshot = profile_snapshot({
+                **existing_profile,
+                "full_name": updated_name,
+                "preferred_lang": updated_lang,
+                "district": updated_district,
+                "block": updated_block,
+                "village": updated_village,
+                "primary_occupation": updated_occupation,
+            })
 
         logger.info(f"🧠 Memory Sync: {user_id} | Lang: {updated_lang} | D: {updated_district} | B: {updated_block} | V: {updated_village}")
 
@@ -83,9 +174,10 @@ def memory_node(state: AgentState):
             "block": updated_block,
             "village": updated_village,
             "language": updated_lang,
-            "user_name": extracted.full_name or existing_profile.get("full_name", "Friend")
+            "user_name": extracted.full_name or existing_profile.get("full_name", "Friend"),
+            **snapshot,
         }
 
     except Exception as e:
         logger.error(f"❌ Memory Node Error: {e}")
-        return {"language": existing_profile.get("language") or "English"}
\ No newline at end of file
+        return {"language": existing_profile.get("language") or "English", **snapshot}
\ No newline at end of file
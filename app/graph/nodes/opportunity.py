@@ -1,5 +1,6 @@
+import asyncio
 import logging
-from langchain_openai import ChatOpenAI
+from app.core.llm import get_chat_model
 from langchain_core.messages import AIMessage
 from app.graph.state import AgentState
 
@@ -7,10 +8,15 @@ from app.graph.state import AgentState
 from app.tools.jobs import match_local_jobs
 from app.tools.training import get_training_programs
 from app.tools.community import find_nearby_shgs
+from app.tools import OPPORTUNITY_TOOL_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
-def opportunity_node(state: AgentState):
+# Per-lookup deadline; a slow source is reported as unavailable instead of
+# holding up the others
+TOOL_TIMEOUT_SECONDS = OPPORTUNITY_TOOL_TIMEOUT
+
+async def opportunity_node(state: AgentState):
     """
     The Opportunity Specialist: Triage and Match.
     Uses District, Block, and Village hierarchy to find relevant opportunities.
@@ -38,7 +44,7 @@ def opportunity_node(state: AgentState):
         }
 
     # 3. Intent Analysis
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    llm = get_chat_model("gpt-4o-mini", temperature=0)
     
     intent_prompt = f"""
     Analyze the user's request: "{last_msg}"
@@ -51,40 +57,60 @@ def opportunity_node(state: AgentState):
     
     Return ONLY the word: JOB, TRAINING, SHG, or ALL.
     """
-    intent = llm.invoke(intent_prompt).content.strip().upper()
+    intent = (await llm.ainvoke(intent_prompt)).content.strip().upper()
     logger.info(f"🎯 Intent Detected: {intent}")
 
     # 4. Selective Tool Execution using Hierarchy
-    results_summary = []
+    # The lookups are independent, so they run concurrently: an ALL turn costs
+    # roughly the slowest one instead of the sum of three DB round trips.
+    lookups = []
 
     if intent in ["JOB", "ALL"]:
         # Priority 1: Village match, Priority 2: Skill match
-        job_data = match_local_jobs.invoke({
+        lookups.append(("JOBS_FOUND", match_local_jobs, {
             "skills": skills, 
             "district": district, 
             "block": block, 
             "village": village
-        })
-        results_summary.append(f"JOBS_FOUND: {job_data}")
+        }))
         
     if intent in ["TRAINING", "ALL"]:
         # Filters by District and optionally by category (skills)
-        training_data = get_training_programs.invoke({
+        lookups.append(("TRAINING_FOUND", get_training_programs, {
             "district": district, 
             "block": block, 
             "village": village,
             "category": skills
-        })
-        results_summary.append(f"TRAINING_FOUND: {training_data}")
+        }))
         
     if intent in ["SHG", "ALL"]:
         # Priority 1: Immediate Village, Priority 2: Nearby in Block
-        shg_data = find_nearby_shgs.invoke({
+        lookups.append(("SHG_FOUND", find_nearby_shgs, {
             "district": district, 
             "block": block, 
             "village": village
-        })
-        results_summary.append(f"SHG_FOUND: {shg_data}")
+        }))
+
+    outcomes = await asyncio.gather(*[
+        asyncio.wait_for(lookup.ainvoke(args), TOOL_TIMEOUT_SECONDS) for _, lookup, args in lookups
+    ], return_exceptions=True)
+
+    results_summary = []
+    missing = []
+    for (label, lookup, _), outcome in zip(lookups, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            logger.warning(f"⏱️ {lookup.name} timed out after {TOOL_TIMEOUT_SECONDS}s")
+            outcome = f"UNAVAILABLE (timed out after {TOOL_TIMEOUT_SECONDS:g}s)"
+            missing.append(label)
+        elif isinstance(outcome, Exception):
+            logger.error(f"❌ {lookup.name} failed: {outcome}")
+            outcome = "UNAVAILABLE (lookup failed)"
+            missing.append(label)
+        results_summary.append(f"{label}: {outcome}")
+
+    if missing:
+        # Lets the writer say some results could not be fetched right now
+        results_summary.append(f"PARTIAL_RESULTS: {', '.join(missing)} could not be fetched in time.")
 
     # 5. Consolidate Findings
     final_findings = "\n".join(results_summary)
@@ -1,12 +1,12 @@
 import logging
-from langchain_openai import ChatOpenAI
+from app.core.llm import get_chat_model
 from langchain_core.messages import AIMessage
 from app.graph.state import AgentState
 from app.tools.reporting import submit_safety_report
 
 logger = logging.getLogger(__name__)
 
-def reporting_node(state: AgentState):
+async def reporting_node(state: AgentState):
     """
     The Reporting Specialist: Translates raw user complaints into 
     professional English safety reports and logs them.
@@ -30,7 +30,7 @@ def reporting_node(state: AgentState):
         }
 
     # 2. TRANSLATION & CATEGORIZATION (Internal Processing)
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    llm = get_chat_model("gpt-4o-mini", temperature=0)
     
     # We explicitly ask the LLM to handle the extraction logic 
     # so we don't have to hardcode "if line.startswith" loops
@@ -44,7 +44,7 @@ def reporting_node(state: AgentState):
     """
     
     try:
-        ai_analysis = llm.invoke(translation_prompt).content
+        ai_analysis = (await llm.ainvoke(translation_prompt)).content
         # Basic cleanup in case the LLM adds markdown triple backticks
         import json
         clean_json = ai_analysis.strip().strip('`').replace('json', '')
@@ -61,7 +61,7 @@ def reporting_node(state: AgentState):
 
     # 3. TOOL INVOKE
     try:
-        report_status = submit_safety_report.invoke({
+        report_status = await submit_safety_report.ainvoke({
             "user_id": str(user_id),
             "description": english_desc,
             "category": category,
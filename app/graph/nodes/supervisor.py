@@ -2,9 +2,11 @@
 
 import logging
 from typing import Literal
-from langchain_openai import ChatOpenAI
+from app.core.llm import get_chat_model
 from pydantic import BaseModel, Field
 from app.graph.state import AgentState
+from app.graph.router import RouteDecision, ACTION_AGENTS, route_locally, record_decision
+from app.graph.history import history_messages, summary_block, record_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,7 @@ class RouterResponse(BaseModel):
     )
     reasoning: str = Field(description="Internal logic for choosing this path.")
 
-def supervisor_node(state: AgentState):
+async def supervisor_node(state: AgentState):
     """
     The Brain: Analyzes user intent and specialist findings.
     Now includes a Location Guard for hierarchical onboarding.
@@ -26,31 +28,48 @@ def supervisor_node(state: AgentState):
     # If a specialist has finished, always go to the writer
     last_msg = state["messages"][-1].content if state["messages"] else ""
     if any(keyword in last_msg for keyword in ["SUMMARY", "REPORT", "FINDINGS"]):
-        logger.info(f"✅ Specialist work complete. Routing to WRITER.")
+        record_decision(RouteDecision("writer", 1.0, "guard", "specialist work complete"))
         return {"next_agent": "writer"}
     
+    # A menu tap is an onboarding step: the writer sends the next menu
+    if state.get("location_selection"):
+        record_decision(RouteDecision("writer", 1.0, "guard", "onboarding menu selection"))
+        return {"next_agent": "writer"}
+
     # --- HARD GUARD 2: LOCATION ONBOARDING ---
     # We cannot provide location-based jobs or legal zone data without a village
     district = state.get("district")
     block = state.get("block")
     village = state.get("village")
 
+    # --- FAST PATH: LOCAL ROUTING TIERS ---
+    # Keyword rules, then the n-gram centroid classifier. The LLMs below only
+    # run when neither tier is confident about the turn.
+    decision = route_locally(last_msg, (district, block, village))
+    if decision:
+        if decision.agent in ACTION_AGENTS and not (district and block and village):
+            logger.info("📍 Location missing for action request. Routing to WRITER for onboarding.")
+            decision = decision._replace(agent="writer", reason=f"{decision.reason}; location missing")
+        record_decision(decision)
+        return {"next_agent": decision.agent}
+
     # If the user is trying to find work/laws but we don't know their location
     # we route to 'writer' with instructions to ask for location.
     if not (district and block and village):
         # Allow simple greetings to pass, but intercept search/report intents
-        intent_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-        is_action_request = intent_llm.invoke(
+        intent_llm = get_chat_model("gpt-4o-mini", temperature=0)
+        is_action_request = (await intent_llm.ainvoke(
             f"Is the user asking for a job, legal help, or reporting an issue? Message: '{last_msg}'. Reply YES or NO."
-        ).content.strip().upper()
+        )).content.strip().upper()
 
         if "YES" in is_action_request:
             logger.info("📍 Location missing for action request. Routing to WRITER for onboarding.")
+            record_decision(RouteDecision("writer", 0.0, "llm", "action request without location"))
             return {"next_agent": "writer"}
     # -----------------------------------------
 
     # Initialize structured LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = get_chat_model("gpt-4o", temperature=0)
     structured_llm = llm.with_structured_output(RouterResponse)
 
     # 2. System Prompt defining the Swarm's logic
@@ -64,13 +83,17 @@ def supervisor_node(state: AgentState):
         "5. END: Only use if the user says goodbye.\n\n"
         f"CURRENT USER LOCATION: District: {district}, Block: {block}, Village: {village}\n"
         "If location is missing and user wants jobs/laws, route to WRITER to ask for their District."
+        f"{summary_block(state)}"
     )
 
     # 3. Call the Decision Maker
-    messages = [{"role": "system", "content": system_prompt}] + state["messages"]
-    decision = structured_llm.invoke(messages)
+    # Recent turns only, with specialist reports reduced to references; older turns are in the summary
+    history = history_messages(state, "supervisor")
+    messages = [{"role": "system", "content": system_prompt}] + history
+    record_prompt("supervisor", messages, history=len(history))
+    decision = await structured_llm.ainvoke(messages)
     
-    logger.info(f"🧠 Supervisor Path: {decision.next_agent} | {decision.reasoning}")
+    record_decision(RouteDecision(decision.next_agent, 0.0, "llm", decision.reasoning))
 
     return {
         "next_agent": decision.next_agent
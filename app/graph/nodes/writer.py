@@ -1,52 +1,25 @@
 import logging
-from langchain_openai import ChatOpenAI
+from app.core.llm import get_chat_model
 from langchain_core.messages import AIMessage
 from app.graph.state import AgentState
 from app.tools.spatial import get_districts, get_blocks_for_district, get_villages_for_block
+from app.graph.onboarding import make_row_id, parse_row_id
+from app.core.translation_cache import ui_translations
+from app.core.ui_catalog import ui_catalog
+from app.graph.history import record_prompt
 
 logger = logging.getLogger(__name__)
 
-def get_localized_ui_text(language, context_key, extra_context=""):
-    """Generates localized UI body text dynamically."""
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    
-    prompts = {
-        "INTRO_DISTRICT": (
-            f"Write a very warm greeting for 'EmpowerNet' in {language} script. "
-            "Explain simply that I can help find local jobs and safety aid. "
-            "Ask them to select their district from the list below."
-        ),
-        "SELECT_BLOCK": f"In {language}, kindly ask the user which block in {extra_context} they live in.",
-        "SELECT_VILLAGE": f"In {language}, kindly ask the user to select their village from the list."
-    }
-    
-    prompt = prompts.get(context_key, f"Please select an option in {language}:")
-    try:
-        return llm.invoke(prompt).content
-    except Exception as e:
-        logger.error(f"UI Text Generation failed: {e}")
-        return "Please select an option:"
+async def get_localized_ui_text(language, context_key, **fields):
+    """Renders localized UI body text from the precompiled catalog."""
+    return await ui_catalog.arender(language, context_key, **fields)
 
-def translate_ui_items(items, target_lang):
+async def translate_ui_items(items, target_lang):
     """Translates database items into the current session language script."""
-    if not items or target_lang.lower() == "english":
-        return items 
-    
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    prompt = (
-        f"Translate these West Bengal administrative names into {target_lang} script: "
-        f"{', '.join(items)}. Return ONLY the translated names separated by commas."
-    )
-    
-    try:
-        translated_str = llm.invoke(prompt).content
-        parts = [t.strip() for t in translated_str.split(",")]
-        return parts if len(parts) == len(items) else items
-    except Exception as e:
-        logger.error(f"❌ UI Translation failed: {e}")
-        return items
+    # Served from the ui_translations cache; only never-seen names cost an LLM call
+    return await ui_translations.translate(items, target_lang)
 
-def writer_node(state: AgentState):
+async def writer_node(state: AgentState):
     """
     Final Persona Node: Optimized for hierarchical location capture.
     """
@@ -66,31 +39,38 @@ def writer_node(state: AgentState):
 
     # DISTRICT LEVEL (Must be first)
     if not district:
-        raw = get_districts.invoke({})[:10]
-        trans = translate_ui_items(raw, current_lang)
-        rows = [{"id": r, "title": t} for r, t in zip(raw, trans)]
-        body = get_localized_ui_text(current_lang, "INTRO_DISTRICT")
+        raw = (await get_districts.ainvoke({}))[:10]
+        trans = await translate_ui_items(raw, current_lang)
+        rows = [{"id": make_row_id("DISTRICT", r), "title": t} for r, t in zip(raw, trans)]
+        body = await get_localized_ui_text(current_lang, "INTRO_DISTRICT")
         return {"messages": [AIMessage(content="LIST_REQUEST:DISTRICT", additional_kwargs={"rows": rows, "body": body})]}
     
     # BLOCK LEVEL (Triggers only if District is known)
     if not block:
-        raw = get_blocks_for_district.invoke({"district": district})[:10]
-        trans = translate_ui_items(raw, current_lang)
-        rows = [{"id": r, "title": t} for r, t in zip(raw, trans)]
-        body = get_localized_ui_text(current_lang, "SELECT_BLOCK", extra_context=district)
+        raw = (await get_blocks_for_district.ainvoke({"district": district}))[:10]
+        trans = await translate_ui_items(raw, current_lang)
+        rows = [{"id": make_row_id("BLOCK", district, r), "title": t} for r, t in zip(raw, trans)]
+        body = await get_localized_ui_text(current_lang, "SELECT_BLOCK", district=district)
         return {"messages": [AIMessage(content="LIST_REQUEST:BLOCK", additional_kwargs={"rows": rows, "body": body})]}
 
     # VILLAGE LEVEL (Triggers only if Block is known)
     if not village:
-        raw = get_villages_for_block.invoke({"block": block})[:10]
-        trans = translate_ui_items(raw, current_lang)
-        rows = [{"id": r, "title": t} for r, t in zip(raw, trans)]
-        body = get_localized_ui_text(current_lang, "SELECT_VILLAGE")
+        raw = (await get_villages_for_block.ainvoke({"block": block}))[:10]
+        trans = await translate_ui_items(raw, current_lang)
+        rows = [{"id": make_row_id("VILLAGE", district, block, r), "title": t} for r, t in zip(raw, trans)]
+        body = await get_localized_ui_text(current_lang, "SELECT_VILLAGE")
         return {"messages": [AIMessage(content="LIST_REQUEST:VILLAGE", additional_kwargs={"rows": rows, "body": body})]}
 
+    # The village tap completes onboarding; confirm it from the template
+    selection = parse_row_id(state.get("location_selection") or "")
+    if selection and selection[0] == "VILLAGE":
+        return {"messages": [AIMessage(content=await get_localized_ui_text(
+            current_lang, "ONBOARDING_DONE", user_name=user_name, village=village, block=block, district=district
+        ))]}
+
     # --- 3. FINAL NEIGHBORLY PERSONA ---
     # Once all location data is captured, provide the advice
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.2) # Low temperature for script strictness
+    llm = get_chat_model("gpt-4o", temperature=0.2) # Low temperature for script strictness
     
     persona_prompt = f"""
     You are the 'EmpowerNet Assistant', a supportive neighbor for women in rural West Bengal.
@@ -105,5 +85,6 @@ def writer_node(state: AgentState):
     - Findings: "{specialist_report}"
     """
 
-    response = llm.invoke(persona_prompt)
+    record_prompt("writer", [{"role": "user", "content": persona_prompt}])
+    response = await llm.ainvoke(persona_prompt)
     return {"messages": [AIMessage(content=response.content)]}
\ No newline at end of file
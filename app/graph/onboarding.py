@@ -0,0 +1,111 @@
+# app/graph/onboarding.py
+
+import re
+import asyncio
+import logging
+from typing import Optional
+from app.tools.spatial import location_path_exists
+from app.core.gazetteer import get_gazetteer
+from app.graph.router import route_by_rules
+
+logger = logging.getLogger(__name__)
+
+# --- MENU ROW IDS ---
+# Each list row carries its full canonical path, so a tap resolves straight to
+# the profile slots whatever language the row title was shown in:
+#   DISTRICT|NADIA   BLOCK|NADIA|RANAGHAT   VILLAGE|NADIA|RANAGHAT|ANULIA
+LEVELS = ("DISTRICT", "BLOCK", "VILLAGE")
+ROW_ID_SEP = "|"
+_BENGALI = re.compile(r"[ঀ-৿]")
+
+
+def make_row_id(level: str, *path: str) -> str:
+    return ROW_ID_SEP.join((level, *path))
+
+
+def parse_row_id(row_id: str) -> Optional[tuple]:
+    """Returns (level, path) for a well-formed row id, otherwise None."""
+    if not row_id:
+        return None
+    level, *path = row_id.split(ROW_ID_SEP)
+    if level not in LEVELS or len(path) != LEVELS.index(level) + 1 or not all(path):
+        return None
+    return level, tuple(path)
+
+
+async def resolve_selection(row_id: str) -> Optional[dict]:
+    """
+    Validates a tapped row against administrative_hierarchy.
+    Returns {'level', 'district', 'block', 'village'} or None if unknown.
+    """
+    parsed = parse_row_id(row_id)
+    if not parsed:
+        return None
+    level, path = parsed
+    if not await asyncio.to_thread(location_path_exists, path):
+        logger.warning(f"⚠️ Menu selection not in hierarchy: {row_id}")
+        return None
+    district, block, village = (path + (None, None))[:3]
+    return {"level": level, "district": district, "block": block, "village": village}
+
+
+def detect_script_language(text: str) -> Optional[str]:
+    """'Bengali' if the text contains Bengali script, 'English' for Latin text."""
+    if not text:
+        return None
+    return "Bengali" if _BENGALI.search(text) else "English"
+
+
+# --- TYPED PLACE NAMES ---
+# "baruipur", "বারুইপুর" or "I live in Baruipur" instead of a menu tap
+_LEAD_IN = re.compile(
+    r"^(i (live|stay) in|i am from|i'm from|my (village|block|district) is|from|"
+    r"amar (gram|bari)|আমার (গ্রাম|বাড়ি|ব্লক|জেলা))\s+",
+    re.IGNORECASE,
+)
+MAX_PLACE_WORDS = 4
+# Only these are certain enough to save without asking; sound-alike and trigram
+# matches ("rina" -> RINAPUR) are left to the LLM extraction
+AUTO_SAVE_METHODS = ("exact", "casefold")
+
+
+async def resolve_typed_location(text: str, profile: dict):
+    """
+    Matches a short free-typed place name against the gazetteer. Returns a Place
+    only for an exact name at the next missing level inside the saved parents;
+    otherwise None, and the LLM extraction decides.
+    """
+    if not text or profile.get("village"):
+        return None
+    name = _LEAD_IN.sub("", text.strip()).strip(" .,!?।")
+    if not name or len(name.split()) > MAX_PLACE_WORDS:
+        return None
+    # Greetings and intent keywords ("kaj chai", "hi") are never place names
+    if route_by_rules(name):
+        return None
+    gazetteer = await get_gazetteer()
+    if gazetteer is None:
+        return None
+
+    expected = "district" if not profile.get("district") else "block" if not profile.get("block") else "village"
+    match = gazetteer.lookup(name, level=expected, district=profile.get("district"), block=profile.get("block"))
+    if match is None:
+        return None
+    if match.ambiguous:
+        logger.info(f"🗺️ '{name}' is ambiguous ({len(match.places)} places via {match.method}); deferring to LLM")
+        return None
+    place = match.places[0]
+    parents = (profile.get("district"), profile.get("block"))[:len(place.path) - 1]
+    if match.method not in AUTO_SAVE_METHODS or place.level != expected or place.path[:-1] != parents:
+        logger.info(
+            f"🗺️ '{name}' ~ {place.level} {place.name} via {match.method} ({match.score}) "
+            f"is not a certain {expected}; deferring to LLM"
+        )
+        return None
+    logger.info(f"🗺️ '{name}' -> {place.level} {place.name} via {match.method} ({match.score})")
+    return place
+
+
+def row_id_for_path(path: tuple) -> str:
+    """Row id a menu tap on the same place would have carried."""
+    return make_row_id(LEVELS[len(path) - 1], *path)
@@ -0,0 +1,323 @@
+# app/graph/router.py
+
+import os
+import re
+import math
+import time
+import zlib
+import logging
+from typing import NamedTuple, Optional
+from app.utils.scheduler import TimingStats
+
+logger = logging.getLogger(__name__)
+
+# --- LOCAL ROUTING TIERS ---
+# Most turns are unambiguous ("minimum wage?", "কাজ চাই", "hi"), so they are
+# routed here in microseconds. Only low-confidence turns reach the LLM router.
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.15"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.06"))
+ACTION_AGENTS = {"legal", "reporting", "opportunity"}
+
+
+class RouteDecision(NamedTuple):
+    agent: str
+    confidence: float
+    tier: str      # "guard", "rules", "centroid" or "llm"
+    reason: str
+
+# --- TIER 1: KEYWORD & REGEX RULES ---
+# (intent, weight, pattern). Bengali has no reliable \b, so Bengali stems are
+# matched as substrings, which also covers inflections (কাজ, কাজের, কাজে).
+# Weight 2 marks terms that are specific to one intent; weight 1 is a hint.
+_RULES = [
+    # Wages, rights and labour law
+    ("legal", 2, r"\bminimum wage|\bwages?\b|\bsalary|\bovertime|\bmaternity|\blabou?r law|\bmy rights?\b|\bpf\b|\besi\b|\bgratuity|\bbonus\b|\bfired?\b (me|us)|\bdismiss|\bequal pay|\bpaid less|\bsame (job|work)"),
+    ("legal", 1, r"\bpaid\b|\bpay\b|\bunpaid|\blaw\b|\blegal|\brights?\b|\bleave\b|\bhours?\b|\bcontract"),
+    ("legal", 2, r"\bmojuri|\bmajuri|\bbeton\b|\bmaine\b|\bodhikar|\bain\b(?!['’])"),
+    ("legal", 2, r"মজুরি|মজুরী|বেতন|মাইনে|পারিশ্রমিক|ওভারটাইম|আইন|অধিকার|মাতৃত্ব|বোনাস"),
+    ("legal", 1, r"ছুটি|টাকা|ঘণ্টা|ঘন্টা"),
+    # Safety complaints and incidents
+    ("reporting", 2, r"\bunsafe|\baccident|\binjur|\bharass|\bcomplain|\breport\b|\bhelmet|\bdanger|\bbeat(en|ing)?\b|\babus|\bcollaps|\bno safety|\bthreat|\bfire (exit|broke)|\bcaught fire"),
+    ("reporting", 1, r"\bsafety|\bsafe\b|\bhurt|\bmisbehav|\bshout|\bshock\b|\bgloves|\bmasks?\b"),
+    ("reporting", 2, r"\bobhijog|\bdurghotona|\bhoyrani"),
+    ("reporting", 2, r"অভিযোগ|দুর্ঘটনা|হয়রানি|হয়রানি|বিপজ্জনক|আঘাত|মারধর|হেলমেট|খারাপ ব্যবহার|নিরাপত্তা নেই|আগুন|ভেঙে পড়"),
+    ("reporting", 1, r"নিরাপত্তা|বিপদ|চোট|ভয়"),
+    # Jobs, training and self-help groups
+    ("opportunity", 2, r"\bjobs?\b|\bvacanc|\bhiring|\bemployment|\btraining|\bcourse|\bshg\b|\bself[- ]help|\bskill|\bapprentice|\bloan"),
+    ("opportunity", 1, r"\bwork\b|\bearn|\bopportunit|\blooking for"),
+    ("opportunity", 2, r"\bchakri|\bkaaj|\bkaj\b|\bkaj chai|\bprosikkhon"),
+    ("opportunity", 2, r"চাকরি|চাকরী|প্রশিক্ষণ|স্বনির্ভর|রোজগার|কাজ চাই|কাজ খুঁজ|কাজ দরকার|কাজ পাব|ট্রেনিং|ঋণ"),
+    ("opportunity", 1, r"কাজ|দল"),
+    # Questions about the service itself, language and location changes
+    ("writer", 2, r"\bwho are you|\bwhat is (this|empowernet)|\bhow (do i|to) use|\bwhat can you do|\bspeak (hindi|bengali|bangla|english)|\bchange (my )?(location|village|district|block|language)|\bmoved to"),
+    ("writer", 2, r"আপনি কে|তুমি কে|কী করতে পার|কিভাবে ব্যবহার|ভাষা বদল|অন্য গ্রামে|ঠিকানা বদল|জায়গা বদল"),
+]
+_COMPILED_RULES = [(intent, weight, re.compile(p, re.IGNORECASE)) for intent, weight, p in _RULES]
+
+_GREETING = re.compile(
+    r"^(hi+|hello+|hey|hlo|namaskar|nomoskar|namaste|good (morning|afternoon|evening)|"
+    r"thanks?|thank you|thank u|ok(ay)?|নমস্কার|নমস্তে|হ্যালো|হাই|ধন্যবাদ|আচ্ছা|ঠিক আছে)[\s!.,?।🙏]*$",
+    re.IGNORECASE,
+)
+_GOODBYE = re.compile(
+    r"^(ok )?(bye+|good ?bye|bye bye|tata|see you|that'?s all|বিদায়|বিদায়|টাটা|আসি)[\s!.,।🙏]*$",
+    re.IGNORECASE,
+)
+
+
+def _rule_scores(text: str) -> dict:
+    scores = {}
+    for intent, weight, pattern in _COMPILED_RULES:
+        if pattern.search(text):
+            scores[intent] = scores.get(intent, 0) + weight
+    return scores
+
+
+def route_by_rules(text: str, location: tuple = ()) -> Optional[RouteDecision]:
+    """Tier 1: exact phrases and keyword weights. Returns None when the rules disagree."""
+    stripped = text.strip()
+    if not stripped:
+        return RouteDecision("writer", 1.0, "rules", "empty message")
+    if _GOODBYE.match(stripped):
+        # The writer says goodbye; routing to END would leave the user's own message as the reply
+        return RouteDecision("writer", 0.95, "rules", "goodbye")
+    if _GREETING.match(stripped):
+        return RouteDecision("writer", 0.95, "rules", "greeting")
+    # A menu pick echoes the district/block/village memory has just saved
+    if stripped.upper() in {loc.upper() for loc in location if loc}:
+        return RouteDecision("writer", 0.95, "rules", "location menu reply")
+
+    scores = _rule_scores(stripped)
+    if not scores:
+        return None
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    best, best_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0
+    if best_score >= 2 and best_score - runner_up >= 2:
+        return RouteDecision(best, 0.9, "rules", f"keywords {dict(ranked)}")
+    return None
+
+# --- TIER 2: HASHED N-GRAM NEAREST CENTROID ---
+# A bag of hashed character n-grams works for Bengali script, romanised Bengali
+# and English alike, needs no model download and embeds a message in ~50 µs.
+_DIM = 1 << 14
+
+SEED_EXAMPLES = {
+    "legal": [
+        "what is the minimum wage for a mason",
+        "my employer is not paying me the full salary",
+        "is it legal to make us work 12 hours a day",
+        "how many days of maternity leave do i get",
+        "do i get double pay for overtime",
+        "women are paid less than men for the same work",
+        "what are my rights as a construction worker",
+        "contractor cut my daily wage",
+        "dinmojurer mojuri koto",
+        "amake kom taka dicche",
+        "রাজমিস্ত্রির ন্যূনতম মজুরি কত",
+        "মালিক পুরো বেতন দিচ্ছে না",
+        "দিনে বারো ঘণ্টা কাজ করানো কি আইনসম্মত",
+        "মাতৃত্বকালীন ছুটি কত দিন পাওয়া যায়",
+        "ওভারটাইমের জন্য দ্বিগুণ টাকা পাব কি",
+        "শ্রমিকের অধিকার কী কী",
+        "they cut money from wages for every late day",
+        "can the owner make us work on sunday without extra pay",
+        "is there a law for equal pay for women",
+        "dismissed without notice, what can i do",
+        "koto ghonta kaj korano jay",
+        "মালিক বিনা নোটিশে ছাঁটাই করেছে",
+        "দেরি হলে মাইনে কেটে নেয়",
+        "রবিবার কাজ করালে কি বেশি টাকা পাওয়ার কথা",
+    ],
+    "reporting": [
+        "there is no helmet or safety gear at the site",
+        "a worker fell from the scaffolding yesterday",
+        "the supervisor harasses the women workers",
+        "i want to file a complaint about my workplace",
+        "the building we work in has cracks and may collapse",
+        "we got an electric shock from open wires",
+        "the manager beat a worker",
+        "no transport for the night shift women, it is unsafe",
+        "site e kono safety nei",
+        "ami obhijog korte chai",
+        "কাজের জায়গায় কোনো নিরাপত্তা নেই",
+        "গতকাল একজন শ্রমিক মাচা থেকে পড়ে গেছে",
+        "সুপারভাইজার মহিলাদের হয়রানি করে",
+        "আমি অভিযোগ জানাতে চাই",
+        "কারখানায় আগুন লেগেছিল কোনো ব্যবস্থা নেই",
+        "মালিক শ্রমিককে মারধর করেছে",
+        "the owner threatens to hurt us if we complain",
+        "no first aid box and no drinking water at the site",
+        "workers are handling chemicals without gloves",
+        "the contractor abuses and shouts at the women",
+        "ekhane kaj kora khub bipodjonok",
+        "ঠিকাদার গালিগালাজ করে ভয় দেখায়",
+        "কারখানায় মাস্ক বা গ্লাভস দেয় না",
+        "মাচা খুব নড়বড়ে যে কোনো সময় পড়ে যাবে",
+    ],
+    "opportunity": [
+        "i am looking for a job near my village",
+        "any work available for a plumber",
+        "i want to learn tailoring, is there any training",
+        "how can i join a self help group",
+        "are there jobs for women in my block",
+        "i need work, i know driving",
+        "is there any skill course for electricians",
+        "kaj chai",
+        "amar gram e kono chakri ache",
+        "selai shikhte chai",
+        "আমার গ্রামের কাছে কাজ খুঁজছি",
+        "প্লাম্বারের কোনো কাজ আছে কি",
+        "সেলাই শিখতে চাই কোনো প্রশিক্ষণ আছে",
+        "স্বনির্ভর গোষ্ঠীতে কিভাবে যোগ দেব",
+        "মহিলাদের জন্য কোনো চাকরি আছে",
+        "আমি গাড়ি চালাতে পারি কাজ দরকার",
+        "what work can i get after class 8",
+        "i want to start a small business with a loan",
+        "any government scheme for jobs for youth",
+        "is there any vacancy in the nearby factory",
+        "notun kaj shikhte chai",
+        "মাধ্যমিক পাশ করেছি কী কাজ পাব",
+        "ছোট ব্যবসা শুরু করতে চাই",
+        "কাছাকাছি কারখানায় লোক নিচ্ছে কি",
+    ],
+    "writer": [
+        "hello",
+        "hi there",
+        "good morning",
+        "who are you",
+        "what can you do",
+        "thank you so much",
+        "i want to change my location",
+        "my name is rina",
+        "change language to bengali",
+        "namaskar",
+        "তুমি কে",
+        "নমস্কার",
+        "তুমি কী কী করতে পারো",
+        "ধন্যবাদ",
+        "আমার নাম রিনা",
+        "বাংলায় কথা বলো",
+        "what is this service",
+        "how does this work",
+        "i have moved, update my address",
+        "reply in english please",
+        "apni ke",
+        "আপনারা কারা",
+        "আমি নতুন জায়গায় থাকি",
+        "ইংরেজিতে উত্তর দিন",
+        # Farewells get a goodbye from the writer rather than ending the turn silently
+        "bye",
+        "goodbye",
+        "ok bye",
+        "that's all, bye",
+        "tata",
+        "বিদায়",
+        "আজ এই পর্যন্ত বিদায়",
+        "আসি",
+    ],
+}
+
+
+def _normalize(text: str) -> str:
+    # Bengali vowel signs are combining marks, not \w, so the whole block is kept
+    return " ".join(re.sub(r"[^\w\s\u0980-\u09FF]", " ", text.casefold()).split())
+
+
+def _hashed_ngrams(text: str) -> dict:
+    counts = {}
+    for word in _normalize(text).split():
+        padded = f" {word} "
+        for n in (3, 4, 5):
+            for i in range(len(padded) - n + 1):
+                idx = zlib.crc32(padded[i:i + n].encode()) % _DIM
+                counts[idx] = counts.get(idx, 0) + 1
+    return counts
+
+
+def _unit(vec: dict) -> dict:
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {k: v / norm for k, v in vec.items()}
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class CentroidClassifier:
+    """
+    TF-IDF weighted hashed character 3- to 5-grams, one L2-normalised centroid
+    per intent. IDF comes from the seed set, so fillers shared by every intent
+    (আছে, কোনো, is there) barely move the score.
+    """
+
+    def __init__(self, examples: dict):
+        docs = [text for texts in examples.values() for text in texts]
+        df = {}
+        for text in docs:
+            for idx in _hashed_ngrams(text):
+                df[idx] = df.get(idx, 0) + 1
+        self.idf = {idx: math.log((len(docs) + 1) / (n + 1)) + 1 for idx, n in df.items()}
+        self.default_idf = math.log(len(docs) + 1) + 1
+        self.centroids = {}
+        for intent, texts in examples.items():
+            total = {}
+            for text in texts:
+                for k, v in self.embed(text).items():
+                    total[k] = total.get(k, 0.0) + v
+            self.centroids[intent] = _unit(total)
+
+    def embed(self, text: str) -> dict:
+        counts = _hashed_ngrams(text)
+        return _unit({k: c * self.idf.get(k, self.default_idf) for k, c in counts.items()})
+
+    def rank(self, text: str) -> list:
+        """[(similarity, intent), ...] best first."""
+        vec = self.embed(text)
+        return sorted(((_cosine(vec, c), intent) for intent, c in self.centroids.items()), reverse=True)
+
+
+classifier = CentroidClassifier(SEED_EXAMPLES)
+
+
+def route_by_centroid(text: str) -> Optional[RouteDecision]:
+    """Tier 2: nearest intent centroid, accepted only with a clear margin."""
+    if not _normalize(text):
+        return None
+    (best_sim, best), (second_sim, _) = classifier.rank(text)[:2]
+    if best_sim >= ROUTER_MIN_SIMILARITY and best_sim - second_sim >= ROUTER_MIN_MARGIN:
+        return RouteDecision(best, round(best_sim, 3), "centroid", f"margin {best_sim - second_sim:.2f}")
+    return None
+
+# --- ENTRY POINT ---
+
+router_stats = {"guard": 0, "rules": 0, "centroid": 0, "llm": 0, "latency": TimingStats()}
+
+
+def route_locally(text: str, location: tuple = ()) -> Optional[RouteDecision]:
+    """Runs the local tiers in order. None means the LLM router has to decide."""
+    started = time.perf_counter()
+    decision = route_by_rules(text, location) or route_by_centroid(text)
+    router_stats["latency"].add(time.perf_counter() - started)
+    return decision
+
+
+def record_decision(decision: RouteDecision):
+    router_stats[decision.tier] += 1
+    logger.info(
+        f"🧭 Router [{decision.tier}] -> {decision.agent} "
+        f"(confidence {decision.confidence}) | {decision.reason}"
+    )
+
+
+def get_router_stats() -> dict:
+    decided = sum(router_stats[t] for t in ("guard", "rules", "centroid", "llm"))
+    local = decided - router_stats["llm"]
+    return {
+        "decisions": decided,
+        "by_tier": {t: router_stats[t] for t in ("guard", "rules", "centroid", "llm")},
+        "local_rate": round(local / decided, 3) if decided else 0.0,
+        "latency": router_stats["latency"].snapshot(),
+    }
@@ -1,6 +1,6 @@
 # app/graph/state.py
 
-from typing import Annotated, Sequence, TypedDict, Optional
+from typing import Annotated, Sequence, TypedDict, Optional, Any
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
@@ -22,6 +22,7 @@ class AgentState(TypedDict):
     district: Optional[str]        # e.g., '24 PARGANAS NORTH'
     block: Optional[str]           # e.g., 'AMDANGA'
     village: Optional[str]         # e.g., 'ADHATA'
+    location_selection: Optional[str]  # Row id of a tapped menu item this turn, e.g. 'BLOCK|NADIA|RANAGHAT'
     
     # 4. Professional Context
     user_skills: Optional[str]
@@ -32,4 +33,12 @@ class AgentState(TypedDict):
     lon: Optional[float]
     
     # 6. Routing Context
-    next_agent: Optional[str]
\ No newline at end of file
+    next_agent: Optional[str]
+
+    # 7. Profile Snapshot (persisted by the checkpointer between turns)
+    profile: Optional[dict[str, Any]]  # user_profile row as last read or written by memory
+    profile_synced_at: Optional[float]  # epoch seconds of that read/write
+
+    # 8. Conversation Summary (older turns, folded by the history node)
+    history_summary: Optional[str]
+    history_folded_id: Optional[str]  # id of the newest message already in the summary
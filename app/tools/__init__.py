@@ -0,0 +1,8 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Deadline for one opportunity lookup: the node stops waiting after it and the
+# tools ask Postgres to cancel their query after the same time
+OPPORTUNITY_TOOL_TIMEOUT = float(os.getenv("OPPORTUNITY_TOOL_TIMEOUT", "8"))
@@ -1,20 +1,48 @@
 # app/tools/community.py
 
-import os
 import logging
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+from app.utils.tracing import traced
+from app.core.db import db_pool
+from app.tools import OPPORTUNITY_TOOL_TIMEOUT
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-DB_URL = os.getenv("DATABASE_URL", "")
-if DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
+# Table: self_help_groups
+# Columns: shg_name, leader_name (NOT group_name / contact_person)
+SHG_QUERY = """
+    SELECT
+        shg_name,
+        leader_name,
+        contact_number,
+        district,
+        block,
+        gram_panchayat,
+        village,
+        category,
+        formation_date,
+        nrlm_shg_id
+    FROM self_help_groups
+    WHERE
+        village  = %s
+        OR block = %s
+        OR district = %s
+    ORDER BY
+        (CASE
+            WHEN village  = %s THEN 1
+            WHEN block    = %s THEN 2
+            WHEN district = %s THEN 3
+            ELSE 4
+        END) ASC,
+        shg_name ASC
+    LIMIT 10;
+"""
 
 @tool("find_nearby_shgs")
+@traced("tool", "find_nearby_shgs")
 def find_nearby_shgs(district: str, block: str, village: str):
     """
     Locates Self-Help Groups (SHGs) and community circles near the user.
@@ -23,40 +51,10 @@ def find_nearby_shgs(district: str, block: str, village: str):
     Priority 3: Groups in the same District.
     """
 
-    # Table: self_help_groups
-    # Columns: shg_name, leader_name (NOT group_name / contact_person)
-    query = """
-        SELECT
-            shg_name,
-            leader_name,
-            contact_number,
-            district,
-            block,
-            gram_panchayat,
-            village,
-            category,
-            formation_date,
-            nrlm_shg_id
-        FROM self_help_groups
-        WHERE
-            village  = %s
-            OR block = %s
-            OR district = %s
-        ORDER BY
-            (CASE
-                WHEN village  = %s THEN 1
-                WHEN block    = %s THEN 2
-                WHEN district = %s THEN 3
-                ELSE 4
-            END) ASC,
-            shg_name ASC
-        LIMIT 10;
-    """
-
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, (
+        with db_pool.cursor(cursor_factory=RealDictCursor, timeout=OPPORTUNITY_TOOL_TIMEOUT,
+                            statement_timeout=OPPORTUNITY_TOOL_TIMEOUT) as cur:
+            cur.execute(SHG_QUERY, (
                 village, block, district,   # WHERE
                 village, block, district,   # ORDER BY
             ))
@@ -93,7 +91,4 @@ def find_nearby_shgs(district: str, block: str, village: str):
 
     except Exception as e:
         logger.error(f"❌ Community Tool Error: {e}")
-        return f"Error searching for community groups in {block}."
-    finally:
-        if "conn" in locals():
-            conn.close()
\ No newline at end of file
+        return f"Error searching for community groups in {block}."
\ No newline at end of file
@@ -2,10 +2,12 @@ import logging
 from langchain_core.tools import tool
 # Import your RAG search. Using 'as' lets us use the new name immediately.
 from app.core.search import empower_search
+from app.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 @tool("check_labor_compliance")
+@traced("tool", "check_labor_compliance")
 def check_labor_compliance(query: str):
     """
     Search the 2026 West Bengal Labor Laws. 
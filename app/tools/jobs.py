@@ -1,20 +1,57 @@
 # app/tools/jobs.py
 
-import os
 import logging
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+from app.utils.tracing import traced
+from app.core.db import db_pool
+from app.tools import OPPORTUNITY_TOOL_TIMEOUT
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-DB_URL = os.getenv("DATABASE_URL", "")
-if DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
+JOBS_QUERY = """
+    SELECT
+        job_title,
+        description,
+        category,
+        district,
+        block,
+        gram_panchayat,
+        village,
+        pay_rate_daily,
+        duration_days,
+        start_date,
+        ngo_partner_name,
+        contact_person,
+        contact_number,
+        safety_score
+    FROM vetted_jobs
+    WHERE
+        is_active = TRUE
+        AND (
+            village  = %s
+            OR block = %s
+            OR district = %s
+            OR job_title  ILIKE %s
+            OR category   ILIKE %s
+            OR description ILIKE %s
+        )
+    ORDER BY
+        (CASE
+            WHEN village  = %s THEN 1
+            WHEN block    = %s THEN 2
+            WHEN district = %s THEN 3
+            ELSE 4
+        END) ASC,
+        safety_score DESC,
+        created_at DESC
+    LIMIT 10;
+"""
 
 @tool("match_local_jobs")
+@traced("tool", "match_local_jobs")
 def match_local_jobs(skills: str, district: str, block: str, village: str):
     """
     Finds verified job openings for unorganised sector workers.
@@ -26,49 +63,10 @@ def match_local_jobs(skills: str, district: str, block: str, village: str):
 
     search_term = f"%{skills}%" if skills and str(skills).lower() != "none" else "%"
 
-    query = """
-        SELECT
-            job_title,
-            description,
-            category,
-            district,
-            block,
-            gram_panchayat,
-            village,
-            pay_rate_daily,
-            duration_days,
-            start_date,
-            ngo_partner_name,
-            contact_person,
-            contact_number,
-            safety_score
-        FROM vetted_jobs
-        WHERE
-            is_active = TRUE
-            AND (
-                village  = %s
-                OR block = %s
-                OR district = %s
-                OR job_title  ILIKE %s
-                OR category   ILIKE %s
-                OR description ILIKE %s
-            )
-        ORDER BY
-            (CASE
-                WHEN village  = %s THEN 1
-                WHEN block    = %s THEN 2
-                WHEN district = %s THEN 3
-                ELSE 4
-            END) ASC,
-            safety_score DESC,
-            created_at DESC
-        LIMIT 10;
-    """
-
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, (
+        with db_pool.cursor(cursor_factory=RealDictCursor, timeout=OPPORTUNITY_TOOL_TIMEOUT,
+                            statement_timeout=OPPORTUNITY_TOOL_TIMEOUT) as cur:
+            cur.execute(JOBS_QUERY, (
                 village, block, district,                   # WHERE location
                 search_term, search_term, search_term,      # WHERE skills
                 village, block, district,                   # ORDER BY priority
@@ -101,7 +99,4 @@ def match_local_jobs(skills: str, district: str, block: str, village: str):
 
     except Exception as e:
         logger.error(f"❌ Vetted Jobs Tool Error: {e}")
-        return "I'm having a little trouble looking at the job list right now. Please try again in a moment."
-    finally:
-        if "conn" in locals():
-            conn.close()
\ No newline at end of file
+        return "I'm having a little trouble looking at the job list right now. Please try again in a moment."
\ No newline at end of file
@@ -1,17 +1,12 @@
-import os
+import asyncio
 import logging
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
+from app.core.db import db_pool
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# Handle Neon/Postgres URL naming
-DB_URL = os.getenv("DATABASE_URL", "")
-if DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
-
 def upsert_user_profile(
     phone_number: str, 
     name: str = None, 
@@ -43,14 +38,11 @@ def upsert_user_profile(
     """
     
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, (
-                    phone_number, name, language, district, block, 
-                    village, occupation, skill_level
-                ))
-        conn.close()
+        with db_pool.cursor() as cur:
+            cur.execute(sql, (
+                phone_number, name, language, district, block, 
+                village, occupation, skill_level
+            ))
         return True
     except Exception as e:
         logger.error(f"❌ Database Upsert Error: {e}")
@@ -67,8 +59,7 @@ def get_user_context(phone_number: str):
         WHERE phone_number = %s
     """
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with db_pool.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(sql, (phone_number,))
             res = cur.fetchone()
             if res:
@@ -77,6 +68,41 @@ def get_user_context(phone_number: str):
     except Exception as e:
         logger.error(f"❌ Database Retrieval Error: {e}")
         return None
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+
+def set_user_location(phone_number: str, district: str, block: str = None, village: str = None):
+    """
+    Writes the location slots as given (NULLs included, so picking a new district
+    clears a stale block/village) and returns the name & language in the same round trip.
+    """
+    sql = """
+        INSERT INTO user_profile (phone_number, district, block, village)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (phone_number) DO UPDATE SET
+            district = EXCLUDED.district,
+            block = EXCLUDED.block,
+            village = EXCLUDED.village
+        RETURNING full_name, preferred_lang;
+    """
+    try:
+        with db_pool.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(sql, (phone_number, district, block, village))
+            return dict(cur.fetchone())
+    except Exception as e:
+        logger.error(f"❌ Database Location Update Error: {e}")
+        return None
+
+# --- ASYNC ENTRY POINTS ---
+# psycopg2 has no native async API, so the swarm awaits these wrappers
+# and the blocking round trip runs on a worker thread instead of the event loop.
+
+async def aupsert_user_profile(phone_number: str, **fields):
+    """Async variant of upsert_user_profile for the swarm nodes."""
+    return await asyncio.to_thread(upsert_user_profile, phone_number, **fields)
+
+async def aget_user_context(phone_number: str):
+    """Async variant of get_user_context for the swarm nodes."""
+    return await asyncio.to_thread(get_user_context, phone_number)
+
+async def aset_user_location(phone_number: str, district: str, block: str = None, village: str = None):
+    """Async variant of set_user_location for the swarm nodes."""
+    return await asyncio.to_thread(set_user_location, phone_number, district, block, village)
@@ -1,20 +1,14 @@
-import os
 import logging
 from langchain_core.tools import tool
-from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from app.utils.tracing import traced
+from app.core.db import db_pool
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# Handle Postgres URL for Neon/SQLAlchemy compatibility
-raw_url = os.getenv("DATABASE_URL", "")
-if raw_url.startswith("postgres://"):
-    raw_url = raw_url.replace("postgres://", "postgresql://", 1)
-
-engine = create_engine(raw_url)
-
 @tool("submit_safety_report")
+@traced("tool", "submit_safety_report")
 def submit_safety_report(user_id: str, description: str, category: str, district: str, block: str, village: str):
     """
     Logs a safety complaint in English and automatically updates the safety score 
@@ -22,24 +16,25 @@ def submit_safety_report(user_id: str, description: str, category: str, district
     """
     
     # 1. SQL to insert the report using Hierarchy instead of lat/lon
-    insert_query = text("""
+    insert_query = """
         INSERT INTO safety_reports (user_id, description, category, district, block, village, reported_at)
-        VALUES (:uid, :desc, :cat, :dist, :block, :vill, CURRENT_TIMESTAMP)
+        VALUES (%(uid)s, %(desc)s, %(cat)s, %(dist)s, %(block)s, %(vill)s, CURRENT_TIMESTAMP)
         RETURNING id;
-    """)
+    """
     
     # 2. SQL to penalize job sites in the same Village/Block
     # This ensures your "Swarm" penalizes the right local area without needing GPS.
-    update_score_query = text("""
+    update_score_query = """
         UPDATE vetted_jobs
         SET safety_score = GREATEST(1.0, safety_score - 0.5)
-        WHERE village = :vill AND block = :block;
-    """)
+        WHERE village = %(vill)s AND block = %(block)s;
+    """
     
     try:
-        with engine.begin() as conn:
+        # The report and the penalty commit together, or not at all
+        with db_pool.transaction() as conn, conn.cursor() as cur:
             # Execute the insert
-            result = conn.execute(insert_query, {
+            cur.execute(insert_query, {
                 "uid": user_id, 
                 "desc": description, 
                 "cat": category, 
@@ -47,14 +42,14 @@ def submit_safety_report(user_id: str, description: str, category: str, district
                 "block": block,
                 "vill": village
             })
-            report_id = result.fetchone()[0]
+            report_id = cur.fetchone()[0]
             
             # Execute the score update for that specific village/block
-            update_result = conn.execute(update_score_query, {
+            cur.execute(update_score_query, {
                 "vill": village,
                 "block": block
             })
-            affected_sites = update_result.rowcount
+            affected_sites = cur.rowcount
             
             logger.info(f"🚩 Safety Report #{report_id} logged. {affected_sites} sites in {village} penalized.")
             
@@ -1,86 +1,142 @@
 # app/tools/spatial.py
 
 import os
+import time
 import logging
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from geopy.geocoders import Nominatim
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+from app.utils.tracing import traced
+from app.core.db import db_pool
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# Database Connection Logic
-DB_URL = os.getenv("DATABASE_URL", "")
-if DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
+# --- HIERARCHY CACHE ---
+# District / Block / Village lists change only when the hierarchy table is reloaded,
+# yet every onboarding menu asks for them. Non-empty results are kept in-process.
+HIERARCHY_CACHE_TTL = int(os.getenv("HIERARCHY_CACHE_TTL", "21600"))
+_hierarchy_cache = {}
 
-# --- 1. HIERARCHICAL LOCATION TOOLS (New) ---
+def _cached_list(key: tuple, loader):
+    hit = _hierarchy_cache.get(key)
+    if hit and time.monotonic() - hit[0] < HIERARCHY_CACHE_TTL:
+        return list(hit[1])
+    rows = loader()
+    if rows:
+        _hierarchy_cache[key] = (time.monotonic(), rows)
+    return list(rows)
 
-@tool
-def get_districts() -> list[str]:
+def prime_hierarchy_cache() -> int:
     """
-    Fetches a list of all unique districts in West Bengal from the hierarchy table.
-    Use this to show the first-level selection menu on WhatsApp.
+    Fills the district and block menus with one query (used by app warm-up).
+    Returns the number of cached lists.
     """
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor() as cur:
+        with db_pool.cursor() as cur:
+            cur.execute("SELECT DISTINCT district, block FROM administrative_hierarchy ORDER BY district, block;")
+            pairs = cur.fetchall()
+    except Exception as e:
+        logger.error(f"❌ Error priming hierarchy cache: {e}")
+        return 0
+
+    now = time.monotonic()
+    blocks_by_district = {}
+    for district, block in pairs:
+        blocks_by_district.setdefault(district, []).append(block)
+    if blocks_by_district:
+        _hierarchy_cache[("district",)] = (now, list(blocks_by_district))
+    for district, blocks in blocks_by_district.items():
+        _hierarchy_cache[("block", district)] = (now, blocks)
+    return len(_hierarchy_cache)
+
+# --- 1. HIERARCHICAL LOCATION TOOLS (New) ---
+
+def _fetch_districts() -> list[str]:
+    try:
+        with db_pool.cursor() as cur:
             cur.execute("SELECT DISTINCT district FROM administrative_hierarchy ORDER BY district;")
             districts = [row[0] for row in cur.fetchall()]
             return districts
     except Exception as e:
         logger.error(f"❌ Error fetching districts: {e}")
         return []
-    finally:
-        if 'conn' in locals(): conn.close()
 
-@tool
-def get_blocks_for_district(district: str) -> list[str]:
-    """
-    Fetches all unique blocks within a selected district.
-    Use this for the second-level selection menu.
-    """
+def _fetch_blocks(district: str) -> list[str]:
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor() as cur:
+        with db_pool.cursor() as cur:
             cur.execute(
                 "SELECT DISTINCT block FROM administrative_hierarchy WHERE district = %s ORDER BY block;", 
-                (district.upper(),)
+                (district,)
             )
             blocks = [row[0] for row in cur.fetchall()]
             return blocks
     except Exception as e:
         logger.error(f"❌ Error fetching blocks for {district}: {e}")
         return []
-    finally:
-        if 'conn' in locals(): conn.close()
 
-@tool
-def get_villages_for_block(block: str) -> list[str]:
-    """
-    Fetches all unique villages within a selected block.
-    Use this for the final-level selection menu.
-    """
+def _fetch_villages(block: str) -> list[str]:
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor() as cur:
+        with db_pool.cursor() as cur:
             cur.execute(
                 "SELECT DISTINCT village FROM administrative_hierarchy WHERE block = %s ORDER BY village;", 
-                (block.upper(),)
+                (block,)
             )
             villages = [row[0] for row in cur.fetchall()]
             return villages
     except Exception as e:
         logger.error(f"❌ Error fetching villages for {block}: {e}")
         return []
-    finally:
-        if 'conn' in locals(): conn.close()
+
+
+@tool
+@traced("tool")
+def get_districts() -> list[str]:
+    """
+    Fetches a list of all unique districts in West Bengal from the hierarchy table.
+    Use this to show the first-level selection menu on WhatsApp.
+    """
+    return _cached_list(("district",), _fetch_districts)
+
+@tool
+@traced("tool")
+def get_blocks_for_district(district: str) -> list[str]:
+    """
+    Fetches all unique blocks within a selected district.
+    Use this for the second-level selection menu.
+    """
+    district = district.upper()
+    return _cached_list(("block", district), lambda: _fetch_blocks(district))
+
+@tool
+@traced("tool")
+def get_villages_for_block(block: str) -> list[str]:
+    """
+    Fetches all unique villages within a selected block.
+    Use this for the final-level selection menu.
+    """
+    block = block.upper()
+    return _cached_list(("village", block), lambda: _fetch_villages(block))
+
+def location_path_exists(path: tuple) -> bool:
+    """
+    Checks a (district[, block[, village]]) path against administrative_hierarchy,
+    level by level, using the same cached lists that build the menus.
+    """
+    district, block, village = (tuple(path) + (None, None, None))[:3]
+    if not district or district not in _cached_list(("district",), _fetch_districts):
+        return False
+    if block and block not in _cached_list(("block", district), lambda: _fetch_blocks(district)):
+        return False
+    if village and village not in _cached_list(("village", block), lambda: _fetch_villages(block)):
+        return False
+    return True
 
 # --- 2. GEOCODING TOOLS (Legacy / Fallback) ---
 
 @tool
+@traced("tool")
 def get_lat_lon_from_name(location_name: str) -> str:
     """
     Converts a location name into latitude and longitude.
@@ -99,6 +155,7 @@ def get_lat_lon_from_name(location_name: str) -> str:
         return "None, None"
 
 @tool
+@traced("tool")
 def decode_location_from_coordinates(lat: float, lon: float) -> str:
     """
     Converts GPS coordinates into a village or district name.
@@ -1,20 +1,50 @@
 # app/tools/training.py
 
-import os
 import logging
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+from app.utils.tracing import traced
+from app.core.db import db_pool
+from app.tools import OPPORTUNITY_TOOL_TIMEOUT
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-DB_URL = os.getenv("DATABASE_URL", "")
-if DB_URL.startswith("postgres://"):
-    DB_URL = DB_URL.replace("postgres://", "postgresql://", 1)
+# training_programs table has: district, location_details (no village/block columns)
+# We use district for location matching and category/course_name for keyword matching.
+TRAINING_QUERY = """
+    SELECT
+        course_name,
+        agency_name,
+        category,
+        skill_level,
+        duration_hours,
+        enrollment_deadline,
+        course_fee,
+        stipend_provided,
+        certification_type,
+        min_wage_guarantee,
+        district,
+        location_details,
+        source_url
+    FROM training_programs
+    WHERE (
+        district ILIKE %s
+        OR course_name ILIKE %s
+        OR category ILIKE %s
+    )
+    ORDER BY
+        (CASE
+            WHEN district ILIKE %s THEN 1
+            ELSE 2
+        END) ASC,
+        enrollment_deadline ASC NULLS LAST
+    LIMIT 5;
+"""
 
 @tool("match_training_programs")
+@traced("tool", "match_training_programs")
 def get_training_programs(category: str, district: str, block: str, village: str):
     """
     Finds vocational training and skill-building programs for unorganised sector workers.
@@ -23,43 +53,11 @@ def get_training_programs(category: str, district: str, block: str, village: str
 
     search_term = f"%{category}%" if category and str(category).lower() != "none" else "%"
 
-    # training_programs table has: district, location_details (no village/block columns)
-    # We use district for location matching and category/course_name for keyword matching.
-    query = """
-        SELECT
-            course_name,
-            agency_name,
-            category,
-            skill_level,
-            duration_hours,
-            enrollment_deadline,
-            course_fee,
-            stipend_provided,
-            certification_type,
-            min_wage_guarantee,
-            district,
-            location_details,
-            source_url
-        FROM training_programs
-        WHERE (
-            district ILIKE %s
-            OR course_name ILIKE %s
-            OR category ILIKE %s
-        )
-        ORDER BY
-            (CASE
-                WHEN district ILIKE %s THEN 1
-                ELSE 2
-            END) ASC,
-            enrollment_deadline ASC NULLS LAST
-        LIMIT 5;
-    """
-
     try:
-        conn = psycopg2.connect(DB_URL)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with db_pool.cursor(cursor_factory=RealDictCursor, timeout=OPPORTUNITY_TOOL_TIMEOUT,
+                            statement_timeout=OPPORTUNITY_TOOL_TIMEOUT) as cur:
             dist_term = f"%{district}%" if district else "%"
-            cur.execute(query, (
+            cur.execute(TRAINING_QUERY, (
                 dist_term, search_term, search_term,   # WHERE
                 dist_term,                             # ORDER BY
             ))
@@ -96,7 +94,4 @@ def get_training_programs(category: str, district: str, block: str, village: str
 
     except Exception as e:
         logger.error(f"❌ Training Tool Error: {e}")
-        return "I'm having a little trouble looking up the training list right now. Please try again in a bit."
-    finally:
-        if "conn" in locals():
-            conn.close()
\ No newline at end of file
+        return "I'm having a little trouble looking up the training list right now. Please try again in a bit."
\ No newline at end of file
@@ -0,0 +1,260 @@
+# app/utils/dedup.py
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Meta retries a webhook for up to ~24h, so IDs must outlive that window.
+DEFAULT_TTL_SECONDS = int(os.getenv("DEDUP_TTL_SECONDS", "86400"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "20000"))
+DEFAULT_SQLITE_PATH = os.getenv("DEDUP_SQLITE_PATH", ".cache/dedup.sqlite3")
+
+# --- 1. BACKENDS ---
+# Every backend exposes the same two calls:
+#   mark_seen(msg_id, now) -> True if the ID was already seen (i.e. a duplicate)
+#   discard(msg_id)        -> forget an ID so a later retry is processed again
+
+class MemoryDedupBackend:
+    """
+    In-process TTL store with a size cap. The OrderedDict keeps insertion
+    order, so the oldest ID is always at the front and eviction is O(1).
+    """
+    blocking = False
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark_seen(self, msg_id: str, now: float) -> bool:
+        with self._lock:
+            # Drop expired IDs from the old end first
+            cutoff = now - self.ttl_seconds
+            while self._seen:
+                oldest_id, seen_at = next(iter(self._seen.items()))
+                if seen_at >= cutoff:
+                    break
+                self._seen.popitem(last=False)
+
+            if msg_id in self._seen:
+                # Left in place: the TTL runs from the first sighting, as in the
+                # SQL backends, and the dict stays ordered by seen_at for the sweep
+                return True
+
+            self._seen[msg_id] = now
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
+
+    def discard(self, msg_id: str):
+        with self._lock:
+            self._seen.pop(msg_id, None)
+
+    def size(self) -> int:
+        return len(self._seen)
+
+
+class SQLiteDedupBackend:
+    """
+    File-backed store shared by every uvicorn worker on the same host.
+    Expired rows are overwritten in place, so a late retry after the TTL
+    counts as a new message.
+    """
+    blocking = True
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_messages (
+                msg_id  TEXT PRIMARY KEY,
+                seen_at REAL NOT NULL
+            );
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_messages_seen_at ON processed_messages (seen_at);")
+
+    def mark_seen(self, msg_id: str, now: float) -> bool:
+        with self._lock:
+            cur = self._conn.execute("""
+                INSERT INTO processed_messages (msg_id, seen_at) VALUES (?, ?)
+                ON CONFLICT (msg_id) DO UPDATE SET seen_at = excluded.seen_at
+                WHERE processed_messages.seen_at < ?;
+            """, (msg_id, now, now - self.ttl_seconds))
+            inserted = cur.rowcount == 1
+
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+            return not inserted
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM processed_messages WHERE seen_at < ?;", (now - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM processed_messages WHERE msg_id IN (
+                SELECT msg_id FROM processed_messages ORDER BY seen_at DESC LIMIT -1 OFFSET ?
+            );
+        """, (self.max_entries,))
+
+    def discard(self, msg_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM processed_messages WHERE msg_id = ?;", (msg_id,))
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed_messages;").fetchone()[0]
+
+
+class PostgresDedupBackend:
+    """
+    Shared store for workers on different hosts. A single
+    INSERT ... ON CONFLICT decides atomically whether the ID is new.
+    Like the SQLite store, it is pruned to the TTL and the size cap every
+    PRUNE_EVERY writes, oldest rows first.
+    """
+    blocking = True
+    PRUNE_EVERY = 500
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        from app.core.db import db_pool
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        self._pool = db_pool
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS processed_messages (
+                    msg_id  TEXT PRIMARY KEY,
+                    seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                CREATE INDEX IF NOT EXISTS idx_processed_messages_seen_at ON processed_messages (seen_at);
+            """)
+
+    def mark_seen(self, msg_id: str, now: float) -> bool:
+        with self._pool.cursor() as cur:
+            cur.execute("""
+                INSERT INTO processed_messages (msg_id, seen_at) VALUES (%s, TO_TIMESTAMP(%s))
+                ON CONFLICT (msg_id) DO UPDATE SET seen_at = EXCLUDED.seen_at
+                WHERE processed_messages.seen_at < TO_TIMESTAMP(%s)
+                RETURNING msg_id;
+            """, (msg_id, now, now - self.ttl_seconds))
+            inserted = cur.fetchone() is not None
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            try:
+                self._prune(now)
+            except Exception as e:
+                # The ID is already recorded; a missed prune is retried PRUNE_EVERY writes later
+                logger.warning(f"⚠️ Dedup prune failed: {e}")
+        return not inserted
+
+    def _prune(self, now: float):
+        with self._pool.cursor() as cur:
+            cur.execute("DELETE FROM processed_messages WHERE seen_at < TO_TIMESTAMP(%s);", (now - self.ttl_seconds,))
+            cur.execute("""
+                DELETE FROM processed_messages WHERE msg_id IN (
+                    SELECT msg_id FROM processed_messages ORDER BY seen_at DESC OFFSET %s
+                );
+            """, (self.max_entries,))
+
+    def discard(self, msg_id: str):
+        with self._pool.cursor() as cur:
+            cur.execute("DELETE FROM processed_messages WHERE msg_id = %s;", (msg_id,))
+
+    def size(self) -> int:
+        with self._pool.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM processed_messages;")
+            return cur.fetchone()[0]
+
+# --- 2. THE DEDUPLICATOR ---
+
+class MessageDeduplicator:
+    """
+    Anti-retry shield for Meta webhooks. Wraps a backend and keeps
+    hit/miss counters so the store can be sized against the retry rate.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def is_duplicate(self, msg_id: str) -> bool:
+        """Records the ID and returns True if it was already processed."""
+        now = time.time()
+        try:
+            if self.backend.blocking:
+                seen = await asyncio.to_thread(self.backend.mark_seen, msg_id, now)
+            else:
+                seen = self.backend.mark_seen(msg_id, now)
+        except Exception as e:
+            # Fail open: a duplicate reply is better than a dropped message
+            self.errors += 1
+            logger.error(f"❌ Dedup Backend Error: {e}")
+            return False
+
+        if seen:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return seen
+
+    async def forget(self, msg_id: str):
+        """Removes an ID, e.g. when the message was rejected and Meta should retry it."""
+        try:
+            if self.backend.blocking:
+                await asyncio.to_thread(self.backend.discard, msg_id)
+            else:
+                self.backend.discard(msg_id)
+        except Exception as e:
+            logger.error(f"❌ Dedup Discard Error: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "ttl_seconds": self.backend.ttl_seconds,
+        }
+
+
+def build_deduplicator(kind: str = None) -> MessageDeduplicator:
+    """Creates the deduplicator selected by DEDUP_BACKEND (memory, sqlite or postgres)."""
+    kind = (kind or os.getenv("DEDUP_BACKEND", "sqlite")).lower()
+    try:
+        if kind == "postgres":
+            backend = PostgresDedupBackend()
+        elif kind == "sqlite":
+            backend = SQLiteDedupBackend()
+        else:
+            backend = MemoryDedupBackend()
+    except Exception as e:
+        logger.error(f"❌ Dedup backend '{kind}' unavailable, falling back to memory: {e}")
+        backend = MemoryDedupBackend()
+
+    logger.info(f"🛡️ Dedup store ready: {type(backend).__name__}")
+    return MessageDeduplicator(backend)
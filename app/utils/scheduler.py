@@ -0,0 +1,137 @@
+# app/utils/scheduler.py
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("SWARM_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_QUEUE_DEPTH = int(os.getenv("SWARM_MAX_QUEUE_DEPTH", "200"))
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler is at its queue depth limit."""
+
+
+class TimingStats:
+    """Count / mean / max plus p50 & p95 over a sliding window of samples."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+
+    def _percentile(self, pct: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(1000 * self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(1000 * self._percentile(0.50), 1),
+            "p95_ms": round(1000 * self._percentile(0.95), 1),
+            "max_ms": round(1000 * self.max, 1),
+        }
+
+
+class SenderScheduler:
+    """
+    In-process work queue with one FIFO lane per sender.
+    - Messages from one sender run strictly in arrival order.
+    - Different senders run in parallel, capped at max_concurrency.
+    - At most max_queue_depth messages may wait; beyond that submit() raises.
+    """
+
+    def __init__(self, handler, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_queue_depth: int = DEFAULT_MAX_QUEUE_DEPTH):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+
+        self._lanes = {}          # sender -> deque of (payload, enqueued_at)
+        self._workers = {}        # sender -> asyncio.Task draining that lane
+        self._slots = None        # Semaphore, created lazily inside the running loop
+        self._depth = 0
+        self._running = 0
+
+        self.queue_wait = TimingStats()
+        self.run_time = TimingStats()
+        self.rejected = 0
+        self.failed = 0
+
+    def submit(self, sender: str, payload):
+        """Queues a payload on the sender's lane. Raises QueueFullError under backpressure."""
+        if self._depth >= self.max_queue_depth:
+            self.rejected += 1
+            raise QueueFullError(f"Swarm queue is full ({self._depth} waiting)")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        self._lanes.setdefault(sender, deque()).append((payload, time.perf_counter()))
+        self._depth += 1
+
+        if sender not in self._workers:
+            self._workers[sender] = asyncio.create_task(self._drain(sender))
+
+    async def _drain(self, sender: str):
+        lane = self._lanes[sender]
+        try:
+            while lane:
+                async with self._slots:
+                    # Still queued while waiting for a slot, so it counts towards the depth
+                    # limit; a cancel during the wait leaves it in the lane for the finally below
+                    payload, enqueued_at = lane.popleft()
+                    self._depth -= 1
+                    self._running += 1
+                    started = time.perf_counter()
+                    self.queue_wait.add(started - enqueued_at)
+                    try:
+                        await self.handler(payload)
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error(f"❌ Scheduled job failed for {sender}: {e}", exc_info=True)
+                    finally:
+                        self._running -= 1
+                        self.run_time.add(time.perf_counter() - started)
+        finally:
+            # No await between the empty-lane check and cleanup, so submit() can't slip in
+            self._depth -= len(lane)
+            self._lanes.pop(sender, None)
+            self._workers.pop(sender, None)
+
+    async def drain(self, timeout: float = 30.0):
+        """Waits for queued work to finish (used on shutdown)."""
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        logger.info(f"⏳ Draining {len(workers)} sender lanes...")
+        done, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._depth,
+            "running": self._running,
+            "active_lanes": len(self._workers),
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "queue_wait": self.queue_wait.snapshot(),
+            "run_time": self.run_time.snapshot(),
+        }
@@ -0,0 +1,468 @@
+# app/utils/tracing.py
+
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import inspect
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# jsonl | sqlite | off
+TRACE_SINK = os.getenv("TRACE_SINK", "jsonl").lower()
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+# The JSONL file rolls over to traces.jsonl.1 .. .N at this size; SQLite keeps this many days
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "3"))
+TRACE_RETENTION_DAYS = float(os.getenv("TRACE_RETENTION_DAYS", "7"))
+
+# Histogram bucket upper bounds in seconds (Prometheus convention)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per 1M tokens (input, output). Only used to estimate spend per span.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * input_price + (completion_tokens or 0) * output_price) / 1_000_000
+
+# --- 1. TRACE CONTEXT ---
+# One trace per swarm turn. Context variables follow the turn through awaits,
+# asyncio.to_thread and LangChain's executor hops, so every span is tagged
+# with the WhatsApp msg_id and the LangGraph thread_id.
+
+_trace = contextvars.ContextVar("empowernet_trace", default=None)
+_parent_span = contextvars.ContextVar("empowernet_parent_span", default=None)
+
+
+@contextmanager
+def trace_context(msg_id: str = None, thread_id: str = None):
+    token = _trace.set({"trace_id": uuid.uuid4().hex[:16], "msg_id": msg_id, "thread_id": thread_id})
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+
+
+def current_trace() -> dict:
+    return _trace.get() or {}
+
+# --- 2. SPANS ---
+
+class Span:
+    """One timed unit of work. Set tokens with set_usage() before the span closes."""
+
+    def __init__(self, kind: str, name: str, tags: dict = None):
+        trace = current_trace()
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = _parent_span.get()
+        self.trace_id = trace.get("trace_id")
+        self.msg_id = trace.get("msg_id")
+        self.thread_id = trace.get("thread_id")
+        self.kind = kind
+        self.name = name
+        self.tags = dict(tags or {})
+        self.model = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.error = None
+        self.started_at = time.time()
+        self.seconds = 0.0
+
+    def set_usage(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.model = model
+        self.prompt_tokens = prompt_tokens or 0
+        self.completion_tokens = completion_tokens or 0
+
+    @property
+    def cost_usd(self) -> float:
+        return estimate_cost(self.model, self.prompt_tokens, self.completion_tokens) if self.model else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": round(self.started_at, 3),
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "msg_id": self.msg_id,
+            "thread_id": self.thread_id,
+            "kind": self.kind,
+            "name": self.name,
+            "ms": round(1000 * self.seconds, 2),
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "error": self.error,
+            "tags": self.tags,
+        }
+
+
+@contextmanager
+def span(kind: str, name: str, **tags):
+    """
+    Times a block as a child of the current span:
+
+        with span("db", "SELECT vetted_jobs") as s:
+            ...
+    """
+    s = Span(kind, name, tags)
+    token = _parent_span.set(s.span_id)
+    started = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.seconds = time.perf_counter() - started
+        _parent_span.reset(token)
+        recorder.record(s)
+
+
+def record_span(kind: str, name: str, seconds: float, model: str = None, prompt_tokens: int = 0,
+                completion_tokens: int = 0, error: str = None, **tags):
+    """Records a span whose start and end were observed separately (LLM callbacks)."""
+    s = Span(kind, name, tags)
+    s.started_at = time.time() - seconds
+    s.seconds = seconds
+    s.error = error
+    if model:
+        s.set_usage(model, prompt_tokens, completion_tokens)
+    recorder.record(s)
+
+
+def traced(kind: str, name: str = None):
+    """Decorator form of span() for sync and async functions (nodes, tools)."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def _async(*args, **kwargs):
+                with span(kind, label):
+                    return await fn(*args, **kwargs)
+            return _async
+
+        @functools.wraps(fn)
+        def _sync(*args, **kwargs):
+            with span(kind, label):
+                return fn(*args, **kwargs)
+        return _sync
+
+    return decorate
+
+# --- 3. DATABASE INSTRUMENTATION ---
+
+_SQL_TABLE = re.compile(r"\b(?:from|into|update|join)\s+([a-zA-Z_][\w.]*)", re.IGNORECASE)
+
+
+def sql_span_name(query) -> str:
+    """'SELECT administrative_hierarchy' style names, so spans group by statement shape."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    if not isinstance(query, str):
+        return "query"
+    words = query.split(None, 1)
+    op = words[0].upper() if words else "QUERY"
+    table = _SQL_TABLE.search(query)
+    return f"{op} {table.group(1)}" if table else op
+
+
+class _TracedCursorMixin:
+    def execute(self, query, vars=None):
+        with span("db", sql_span_name(query)):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with span("db", sql_span_name(query), many=True):
+            return super().executemany(query, vars_list)
+
+
+_traced_cursor_classes = {}
+
+
+class TracedConnection(psycopg2.extensions.connection):
+    """psycopg2 connection whose cursors (any cursor_factory) record a span per statement."""
+
+    def cursor(self, *args, cursor_factory=None, **kwargs):
+        base = cursor_factory or self.cursor_factory or psycopg2.extensions.cursor
+        traced_cls = _traced_cursor_classes.get(base)
+        if traced_cls is None:
+            traced_cls = type(f"Traced{base.__name__}", (_TracedCursorMixin, base), {})
+            _traced_cursor_classes[base] = traced_cls
+        return super().cursor(*args, cursor_factory=traced_cls, **kwargs)
+
+
+def traced_connect(dsn: str, **kwargs):
+    """Drop-in for psycopg2.connect() with per-statement spans."""
+    return psycopg2.connect(dsn, connection_factory=TracedConnection, **kwargs)
+
+# --- 4. SINKS ---
+
+class JSONLSink:
+    """Append-only span log, rotated by size so disk use stays under (backups + 1) * max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int = TRACE_MAX_BYTES, backups: int = TRACE_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _reopen_if_rotated(self):
+        # Another worker may have rotated the shared file under us
+        try:
+            rotated = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self._file.close()
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self):
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, spans: list):
+        self._reopen_if_rotated()
+        for s in spans:
+            self._file.write(json.dumps(s, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+
+class SQLiteSink:
+    """Queryable span store; spans older than the retention window are pruned as new ones arrive."""
+    PRUNE_EVERY = 200
+
+    def __init__(self, path: str, retention_days: float = TRACE_RETENTION_DAYS):
+        self.retention_seconds = retention_days * 86400
+        self._writes = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS spans (
+                ts                REAL NOT NULL,
+                trace_id          TEXT,
+                span_id           TEXT PRIMARY KEY,
+                parent_id         TEXT,
+                msg_id            TEXT,
+                thread_id         TEXT,
+                kind              TEXT NOT NULL,
+                name              TEXT NOT NULL,
+                ms                REAL NOT NULL,
+                model             TEXT,
+                prompt_tokens     INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                cost_usd          REAL NOT NULL,
+                error             TEXT,
+                tags              TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_spans_msg_id ON spans (msg_id);
+            CREATE INDEX IF NOT EXISTS idx_spans_ts ON spans (ts);
+        """)
+
+    def write(self, spans: list):
+        self._conn.execute("BEGIN;")
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
+            [(s["ts"], s["trace_id"], s["span_id"], s["parent_id"], s["msg_id"], s["thread_id"],
+              s["kind"], s["name"], s["ms"], s["model"], s["prompt_tokens"], s["completion_tokens"],
+              s["cost_usd"], s["error"], json.dumps(s["tags"], ensure_ascii=False)) for s in spans],
+        )
+        self._conn.execute("COMMIT;")
+        self._writes += 1
+        if self.retention_seconds and self._writes % self.PRUNE_EVERY == 0:
+            self._conn.execute("DELETE FROM spans WHERE ts < ?;", (time.time() - self.retention_seconds,))
+
+
+def build_sink(kind: str = TRACE_SINK, path: str = TRACE_PATH):
+    if kind == "off":
+        return None
+    if kind == "sqlite":
+        return SQLiteSink(path or ".cache/traces.sqlite3")
+    return JSONLSink(path or ".cache/traces.jsonl")
+
+# --- 5. RECORDER & METRICS ---
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.sum += seconds
+        self.errors += int(error)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+
+class TraceRecorder:
+    """
+    Aggregates spans into per-(kind, name) latency histograms and per-model
+    token and cost counters, and hands them to the sink on a background
+    thread so recording never blocks the event loop.
+    """
+
+    def __init__(self, sink=None, queue_size: int = TRACE_QUEUE_SIZE):
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._models = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self.recorded = 0
+        self.dropped = 0
+        self.sink_errors = 0
+
+    def record(self, s: Span):
+        with self._lock:
+            key = (s.kind, s.name)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(s.seconds, s.error is not None)
+            if s.model:
+                totals = self._models.setdefault(s.model, {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+                totals["prompt_tokens"] += s.prompt_tokens
+                totals["completion_tokens"] += s.completion_tokens
+                totals["cost_usd"] += s.cost_usd
+            self.recorded += 1
+        if self.sink is None:
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(s.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._drain, name="trace-sink", daemon=True)
+                    self._writer.start()
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.sink.write(batch)
+            except Exception as e:
+                self.sink_errors += 1
+                logger.error(f"❌ Trace sink write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 2.0):
+        """Gives the sink thread a moment to write queued spans (shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sink": type(self.sink).__name__ if self.sink else None,
+                "recorded": self.recorded,
+                "queued": self._queue.qsize(),
+                "dropped": self.dropped,
+                "sink_errors": self.sink_errors,
+                "models": {m: {**t, "cost_usd": round(t["cost_usd"], 4)} for m, t in self._models.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of span latency histograms and LLM spend."""
+        lines = [
+            "# HELP empowernet_span_seconds Wall time per span, by kind and name.",
+            "# TYPE empowernet_span_seconds histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            models = sorted(self._models.items())
+        for (kind, name), h in histograms:
+            labels = f'kind="{kind}",name="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f'empowernet_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'empowernet_span_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"empowernet_span_seconds_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"empowernet_span_seconds_count{{{labels}}} {h.count}")
+        lines += [
+            "# HELP empowernet_span_errors_total Spans that raised, by kind and name.",
+            "# TYPE empowernet_span_errors_total counter",
+        ]
+        for (kind, name), h in histograms:
+            lines.append(f'empowernet_span_errors_total{{kind="{kind}",name="{_escape(name)}"}} {h.errors}')
+        lines += [
+            "# HELP empowernet_llm_tokens_total Tokens used, by model and direction.",
+            "# TYPE empowernet_llm_tokens_total counter",
+        ]
+        for model, t in models:
+            lines.append(f'empowernet_llm_tokens_total{{model="{model}",direction="prompt"}} {t["prompt_tokens"]}')
+            lines.append(f'empowernet_llm_tokens_total{{model="{model}",direction="completion"}} {t["completion_tokens"]}')
+        lines += [
+            "# HELP empowernet_llm_cost_usd_total Estimated spend, by model.",
+            "# TYPE empowernet_llm_cost_usd_total counter",
+        ]
+        for model, t in models:
+            lines.append(f'empowernet_llm_cost_usd_total{{model="{model}"}} {t["cost_usd"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _build_recorder() -> TraceRecorder:
+    try:
+        sink = build_sink()
+    except Exception as e:
+        logger.error(f"❌ Trace sink '{TRACE_SINK}' unavailable, keeping metrics only: {e}")
+        sink = None
+    return TraceRecorder(sink)
+
+
+recorder = _build_recorder()
@@ -0,0 +1,120 @@
+# app/utils/warmup.py
+
+import os
+import time
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """Tracks cold-start phases so /ready can report them."""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.perf_counter()
+        self.total_ms = None
+        self.phases = {}
+
+    def snapshot(self) -> dict:
+        return {"ready": self.ready, "total_ms": self.total_ms, "phases": self.phases}
+
+
+async def _timed(state: WarmupState, name: str, fn, required: bool = False):
+    """Runs one warm-up phase, logs its duration and records the outcome."""
+    started = time.perf_counter()
+    try:
+        result = await fn()
+        ms = round(1000 * (time.perf_counter() - started), 1)
+        state.phases[name] = {"ok": True, "ms": ms, "detail": result}
+        logger.info(f"🔥 Warm-up '{name}' done in {ms} ms")
+        return True
+    except Exception as e:
+        ms = round(1000 * (time.perf_counter() - started), 1)
+        state.phases[name] = {"ok": False, "ms": ms, "error": str(e)}
+        level = logging.ERROR if required else logging.WARNING
+        logger.log(level, f"⚠️ Warm-up '{name}' failed after {ms} ms: {e}")
+        return not required
+
+# --- PHASES ---
+
+async def _compile_graph():
+    # Importing the builder compiles empower_swarm and pulls in every node & tool module
+    def _load():
+        from app.graph.builder import empower_swarm
+        return len(empower_swarm.get_graph().nodes)
+    return f"{await asyncio.to_thread(_load)} nodes"
+
+async def _open_db():
+    # Neon suspends idle computes; the first connect also wakes the database up.
+    # The connections stay in the shared pool for the first turns.
+    from app.core.db import db_pool
+    opened = await asyncio.to_thread(db_pool.warm)
+    check = await db_pool.acheck()
+    return f"reachable ({opened} pooled, ping {check['ms']} ms)"
+
+async def _open_stores():
+    # Cache and checkpoint stores open lazily; open them here, off the event loop,
+    # so the first webhook doesn't pay for the connect
+    from app.core.stores import open_stores
+    opened = await asyncio.to_thread(open_stores)
+    return ", ".join(f"{label}: {backend}" for label, backend in opened.items()) or "none"
+
+async def _prime_caches():
+    from app.tools.spatial import prime_hierarchy_cache
+    return f"{await asyncio.to_thread(prime_hierarchy_cache)} menu lists cached"
+
+async def _load_gazetteer():
+    from app.core.gazetteer import get_gazetteer
+    gazetteer = await get_gazetteer()
+    return f"{len(gazetteer)} places indexed" if gazetteer else "unavailable"
+
+async def _load_tokenizer():
+    # tiktoken downloads its BPE file on first use; do it before the first RAG turn
+    from app.core.context_packer import get_encoding
+    await asyncio.to_thread(get_encoding)
+    return "o200k_base loaded"
+
+async def _warm_graph_api():
+    from app.api.graph_client import graph_client
+    phone_number_id = os.getenv("PHONE_NUMBER_ID")
+    if not phone_number_id:
+        return "skipped (no PHONE_NUMBER_ID)"
+    # Any authenticated GET leaves a TLS connection in the keep-alive pool
+    response = await graph_client.get(phone_number_id, max_retries=0)
+    return f"HTTP {response.status_code}"
+
+async def _warm_openai():
+    from app.core.llm import get_chat_model, get_async_openai_client
+    # Build the registry models the nodes use, then open a pooled TLS connection;
+    # /v1/models is free and every async client shares the same pool
+    get_chat_model("gpt-4o-mini", temperature=0)
+    get_chat_model("gpt-4o", temperature=0)
+    await get_async_openai_client().models.list()
+    return "connected"
+
+# --- ENTRY POINT ---
+
+async def warm_up(state: WarmupState):
+    """
+    Runs every cold-start phase. The graph must compile for the app to be ready;
+    the network phases are best effort and only reported as degraded.
+    """
+    ok = await _timed(state, "compile_graph", _compile_graph, required=True)
+    # Network phases are independent, so their handshakes overlap
+    await asyncio.gather(
+        _timed(state, "open_db", _open_db),
+        _timed(state, "open_stores", _open_stores),
+        _timed(state, "prime_caches", _prime_caches),
+        _timed(state, "gazetteer", _load_gazetteer),
+        _timed(state, "tokenizer", _load_tokenizer),
+        _timed(state, "graph_api_connection", _warm_graph_api),
+        _timed(state, "openai_connection", _warm_openai),
+    )
+    state.total_ms = round(1000 * (time.perf_counter() - state.started_at), 1)
+    state.ready = ok
+    logger.info(f"✅ Warm-up finished in {state.total_ms} ms (ready={state.ready})")
+    return state
@@ -1,12 +1,32 @@
 # main.py
 
 import os
-import logging
 import sys
+import asyncio
+import logging
 import httpx
-from fastapi import FastAPI, Request, Response, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
+from app.utils.dedup import build_deduplicator
+from app.utils.scheduler import SenderScheduler, QueueFullError
+from app.api.graph_client import graph_client
+from app.api.outbound import outbound, PRIORITY_SAFETY, PRIORITY_REPLY
+from app.utils.warmup import WarmupState, warm_up
+from app.core.transcript_cache import transcript_cache
+from app.core.whisper import get_transcription_stats
+from app.core.llm import llm_stats, close_clients
+from app.graph.router import get_router_stats
+from app.core.translation_cache import ui_translations
+from app.core.ui_catalog import ui_catalog
+from app.core.answer_cache import answer_cache
+from app.core.embedding_cache import embedding_cache
+from app.graph.checkpoint import checkpointer
+from app.graph.history import prompt_stats, split_turns
+from app.core.db import db_pool
+from app.utils.tracing import trace_context, span, recorder
 
 # 1. INITIALIZATION & SECURITY CHECK
 load_dotenv()
@@ -16,7 +36,28 @@ if not api_key or not api_key.startswith("sk-"):
     print("❌ FATAL: OPENAI_API_KEY is missing or invalid. Shutdown initiated.")
     sys.exit(1)
 
-app = FastAPI(title="EmpowerNet Secure Multi-Agent Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled Graph API client for every reply and media fetch
+    await graph_client.start()
+    # Rate-limited send queue in front of it
+    await outbound.start()
+    # Warm up in the background so Meta's webhook is acknowledged immediately;
+    # /ready flips to 200 once the graph, DB, caches and connections are primed
+    app.state.warmup = WarmupState()
+    warmup_task = asyncio.create_task(warm_up(app.state.warmup))
+    yield
+    warmup_task.cancel()
+    # Let in-flight swarm runs and queued replies finish before the worker exits
+    await swarm_scheduler.drain()
+    await outbound.stop()
+    await ui_translations.flush()
+    await graph_client.close()
+    await close_clients()
+    recorder.flush()
+    db_pool.close()
+
+app = FastAPI(title="EmpowerNet Secure Multi-Agent Backend", lifespan=lifespan)
 
 # Configure Logging for production visibility
 logging.basicConfig(
@@ -27,8 +68,9 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --- ANTI-RETRY SHIELD ---
-# Stores processed Meta message IDs to prevent double-processing during network lag
-PROCESSED_MESSAGE_IDS = set()
+# Stores processed Meta message IDs to prevent double-processing during network lag.
+# Backend (memory / sqlite / postgres) is chosen via DEDUP_BACKEND.
+message_dedup = build_deduplicator()
 
 # --- 1. THE PROTECTED BACKGROUND SWARM ---
 async def run_empowernet_swarm(user_data: dict):
@@ -36,15 +78,23 @@ async def run_empowernet_swarm(user_data: dict):
     The EmpowerNet Brain Room: Runs the LangGraph swarm in the background.
     """
     user_id = str(user_data["sender"])
-    user_input = user_data["content"]
     msg_id = user_data.get("id", "unknown")
 
     try:
         from app.graph.builder import empower_swarm
-        from app.api.whatsapp import send_whatsapp_message, send_whatsapp_list
-        
+        from app.api.whatsapp import send_whatsapp_message, send_whatsapp_list, transcribe_voice_note
+
+        # Voice notes are transcribed here, off the webhook ack path
+        if user_data.get("content") is None and user_data.get("media_id"):
+            user_data = await transcribe_voice_note(user_data)
+            if not user_data:
+                logger.warning(f"🔇 Voice note {msg_id} could not be downloaded. Skipping.")
+                return
+        user_input = user_data["content"]
+
         # A. SWARM CONFIGURATION
         # thread_id ensures persistent memory for this specific phone number
+        # (one compact checkpoint per user, see app/graph/checkpoint.py)
         config = {
             "configurable": {"thread_id": user_id}, 
             "recursion_limit": 15 
@@ -53,17 +103,25 @@ async def run_empowernet_swarm(user_data: dict):
         initial_state = {
             "messages": [HumanMessage(content=user_input)],
             "user_id": user_id,
+            # Always set, so a menu tap from an earlier turn never lingers
+            "location_selection": user_data.get("selection"),
         }
 
         # B. SWARM EXECUTION
         logger.info(f"🚀 Swarm triggered for {user_id} | Msg ID: {msg_id}")
-        final_state = empower_swarm.invoke(initial_state, config=config)
+        # durability="exit": the snapshot is written once when the turn ends, not after every node
+        final_state = await empower_swarm.ainvoke(initial_state, config=config, durability="exit")
         
         # C. DELIVERY LOGIC: LIST (Dropdown) vs TEXT
         # We check the final message from the Writer node for UI signals
         final_msg_node = final_state["messages"][-1]
         final_text = final_msg_node.content
-        
+
+        # Routed straight to END (e.g. a goodbye): there is no reply, only the user's own message
+        if isinstance(final_msg_node, HumanMessage):
+            logger.info(f"👋 No reply for {user_id} (turn ended without a response)")
+            return
+
         if "LIST_REQUEST" in final_text:
             logger.info(f"📋 Intercepting LIST_REQUEST UI signal for {user_id}")
             
@@ -86,14 +144,31 @@ async def run_empowernet_swarm(user_data: dict):
             )
         else:
             # Standard Text Delivery (Advice, Job Lists, or Reports)
+            # Safety-report confirmations jump ahead of other replies in the send queue;
+            # only this turn counts, or one old report would prioritise every later reply
+            is_safety_ack = any(
+                "SAFETY_REPORT_SUBMITTED" in str(m.content) for m in split_turns(final_state["messages"])[-1]
+            )
+            priority = PRIORITY_SAFETY if is_safety_ack else PRIORITY_REPLY
             logger.info(f"✉️ Sending Standard Text Response to {user_id}")
-            await send_whatsapp_message(user_id, final_text)
+            await send_whatsapp_message(user_id, final_text, priority=priority)
 
         logger.info(f"🏁 [SUCCESS] Interaction {msg_id} complete.")
 
     except Exception as e:
         logger.error(f"❌ [CRITICAL] Swarm failed for {msg_id}: {str(e)}", exc_info=True)
 
+async def run_traced_swarm(user_data: dict):
+    """One trace per message: every node, tool, DB query, LLM call and send is tagged with it."""
+    with trace_context(msg_id=user_data.get("id"), thread_id=str(user_data["sender"])):
+        with span("turn", "swarm", voice=user_data.get("media_id") is not None):
+            await run_empowernet_swarm(user_data)
+
+# --- PER-USER WORK QUEUE ---
+# One FIFO lane per sender (so a district tap and a block tap can't race on the
+# same profile row) with a global cap on concurrent swarm runs.
+swarm_scheduler = SenderScheduler(run_traced_swarm)
+
 # --- 2. WEBHOOK ENDPOINTS ---
 
 @app.get("/webhook")
@@ -104,32 +179,70 @@ async def verify_webhook(request: Request):
     return Response(content="Forbidden", status_code=403)
 
 @app.post("/webhook")
-async def main_entry(request: Request, background_tasks: BackgroundTasks):
+async def main_entry(request: Request):
     """
     Main entry point for all WhatsApp interactions. 
     Acknowledges Meta instantly and processes the AI in the background.
     """
     from app.api.whatsapp import handle_whatsapp_message
-    
-    user_data = await handle_whatsapp_message(request)
-    
-    if user_data:
-        msg_id = user_data.get("id")
 
-        # Deduplication Guard
-        if msg_id in PROCESSED_MESSAGE_IDS:
-            logger.info(f"🚫 Blocking duplicate retry for ID: {msg_id}")
-            return {"status": "success"}
+    events = await handle_whatsapp_message(request)
+    if not events:
+        return {"status": "ignored"}
 
-        PROCESSED_MESSAGE_IDS.add(msg_id)
-        
-        # Memory cleanup: Keep the last 500 IDs to avoid memory bloat
-        if len(PROCESSED_MESSAGE_IDS) > 500:
-            PROCESSED_MESSAGE_IDS.pop()
-
-       
-        background_tasks.add_task(run_empowernet_swarm, user_data)
-        
-        return {"status": "success"}
+    deferred = 0
+    for user_data in events:
+        msg_id = user_data.get("id")
 
-    return {"status": "ignored"}
\ No newline at end of file
+        # Deduplication Guard (the store expires IDs after the TTL and drops the oldest past its size cap)
+        if await message_dedup.is_duplicate(msg_id):
+            logger.info(f"🚫 Blocking duplicate retry for ID: {msg_id}")
+            continue
+
+        try:
+            swarm_scheduler.submit(str(user_data["sender"]), user_data)
+        except QueueFullError as e:
+            # Backpressure: un-mark the ID and let Meta redeliver it later
+            logger.warning(f"⚠️ {e}. Deferring {msg_id} to Meta retry.")
+            await message_dedup.forget(msg_id)
+            deferred += 1
+
+    if deferred:
+        # Meta redelivers the whole batch; already-queued IDs are caught by the dedup guard
+        return Response(content="Busy", status_code=503)
+
+    return {"status": "success"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 only once the cold-start warm-up has finished."""
+    warmup = app.state.warmup.snapshot()
+    return JSONResponse(warmup, status_code=200 if warmup["ready"] else 503)
+
+@app.get("/stats")
+async def stats():
+    """Operational counters for sizing the webhook pipeline."""
+    return {
+        "dedup": message_dedup.stats(),
+        "scheduler": swarm_scheduler.stats(),
+        "graph_api": graph_client.stats(),
+        "outbound": outbound.stats(),
+        "transcripts": transcript_cache.stats(),
+        "transcription": get_transcription_stats(),
+        "llm": llm_stats(),
+        "router": get_router_stats(),
+        "ui_translations": ui_translations.stats(),
+        "ui_catalog": ui_catalog.stats(),
+        "legal_answers": answer_cache.stats(),
+        # These two scan their tables, so they run on a worker thread instead of blocking webhook acks
+        "embeddings": await asyncio.to_thread(embedding_cache.stats),
+        "checkpoints": await asyncio.to_thread(checkpointer.stats),
+        "prompts": prompt_stats(),
+        "db_pool": db_pool.stats(),
+        "tracing": recorder.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus latency histograms per node, tool, DB statement, LLM call and send, plus pool gauges."""
+    return PlainTextResponse(recorder.render_prometheus() + db_pool.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,128 @@
+# scripts/bench_checkpoint.py
+"""
+Measures conversation checkpoint load/save time as the number of stored
+threads grows. Each thread gets a realistic snapshot (Bengali/English turns,
+specialist reports, a menu reply with rows) that the saver compacts on save.
+With --profile it also times today's get_user_context round trip on the
+same number of lookups, which the snapshot replaces on most turns.
+
+    python -m scripts.bench_checkpoint --threads 100 1000 10000
+    python -m scripts.bench_checkpoint --backend postgres --profile
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+
+from app.graph.checkpoint import CompactCheckpointSaver, SQLiteCheckpointStore, PostgresCheckpointStore
+
+QUESTIONS = [
+    "রাজমিস্ত্রির ন্যূনতম মজুরি কত", "amake kom taka dicche", "kaj chai", "I need a job near my village",
+    "there is no helmet at the site", "ওভারটাইমের জন্য দ্বিগুণ টাকা পাব কি", "hi", "ধন্যবাদ",
+]
+REPORT = "LEGAL_AUDIT_REPORT:\n" + "Clause 4(b): the minimum daily wage for unskilled work in Zone A is ₹ 404. " * 30
+REPLY = "আপনার এলাকায় অদক্ষ শ্রমিকের ন্যূনতম দৈনিক মজুরি ₹৪০৪। মালিক কম দিলে শ্রম দপ্তরে অভিযোগ করতে পারেন। " * 6
+ROWS = [{"id": f"VILLAGE|NADIA|RANAGHAT|V{i}", "title": f"গ্রাম {i}"} for i in range(10)]
+
+
+def conversation(turns: int, rng: random.Random) -> list:
+    messages = []
+    for _ in range(turns):
+        messages.append(HumanMessage(content=rng.choice(QUESTIONS)))
+        kind = rng.random()
+        if kind < 0.4:
+            messages += [AIMessage(content=REPORT), AIMessage(content=REPLY)]
+        elif kind < 0.6:
+            messages.append(AIMessage(content="LIST_REQUEST:VILLAGE", additional_kwargs={"rows": ROWS, "body": "গ্রাম বাছুন"}))
+        else:
+            messages.append(AIMessage(content=REPLY[:200]))
+    return messages
+
+
+def snapshot(messages: list, checkpoint_id: str) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = checkpoint_id
+    checkpoint["channel_values"] = {
+        "messages": messages, "user_id": "919800000000", "user_name": "Rina", "language": "Bengali",
+        "district": "NADIA", "block": "RANAGHAT-I", "village": "AISHTALA", "next_agent": "writer",
+        "profile": {"full_name": "Rina", "preferred_lang": "Bengali", "district": "NADIA",
+                    "block": "RANAGHAT-I", "village": "AISHTALA", "primary_occupation": "Mason",
+                    "skill_level": "Skilled"},
+        "profile_synced_at": time.time(),
+    }
+    checkpoint["channel_versions"] = {k: 1 for k in checkpoint["channel_values"]}
+    return checkpoint
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return 1000 * (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--turns", type=int, default=30, help="turns per thread before compaction")
+    parser.add_argument("--samples", type=int, default=500, help="timed loads and saves per size")
+    parser.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--profile", action="store_true", help="also time get_user_context (needs DATABASE_URL)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    if args.backend == "postgres":
+        store = PostgresCheckpointStore()
+    else:
+        store = SQLiteCheckpointStore(os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite3"))
+    saver = CompactCheckpointSaver(store)
+    prefix = f"bench-{uuid6().hex[:8]}-"
+
+    def config(n: int) -> dict:
+        return {"configurable": {"thread_id": f"{prefix}{n}", "checkpoint_ns": ""}}
+
+    stored = 0
+    raw_sizes = []
+    for target in sorted(args.threads):
+        while stored < target:
+            messages = conversation(args.turns, rng)
+            raw_sizes.append(len(saver.serde.dumps_typed(messages)[1]))
+            saver.put(config(stored), snapshot(messages, str(uuid6())), {"source": "bench"}, {})
+            stored += 1
+
+        picks = [rng.randrange(stored) for _ in range(args.samples)]
+        loads = [timed(saver.get_tuple, config(n)) for n in picks]
+        saves = [
+            timed(saver.put, config(n), snapshot(conversation(args.turns, rng), str(uuid6())), {"source": "bench"}, {})
+            for n in picks
+        ]
+        size = store.size()
+        print(f"{stored:>7} threads | load p50 {percentile(loads, 50):6.2f} ms p95 {percentile(loads, 95):6.2f} ms "
+              f"| save p50 {percentile(saves, 50):6.2f} ms p95 {percentile(saves, 95):6.2f} ms "
+              f"| {size['bytes'] / max(1, size['threads']) / 1024:5.1f} KB/thread stored")
+
+    print(f"uncompacted history: {sum(raw_sizes) / len(raw_sizes) / 1024:.1f} KB/thread "
+          f"({args.turns} turns) | pruned {saver.messages_pruned} messages, {saver.oversize_trims} size trims")
+
+    if args.profile:
+        from app.tools.memory import get_user_context
+
+        rounds = [timed(get_user_context, "919800000000") for _ in range(min(args.samples, 100))]
+        print(f"profile round trip | p50 {percentile(rounds, 50):6.2f} ms p95 {percentile(rounds, 95):6.2f} ms")
+
+    for n in range(stored):
+        saver.delete_thread(config(n)["configurable"]["thread_id"])
+
+
+if __name__ == "__main__":
+    main()
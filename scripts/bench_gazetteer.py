@@ -0,0 +1,179 @@
+# scripts/bench_gazetteer.py
+"""
+Benchmark the gazetteer on a West Bengal-sized hierarchy.
+
+By default a synthetic hierarchy with the state's shape is generated (23 districts,
+~340 blocks, ~3,300 gram panchayats, ~40,000 villages) with paired English/Bengali
+spellings, so Bengali and misspelt queries can be scored. --from-db indexes the
+real administrative_hierarchy table instead (Latin query variants only).
+
+    python -m scripts.bench_gazetteer --queries 5000
+    python -m scripts.bench_gazetteer --from-db
+"""
+
+import time
+import random
+import argparse
+import tracemalloc
+from collections import Counter
+
+from app.core.gazetteer import Gazetteer, load_hierarchy_rows
+
+DISTRICTS = [
+    "ALIPURDUAR", "BANKURA", "BIRBHUM", "COOCH BEHAR", "DAKSHIN DINAJPUR", "DARJEELING",
+    "HOOGHLY", "HOWRAH", "JALPAIGURI", "JHARGRAM", "KALIMPONG", "MALDA", "MURSHIDABAD",
+    "NADIA", "24 PARGANAS NORTH", "PASCHIM BARDHAMAN", "PASCHIM MEDINIPUR",
+    "PURBA BARDHAMAN", "PURBA MEDINIPUR", "PURULIA", "24 PARGANAS SOUTH",
+    "UTTAR DINAJPUR", "KOLKATA",
+]
+
+# (Latin, Bengali) syllables; names are built from both in step
+PREFIXES = [
+    ("ba", "বা"), ("ra", "রা"), ("ka", "কা"), ("la", "লা"), ("ma", "মা"), ("na", "না"),
+    ("pa", "পা"), ("sa", "সা"), ("ta", "টা"), ("da", "ডা"), ("ga", "গা"), ("ha", "হা"),
+    ("cha", "চা"), ("ja", "জা"), ("bi", "বি"), ("ri", "রি"), ("ki", "কি"), ("li", "লি"),
+    ("mi", "মি"), ("ni", "নি"), ("bu", "বু"), ("ru", "রু"), ("ku", "কু"), ("lu", "লু"),
+    ("mu", "মু"), ("sona", "সোনা"), ("kali", "কালি"), ("shib", "শিব"), ("dhan", "ধান"),
+    ("bhaba", "ভবা"),
+]
+SUFFIXES = [
+    ("pur", "পুর"), ("gram", "গ্রাম"), ("nagar", "নগর"), ("hat", "হাট"), ("ghat", "ঘাট"),
+    ("danga", "ডাঙ্গা"), ("bari", "বাড়ি"), ("gachha", "গাছা"), ("tala", "তলা"),
+    ("chak", "চক"), ("para", "পাড়া"), ("khali", "খালি"),
+]
+ROMAN = ["I", "II", "III"]
+
+# Common romanisation drift: u/o, double letters, f/ph, w for o, dropped h
+VARIANTS = [("u", "o"), ("pur", "pore"), ("a", "o"), ("i", "ee"), ("ph", "f"), ("bh", "v"),
+            ("kh", "k"), ("chh", "ch"), ("gram", "grum"), ("t", "tt")]
+
+
+def make_name(rng: random.Random) -> tuple:
+    parts = [rng.choice(PREFIXES) for _ in range(rng.choice([1, 2, 2, 3]))] + [rng.choice(SUFFIXES)]
+    return "".join(p[0] for p in parts).upper(), "".join(p[1] for p in parts)
+
+
+def synthetic_hierarchy(seed: int = 7, blocks_per_district: int = 15,
+                        gps_per_block: int = 10, villages_per_gp: int = 12):
+    rng = random.Random(seed)
+    rows, bengali = [], {}
+    for district in DISTRICTS:
+        for b in range(blocks_per_district):
+            block_name, block_bn = make_name(rng)
+            block = f"{block_name}-{ROMAN[b % 3]}" if b % 4 == 0 else block_name
+            bengali[("block", district, block)] = block_bn
+            for _ in range(gps_per_block):
+                gp, _ = make_name(rng)
+                for _ in range(villages_per_gp):
+                    village, village_bn = make_name(rng)
+                    rows.append((district, block, gp, village))
+                    bengali[("village", district, block, village)] = village_bn
+    return rows, bengali
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    lowered = name.lower()
+    options = [(a, b) for a, b in VARIANTS if a in lowered]
+    if options:
+        a, b = rng.choice(options)
+        return lowered.replace(a, b, 1)
+    return lowered
+
+
+def typo(name: str, rng: random.Random) -> str:
+    lowered = list(name.lower())
+    i = rng.randrange(1, len(lowered) - 1)
+    op = rng.choice(["drop", "swap", "double"])
+    if op == "drop":
+        del lowered[i]
+    elif op == "swap":
+        lowered[i], lowered[i + 1] = lowered[i + 1], lowered[i]
+    else:
+        lowered.insert(i, lowered[i])
+    return "".join(lowered)
+
+
+def make_queries(rows, bengali, n: int, rng: random.Random):
+    """(kind, text, expected (district, block, village), context)"""
+    queries = []
+    for _ in range(n):
+        district, block, _, village = rng.choice(rows)
+        expected = (district, block, village)
+        context = {"level": "village", "district": district, "block": block}
+        kind = rng.choice(["exact", "casefold", "variant", "typo"] + (["bengali"] if bengali else []))
+        if kind == "exact":
+            text = village
+        elif kind == "casefold":
+            text = village.title()
+        elif kind == "variant":
+            text = misspell(village, rng)
+        elif kind == "typo":
+            text = typo(village, rng)
+        else:
+            text = bengali[("village", district, block, village)]
+        queries.append((kind, text, expected, context))
+    return queries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def run(gazetteer: Gazetteer, queries, use_context: bool):
+    stats = {}
+    methods = Counter()
+    for kind, text, expected, context in queries:
+        started = time.perf_counter()
+        match = gazetteer.lookup(text, **(context if use_context else {}))
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        s = stats.setdefault(kind, {"n": 0, "correct": 0, "wrong": 0, "ambiguous": 0, "miss": 0, "us": []})
+        s["n"] += 1
+        s["us"].append(elapsed_us)
+        if match is None:
+            s["miss"] += 1
+        elif match.ambiguous:
+            s["ambiguous"] += 1
+        else:
+            methods[match.method] += 1
+            s["correct" if match.places[0].path == expected else "wrong"] += 1
+
+    print(f"\n{'with' if use_context else 'without'} parent context (level=village, district, block):")
+    print(f"  {'kind':10} {'n':>5} {'correct':>8} {'wrong':>6} {'ambig':>6} {'miss':>5} {'p50 µs':>8} {'p95 µs':>8}")
+    for kind, s in stats.items():
+        print(f"  {kind:10} {s['n']:>5} {s['correct'] / s['n']:>8.1%} {s['wrong'] / s['n']:>6.1%} "
+              f"{s['ambiguous'] / s['n']:>6.1%} {s['miss'] / s['n']:>5.1%} "
+              f"{percentile(s['us'], 50):>8.1f} {percentile(s['us'], 95):>8.1f}")
+    print(f"  resolved by: {dict(methods)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--from-db", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.from_db:
+        rows, bengali = load_hierarchy_rows(), {}
+    else:
+        rows, bengali = synthetic_hierarchy(args.seed)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    gazetteer = Gazetteer(rows)
+    build_s = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"rows: {len(rows)} | places: {len(gazetteer)} {gazetteer.level_counts()}")
+    print(f"index build: {build_s:.2f} s | peak memory during build: {peak / 2**20:.1f} MiB")
+
+    queries = make_queries(rows, bengali, args.queries, rng)
+    run(gazetteer, queries, use_context=True)
+    run(gazetteer, queries, use_context=False)
+
+
+if __name__ == "__main__":
+    main()
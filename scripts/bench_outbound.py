@@ -0,0 +1,109 @@
+# scripts/bench_outbound.py
+"""
+Benchmark the outbound dispatcher against a local Graph API stub that enforces rate limits.
+Compares direct fire-and-forget sends (the old behaviour) with OutboundDispatcher.
+
+    python -m scripts.bench_outbound --messages 300 --recipients 60 --phone-rate 40
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import threading
+import uvicorn
+
+from scripts import mock_graph_server as mock
+from app.api.graph_client import GraphClient
+from app.api.outbound import OutboundDispatcher, PRIORITY_SAFETY, PRIORITY_REPLY, PRIORITY_MENU
+
+
+def start_stub(port: int, phone_rate: float, pair_rate: float) -> uvicorn.Server:
+    mock.PHONE_RATE, mock.PAIR_RATE, mock.LATENCY_MS = phone_rate, pair_rate, 5
+    server = uvicorn.Server(uvicorn.Config(mock.app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def make_jobs(n: int, recipients: int):
+    rng = random.Random(7)
+    jobs = []
+    for i in range(n):
+        priority = rng.choice([PRIORITY_SAFETY] + [PRIORITY_REPLY] * 3 + [PRIORITY_MENU] * 4)
+        to = f"91980000{rng.randrange(recipients):04d}"
+        jobs.append((to, {"messaging_product": "whatsapp", "to": to, "type": "text",
+                          "text": {"body": f"reply {i}"}}, priority))
+    return jobs
+
+
+async def run_direct(base_url: str, jobs) -> dict:
+    client = GraphClient(base_url=base_url, token="bench", max_retries=0)
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post_json("BENCH/messages", payload) for _, payload, _ in jobs
+    ])
+    elapsed = time.perf_counter() - started
+    await client.close()
+    delivered = sum(1 for r in responses if r.status_code < 400)
+    return {"delivered": delivered, "lost": len(jobs) - delivered, "elapsed_s": round(elapsed, 2)}
+
+
+async def run_dispatcher(base_url: str, jobs, phone_rate: float, pair_rate: float) -> dict:
+    client = GraphClient(base_url=base_url, token="bench")
+    dispatcher = OutboundDispatcher(
+        phone_rate=phone_rate, phone_burst=phone_rate,
+        recipient_rate=pair_rate, recipient_burst=1,
+        max_attempts=6, client=client,
+    )
+    await dispatcher.start()
+    started = time.perf_counter()
+
+    async def timed(to, payload, priority):
+        t0 = time.perf_counter()
+        ok = await dispatcher.send(to, payload, priority=priority, phone_number_id="BENCH") is not None
+        return priority, ok, time.perf_counter() - t0
+
+    results = await asyncio.gather(*[timed(*job) for job in jobs])
+    elapsed = time.perf_counter() - started
+    await dispatcher.stop()
+    await client.close()
+
+    by_lane = {}
+    for priority, ok, latency in results:
+        lane = by_lane.setdefault(priority, [])
+        lane.append(latency)
+    delivered = sum(1 for _, ok, _ in results if ok)
+    return {
+        "delivered": delivered,
+        "lost": len(jobs) - delivered,
+        "elapsed_s": round(elapsed, 2),
+        "rate_limited": dispatcher.rate_limited,
+        "mean_latency_by_priority_s": {
+            p: round(sum(v) / len(v), 2) for p, v in sorted(by_lane.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--recipients", type=int, default=60)
+    parser.add_argument("--phone-rate", type=float, default=40.0)
+    parser.add_argument("--pair-rate", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    start_stub(args.port, args.phone_rate, args.pair_rate)
+    base_url = f"http://127.0.0.1:{args.port}"
+    jobs = make_jobs(args.messages, args.recipients)
+
+    print(f"stub limits: {args.phone_rate}/s per number, {args.pair_rate}/s per recipient")
+    print("direct     :", asyncio.run(run_direct(base_url, jobs)))
+    time.sleep(2)  # let the stub's buckets refill
+    print("dispatcher :", asyncio.run(run_dispatcher(base_url, jobs, args.phone_rate, args.pair_rate)))
+
+
+if __name__ == "__main__":
+    main()
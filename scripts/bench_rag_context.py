@@ -0,0 +1,106 @@
+# scripts/bench_rag_context.py
+"""
+Compares the old whole-document context (22,000-character cap) with the
+token-budgeted MMR context on a fixed set of legal questions. Always reports
+audit prompt tokens and packing time; with --llm it also runs the GPT-4o
+audit both ways and reports time-to-first-token, total latency and billed
+prompt tokens. Needs DATABASE_URL with the legal_documents table.
+
+    python -m scripts.bench_rag_context
+    python -m scripts.bench_rag_context --budget 2000 --llm
+"""
+
+import json
+import time
+import argparse
+
+from app.core.search import retrieve_documents, audit_messages, client
+from app.core.embedding_cache import embedding_cache
+from app.core.context_packer import build_context, pack_by_chars, count_tokens
+
+
+def load(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def prompt_tokens(messages: list) -> int:
+    # ~4 tokens of chat framing per message, as the API bills them
+    return sum(count_tokens(m["content"]) + 4 for m in messages) + 3
+
+
+def timed_audit(messages: list) -> dict:
+    started = time.perf_counter()
+    first = None
+    usage = None
+    stream = client.chat.completions.create(
+        model="gpt-4o", messages=messages, stream=True, stream_options={"include_usage": True}
+    )
+    for chunk in stream:
+        if first is None and chunk.choices and chunk.choices[0].delta.content:
+            first = time.perf_counter()
+        if chunk.usage:
+            usage = chunk.usage
+    ended = time.perf_counter()
+    return {
+        "ttft_ms": 1000 * ((first or ended) - started),
+        "total_ms": 1000 * (ended - started),
+        "billed_prompt_tokens": usage.prompt_tokens if usage else None,
+    }
+
+
+def summarize(label: str, rows: list):
+    tokens = [r["tokens"] for r in rows]
+    line = (f"{label:<8} prompt tokens mean {sum(tokens) / len(tokens):8.0f} | p50 {percentile(tokens, 50):6d} "
+            f"| max {max(tokens):6d} | packing p50 {percentile([r['pack_ms'] for r in rows], 50):7.1f} ms")
+    if rows[0].get("ttft_ms") is not None:
+        line += (f" | TTFT p50 {percentile([r['ttft_ms'] for r in rows], 50):7.0f} ms"
+                 f" | total p50 {percentile([r['total_ms'] for r in rows], 50):7.0f} ms")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", default="data/legal_eval_questions.jsonl")
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default RAG_CONTEXT_TOKENS)")
+    parser.add_argument("--llm", action="store_true", help="also run the GPT-4o audit both ways")
+    args = parser.parse_args()
+
+    before, after = [], []
+    for question in load(args.data):
+        vector = embedding_cache.embed(question)
+        documents = retrieve_documents(vector)
+
+        started = time.perf_counter()
+        old_context = pack_by_chars(documents)
+        old = {"pack_ms": 1000 * (time.perf_counter() - started)}
+
+        started = time.perf_counter()
+        kwargs = {"budget": args.budget} if args.budget else {}
+        packed = build_context(question, vector, documents, embed_many=embedding_cache.embed_many, **kwargs)
+        new = {"pack_ms": 1000 * (time.perf_counter() - started)}
+
+        for row, context in ((old, old_context), (new, packed.text)):
+            messages = audit_messages(question, context)
+            row["tokens"] = prompt_tokens(messages)
+            if args.llm:
+                row.update(timed_audit(messages))
+        before.append(old)
+        after.append(new)
+        print(f"  {old['tokens']:6d} → {new['tokens']:5d} tokens "
+              f"({len(packed.passages)} passages, {packed.duplicates_dropped} dups) | {question[:60]}")
+
+    print()
+    summarize("before", before)
+    summarize("after", after)
+    saved = 1 - sum(r["tokens"] for r in after) / max(1, sum(r["tokens"] for r in before))
+    print(f"prompt tokens saved: {saved:.0%} over {len(before)} questions")
+
+
+if __name__ == "__main__":
+    main()
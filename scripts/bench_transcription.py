@@ -0,0 +1,89 @@
+# scripts/bench_transcription.py
+"""
+Compares raw single-request transcription with the preprocessed, chunked path
+against the local stub transcription endpoint in scripts/mock_graph_server.py.
+Needs ffmpeg (on PATH or via FFMPEG_BINARY).
+
+    python -m scripts.bench_transcription --seconds 180
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import threading
+import numpy as np
+import uvicorn
+
+PORT = 8099
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+
+from scripts import mock_graph_server as mock  # noqa: E402
+from app.core import audio  # noqa: E402
+from app.core.whisper import atranscribe_audio, atranscribe_voice_note, get_transcription_stats  # noqa: E402
+
+
+def synth_voice_note(seconds: float, lead_s: float = 3.0, tail_s: float = 4.0) -> np.ndarray:
+    """Speech-like stereo 48 kHz signal: syllable bursts, short pauses, long silent edges."""
+    rate = 48000
+    rng = np.random.default_rng(7)
+    t_total = lead_s + seconds + tail_s
+    signal = np.zeros(int(t_total * rate), dtype=np.float32)
+    cursor = lead_s
+    while cursor < lead_s + seconds:
+        burst = rng.uniform(0.15, 0.4)
+        n = int(burst * rate)
+        t = np.arange(n) / rate
+        f0 = rng.uniform(120, 260)
+        tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 5))
+        envelope = np.sin(np.pi * t / burst)
+        start = int(cursor * rate)
+        signal[start:start + n] += 0.25 * tone * envelope
+        cursor += burst + (rng.uniform(0.6, 1.2) if rng.random() < 0.1 else rng.uniform(0.03, 0.1))
+    signal += rng.normal(0, 0.001, len(signal)).astype(np.float32)  # room noise below the silence gate
+    stereo = np.stack([signal, signal], axis=1)
+    return (np.clip(stereo, -1, 1) * 32767).astype(np.int16)
+
+
+async def encode_source(pcm: np.ndarray) -> bytes:
+    return await audio._ffmpeg([
+        "-f", "s16le", "-ar", "48000", "-ac", "2", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", "32k", "-f", "ogg", "pipe:1",
+    ], pcm.tobytes())
+
+
+async def run(seconds: float):
+    data = await encode_source(synth_voice_note(seconds))
+
+    t0 = time.perf_counter()
+    raw_text = await atranscribe_audio(data)
+    raw_latency = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    text = await atranscribe_voice_note(data)
+    new_latency = time.perf_counter() - t0
+    stats = get_transcription_stats()
+
+    print(f"source: {len(data) / 1024:.1f} KiB, ~{seconds + 7:.0f}s stereo 48 kHz Opus")
+    print(f"before: 1 request,  {len(data) / 1024:7.1f} KiB uploaded, {raw_latency:5.2f}s end-to-end  {raw_text}")
+    print(f"after : {stats['chunks']} requests, {stats['bytes_uploaded'] / 1024:7.1f} KiB uploaded, "
+          f"{new_latency:5.2f}s end-to-end  {text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=180)
+    args = parser.parse_args()
+    if not audio.FFMPEG_BINARY:
+        raise SystemExit("ffmpeg not found: install it or set FFMPEG_BINARY")
+
+    server = uvicorn.Server(uvicorn.Config(mock.app, port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    asyncio.run(run(args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# scripts/bench_webhook_parse.py
+"""
+Micro-benchmark for the webhook batch parser.
+Builds large synthetic Meta payloads and reports parse cost per message.
+
+    python -m scripts.bench_webhook_parse --messages 5000 --entries 10 --changes 2
+"""
+
+import json
+import time
+import argparse
+
+from app.api.whatsapp import iter_webhook_messages
+
+
+def build_payload(n_messages: int, n_entries: int, n_changes: int) -> dict:
+    """Spreads n_messages (text, location and list replies) over entries x changes."""
+    buckets = n_entries * n_changes
+    entries = []
+    counter = 0
+    for e in range(n_entries):
+        changes = []
+        for c in range(n_changes):
+            messages = []
+            share = n_messages // buckets + (1 if (e * n_changes + c) < n_messages % buckets else 0)
+            for _ in range(share):
+                sender = f"9198300{counter % 1000:05d}"
+                kind = counter % 3
+                if kind == 0:
+                    msg = {"type": "text", "text": {"body": f"Ami kaj khujchi {counter}"}}
+                elif kind == 1:
+                    msg = {"type": "location", "location": {"latitude": 22.57, "longitude": 88.36}}
+                else:
+                    msg = {"type": "interactive", "interactive": {
+                        "type": "list_reply", "list_reply": {"id": "NADIA", "title": "NADIA"}}}
+                msg.update({"from": sender, "id": f"wamid.{counter}", "timestamp": "1760000000"})
+                messages.append(msg)
+                counter += 1
+            changes.append({"field": "messages", "value": {
+                "messaging_product": "whatsapp",
+                "metadata": {"phone_number_id": "1234"},
+                "messages": messages,
+            }})
+        entries.append({"id": f"WABA{e}", "changes": changes})
+    return {"object": "whatsapp_business_account", "entry": entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--entries", type=int, default=10)
+    parser.add_argument("--changes", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    raw = json.dumps(build_payload(args.messages, args.entries, args.changes)).encode()
+
+    best_decode, best_parse = float("inf"), float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        data = json.loads(raw)
+        t1 = time.perf_counter()
+        events = list(iter_webhook_messages(data))
+        t2 = time.perf_counter()
+        best_decode = min(best_decode, t1 - t0)
+        best_parse = min(best_parse, t2 - t1)
+
+    assert len(events) == args.messages, f"parsed {len(events)} of {args.messages} messages"
+    print(f"payload: {len(raw) / 1024:.1f} KiB | {args.messages} messages | "
+          f"{args.entries} entries x {args.changes} changes")
+    print(f"json decode : {1e6 * best_decode / args.messages:.2f} µs/msg")
+    print(f"normalize   : {1e6 * best_parse / args.messages:.2f} µs/msg")
+    print(f"total       : {1e6 * (best_decode + best_parse) / args.messages:.2f} µs/msg")
+
+
+if __name__ == "__main__":
+    main()
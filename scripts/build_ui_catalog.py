@@ -0,0 +1,74 @@
+# scripts/build_ui_catalog.py
+"""
+Regenerate the localized onboarding text catalog (data/ui_catalog.json) from
+the English source templates in app/core/ui_catalog.py. Run it after editing
+the English text or to add a language before users need it. Languages already
+in the catalog are kept unless --force is given, so hand-reviewed wording
+is not overwritten by accident.
+
+    python -m scripts.build_ui_catalog --languages Hindi Odia
+    python -m scripts.build_ui_catalog --all --force
+    python -m scripts.build_ui_catalog --check
+"""
+
+import asyncio
+import argparse
+
+from app.core.ui_catalog import (
+    UICatalog, SOURCE_LANGUAGE, SOURCE_TEXT, generate_language, template_fields,
+)
+
+
+def check(catalog: UICatalog) -> int:
+    """Reports missing keys and placeholder mismatches; returns the problem count."""
+    problems = 0
+    for language in catalog.languages():
+        if language == SOURCE_LANGUAGE:
+            continue
+        templates = catalog.templates(language)
+        for key, source in SOURCE_TEXT.items():
+            if key not in templates:
+                problems += 1
+                print(f"  ⚠️ {language}/{key}: missing (English is shown)")
+            elif template_fields(templates[key]) != template_fields(source):
+                problems += 1
+                print(f"  ❌ {language}/{key}: placeholders differ from English")
+    print(f"{len(catalog.languages())} languages | {problems} problems")
+    return problems
+
+
+async def run(languages, regenerate_all: bool, force: bool):
+    catalog = UICatalog()
+    if regenerate_all:
+        languages = [l for l in catalog.languages() if l != SOURCE_LANGUAGE] + list(languages or [])
+    todo = [l for l in dict.fromkeys(languages or []) if force or l not in catalog.languages()]
+    if not todo:
+        print("nothing to generate (use --force to regenerate existing languages)")
+        return
+
+    outcomes = await asyncio.gather(*[generate_language(l) for l in todo], return_exceptions=True)
+    for language, outcome in zip(todo, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"  ❌ {language}: {outcome}")
+            continue
+        catalog.set_language(language, outcome)
+        print(f"  ✅ {language}: {len(outcome)}/{len(SOURCE_TEXT)} templates")
+    catalog.save()
+    print(f"written to {catalog.path}")
+    check(catalog)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--languages", nargs="+", default=[])
+    parser.add_argument("--all", action="store_true", help="regenerate every language in the catalog")
+    parser.add_argument("--force", action="store_true", help="overwrite languages already in the catalog")
+    parser.add_argument("--check", action="store_true", help="validate the catalog without calling the LLM")
+    args = parser.parse_args()
+    if args.check:
+        raise SystemExit(1 if check(UICatalog()) else 0)
+    asyncio.run(run(args.languages, args.all, args.force))
+
+
+if __name__ == "__main__":
+    main()
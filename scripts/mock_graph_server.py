@@ -0,0 +1,133 @@
+# scripts/mock_graph_server.py
+"""
+Local stand-in for the Meta Graph API (and a Whisper-like transcription endpoint),
+for tests and benchmarks.
+
+    uvicorn scripts.mock_graph_server:app --port 8099
+    GRAPH_API_BASE=http://127.0.0.1:8099 uvicorn main:app
+
+Env knobs:
+    MOCK_FAIL_RATE   fraction of requests answered with a random 429/500/503 (default 0)
+    MOCK_LATENCY_MS  artificial latency per request (default 20)
+    MOCK_AUDIO_BYTES size of the fake voice note returned for media downloads (default 64000)
+    MOCK_PHONE_RATE  sends/s allowed per phone number ID before 429 / code 130429 (default 0 = off)
+    MOCK_PAIR_RATE   sends/s allowed per recipient before code 131056 (default 0 = off)
+
+Transcription stub (point OPENAI_BASE_URL at http://127.0.0.1:8099/v1):
+    MOCK_WHISPER_BASE_MS      fixed cost per request (default 300)
+    MOCK_WHISPER_MS_PER_AUDIO_S processing time per second of audio (default 40)
+    MOCK_UPLINK_KBPS          simulated upload bandwidth in kbit/s (default 2000)
+"""
+
+import os
+import time
+import random
+import asyncio
+import itertools
+from fastapi import FastAPI, Request, Response, UploadFile, File, Form
+from app.core.transcript_cache import ogg_duration_seconds
+
+FAIL_RATE = float(os.getenv("MOCK_FAIL_RATE", "0"))
+LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "20"))
+AUDIO_BYTES = int(os.getenv("MOCK_AUDIO_BYTES", "64000"))
+PHONE_RATE = float(os.getenv("MOCK_PHONE_RATE", "0"))
+PAIR_RATE = float(os.getenv("MOCK_PAIR_RATE", "0"))
+WHISPER_BASE_MS = float(os.getenv("MOCK_WHISPER_BASE_MS", "300"))
+WHISPER_MS_PER_AUDIO_S = float(os.getenv("MOCK_WHISPER_MS_PER_AUDIO_S", "40"))
+UPLINK_KBPS = float(os.getenv("MOCK_UPLINK_KBPS", "2000"))
+
+app = FastAPI(title="Mock Graph API")
+app.state.sent = []
+app.state.throttled = 0
+_ids = itertools.count(1)
+_windows = {}
+
+
+def _over_limit(key: str, rate: float) -> bool:
+    """Strict token bucket (burst = 1 second of rate); no reservations, like Meta."""
+    if not rate:
+        return False
+    now = time.monotonic()
+    tokens, updated = _windows.get(key, (rate, now))
+    tokens = min(rate, tokens + (now - updated) * rate)
+    if tokens < 1:
+        _windows[key] = (tokens, now)
+        return True
+    _windows[key] = (tokens - 1, now)
+    return False
+
+
+def _limit_error(status: int, code: int):
+    app.state.throttled += 1
+    return Response(
+        content=f'{{"error": {{"message": "rate limit hit", "code": {code}}}}}',
+        status_code=status, media_type="application/json",
+    )
+
+
+async def _simulate():
+    """Adds latency and, if configured, a transient failure."""
+    await asyncio.sleep(LATENCY_MS / 1000)
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        status = random.choice([429, 500, 503])
+        return Response(content='{"error": {"message": "mock failure"}}', status_code=status,
+                        media_type="application/json")
+    return None
+
+
+@app.post("/{phone_number_id}/messages")
+async def send_message(phone_number_id: str, request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    payload = await request.json()
+    if _over_limit(f"phone:{phone_number_id}", PHONE_RATE):
+        return _limit_error(429, 130429)
+    if _over_limit(f"pair:{payload.get('to')}", PAIR_RATE):
+        return _limit_error(400, 131056)
+    app.state.sent.append({"phone_number_id": phone_number_id, **payload})
+    return {
+        "messaging_product": "whatsapp",
+        "contacts": [{"input": payload.get("to"), "wa_id": payload.get("to")}],
+        "messages": [{"id": f"wamid.mock.{next(_ids)}"}],
+    }
+
+
+@app.get("/media/{media_id}/download")
+async def download_media(media_id: str):
+    failure = await _simulate()
+    if failure:
+        return failure
+    # OGG magic header followed by filler that is stable per media ID, so
+    # re-downloads hash identically (enough for size- and cache-related tests)
+    rng = random.Random(media_id)
+    body = b"OggS" + bytes(rng.getrandbits(8) for _ in range(64)) * (AUDIO_BYTES // 64)
+    return Response(content=body[:AUDIO_BYTES], media_type="audio/ogg")
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcribe(file: UploadFile = File(...), model: str = Form("whisper-1")):
+    data = await file.read()
+    app.state.transcribed_bytes = getattr(app.state, "transcribed_bytes", 0) + len(data)
+    seconds = ogg_duration_seconds(data[-65536:], len(data))
+    upload_s = len(data) * 8 / (UPLINK_KBPS * 1000)
+    await asyncio.sleep(WHISPER_BASE_MS / 1000 + upload_s + seconds * WHISPER_MS_PER_AUDIO_S / 1000)
+    return {"text": f"[{file.filename}: {seconds:.1f}s]"}
+
+
+@app.get("/_stats")
+async def stats():
+    return {"sent": len(app.state.sent), "throttled": app.state.throttled}
+
+
+@app.get("/{media_id}")
+async def media_url(media_id: str, request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    return {
+        "id": media_id,
+        "url": str(request.base_url) + f"media/{media_id}/download",
+        "mime_type": "audio/ogg; codecs=opus",
+        "file_size": AUDIO_BYTES,
+    }
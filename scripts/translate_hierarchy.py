@@ -0,0 +1,81 @@
+# scripts/translate_hierarchy.py
+"""
+Fill the ui_translations table for every district, block and village name in
+administrative_hierarchy, so onboarding menus render without any LLM call.
+Names already stored are skipped; re-running only translates new rows.
+
+    python -m scripts.translate_hierarchy --language Bengali
+    python -m scripts.translate_hierarchy --levels district block --dry-run
+"""
+
+import time
+import asyncio
+import argparse
+
+from app.core.gazetteer import load_hierarchy_rows
+from app.core.translation_cache import build_translation_cache, translate_batch
+from app.core.stores import backend_name
+
+LEVEL_COLUMNS = {"district": 0, "block": 1, "village": 3}
+
+
+def hierarchy_names(levels) -> list:
+    names = {}
+    for row in load_hierarchy_rows():
+        for level in levels:
+            value = row[LEVEL_COLUMNS[level]]
+            if value:
+                names.setdefault(value, None)
+    return list(names)
+
+
+async def run(language: str, levels, batch_size: int, concurrency: int, backend: str, dry_run: bool):
+    cache = build_translation_cache(backend)
+    names = hierarchy_names(levels)
+    stored = {}
+    for i in range(0, len(names), 1000):
+        stored.update(await asyncio.to_thread(cache.store.get_many, language, names[i:i + 1000]))
+    todo = [n for n in names if n not in stored]
+    print(f"{len(names)} names | {len(stored)} already translated | {len(todo)} to do ({backend_name(cache.store)})")
+    if dry_run or not todo:
+        return
+
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    gate = asyncio.Semaphore(concurrency)
+    done, failed = 0, 0
+    started = time.perf_counter()
+
+    async def worker(batch):
+        nonlocal done, failed
+        async with gate:
+            try:
+                result = await translate_batch(batch, language)
+            except Exception as e:
+                failed += len(batch)
+                print(f"  ❌ batch of {len(batch)} failed: {e}")
+                return
+            if result:
+                await asyncio.to_thread(cache.store.put_many, language, result)
+            done += len(result)
+            failed += len(batch) - len(result)
+            print(f"  ✅ {done}/{len(todo)} translated")
+
+    await asyncio.gather(*[worker(b) for b in batches])
+    print(f"finished in {time.perf_counter() - started:.1f} s: {done} stored, {failed} left untranslated "
+          f"(re-run to retry) | table size {cache.store.size()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--language", default="Bengali")
+    parser.add_argument("--levels", nargs="+", choices=list(LEVEL_COLUMNS), default=list(LEVEL_COLUMNS))
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.language, args.levels, args.batch_size, args.concurrency, args.backend, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
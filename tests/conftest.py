@@ -0,0 +1,17 @@
+# tests/conftest.py
+
+import os
+import tempfile
+
+# Module-level singletons (checkpointer, caches, trace recorder) are built on
+# import; keep their files out of the working tree and tracing off.
+_CACHE_DIR = tempfile.mkdtemp(prefix="empowernet-tests-")
+os.environ.setdefault("TRACE_SINK", "off")
+os.environ.setdefault("DEDUP_BACKEND", "memory")
+for var, name in {
+    "CHECKPOINT_PATH": "checkpoints.sqlite3",
+    "DEDUP_SQLITE_PATH": "dedup.sqlite3",
+    "ANSWER_CACHE_PATH": "legal_answers.sqlite3",
+    "TRANSCRIPT_CACHE_PATH": "transcripts.sqlite3",
+}.items():
+    os.environ.setdefault(var, os.path.join(_CACHE_DIR, name))
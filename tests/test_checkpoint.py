@@ -0,0 +1,120 @@
+# tests/test_checkpoint.py
+
+import os
+import asyncio
+import pytest
+from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from app.graph.checkpoint import CompactCheckpointSaver, SQLiteCheckpointStore, compact_messages
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteCheckpointStore(path=str(tmp_path / "checkpoints.sqlite3"))
+
+
+def config(thread_id: str = "919800000001", checkpoint_id: str = None) -> dict:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def snapshot(messages: list, **values) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = str(uuid6())
+    checkpoint["channel_values"] = {"messages": messages, **values}
+    checkpoint["channel_versions"] = {k: 1 for k in checkpoint["channel_values"]}
+    return checkpoint
+
+
+def turns(n: int, padding: int = 0) -> list:
+    messages = []
+    for i in range(n):
+        reply = f"reply {i}" + (" " + os.urandom(padding).hex() if padding else "")
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=reply)]
+    return messages
+
+
+def test_round_trip(store):
+    saver = CompactCheckpointSaver(store)
+    checkpoint = snapshot(turns(2), district="NADIA")
+    saved = saver.put(config(), checkpoint, {"source": "loop", "step": 1}, {})
+
+    found = saver.get_tuple(config())
+    assert found.config == saved
+    assert found.checkpoint["channel_values"]["district"] == "NADIA"
+    assert [m.content for m in found.checkpoint["channel_values"]["messages"]] == [
+        "question 0", "reply 0", "question 1", "reply 1",
+    ]
+    assert found.metadata["step"] == 1
+    assert saver.get_tuple(config("someone-else")) is None
+    assert (saver.loads, saver.misses, saver.saves) == (2, 1, 1)
+
+
+def test_only_the_latest_checkpoint_is_kept(store):
+    saver = CompactCheckpointSaver(store)
+    first = saver.put(config(), snapshot(turns(1)), {}, {})
+    second = saver.put(first, snapshot(turns(2)), {}, {})
+
+    found = saver.get_tuple(config())
+    assert found.config == second
+    assert found.parent_config == first
+    assert saver.get_tuple(first) is None
+    assert store.size()["threads"] == 1
+
+
+def test_messages_are_pruned_to_whole_turns(store):
+    saver = CompactCheckpointSaver(store, max_messages=5)
+    saver.put(config(), snapshot(turns(4)), {}, {})
+
+    messages = saver.get_tuple(config()).checkpoint["channel_values"]["messages"]
+    # Five newest messages start on a reply; the window moves up to the next question
+    assert [m.content for m in messages] == ["question 2", "reply 2", "question 3", "reply 3"]
+    assert saver.messages_pruned == 4
+
+
+def test_menu_rows_are_not_stored():
+    menu = AIMessage(content="LIST_REQUEST:VILLAGE", additional_kwargs={"rows": [{"id": "V1"}], "body": "Pick"})
+    [kept] = compact_messages([menu])
+    assert kept.additional_kwargs == {"body": "Pick"}
+    assert menu.additional_kwargs["rows"] == [{"id": "V1"}]
+
+
+def test_byte_cap_drops_oldest_turns(store):
+    saver = CompactCheckpointSaver(store, max_messages=100, max_bytes=2048)
+    # Incompressible replies so the cap is reached after a few turns
+    saver.put(config(), snapshot(turns(8, padding=300)), {}, {})
+
+    messages = saver.get_tuple(config()).checkpoint["channel_values"]["messages"]
+    assert 2 <= len(messages) < 16
+    assert messages[0].content.startswith("question")
+    assert messages[-1].content.startswith("reply 7 ")
+    assert saver.oversize_trims > 0
+    assert store.size()["bytes"] <= 2048
+
+
+def test_pending_writes_and_delete(store):
+    saver = CompactCheckpointSaver(store)
+    saved = saver.put(config(), snapshot(turns(1)), {}, {})
+    saver.put_writes(saved, [("messages", [AIMessage(content="draft")])], task_id="writer")
+
+    found = saver.get_tuple(config())
+    [(task_id, channel, value)] = found.pending_writes
+    assert (task_id, channel, value[0].content) == ("writer", "messages", "draft")
+
+    saver.delete_thread("919800000001")
+    assert saver.get_tuple(config()) is None
+
+
+def test_async_api(store):
+    saver = CompactCheckpointSaver(store)
+
+    async def scenario():
+        saved = await saver.aput(config(), snapshot(turns(1)), {}, {})
+        return saved, await saver.aget_tuple(config()), [t async for t in saver.alist(config())]
+
+    saved, found, listed = asyncio.run(scenario())
+    assert found.config == saved
+    assert [t.config for t in listed] == [saved]
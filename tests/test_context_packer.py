@@ -0,0 +1,57 @@
+# tests/test_context_packer.py
+
+import numpy as np
+import pytest
+from app.core import context_packer as cp
+from app.core.context_packer import build_context, drop_near_duplicates, mmr_select, split_passages
+
+
+class WordEncoding:
+    """One token per whitespace-separated word, so the tests need no tiktoken download."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+@pytest.fixture(autouse=True)
+def words(monkeypatch):
+    monkeypatch.setattr(cp, "_encoding", WordEncoding())
+
+
+def embed_many(texts):
+    return [np.ones(4, dtype=np.float32) for _ in texts]
+
+
+def test_passages_follow_the_token_target():
+    text = "\n".join(["one two three"] * 4 + ["x " * 10])
+    passages = split_passages(text, "act", target_tokens=6)
+    assert [p.tokens for p in passages] == [6, 6, 6, 4]
+    assert passages[0].text == "one two three\none two three"
+
+
+def test_exact_copies_go_before_the_prefilter(monkeypatch):
+    monkeypatch.setattr(cp, "MAX_CANDIDATES", 2)
+    copy = "tenant eviction notice period under the tenancy act"
+    documents = [(copy, {"source": f"copy{i}"}) for i in range(5)]
+    documents.append(("tenant deposit refund within one month", {"source": "deposit"}))
+    packed = build_context("tenant eviction deposit", np.ones(4), documents, embed_many)
+    assert [p.source for p in packed.passages] == ["copy0", "deposit"]
+    assert (packed.candidate_passages, packed.duplicates_dropped) == (6, 4)
+
+
+def test_near_duplicates_keep_the_first():
+    base = "the employer shall pay wages before the seventh day of every month"
+    passages = split_passages(base, "a") + split_passages(base + " worked", "b") \
+        + split_passages("overtime is paid at twice the ordinary rate of wages", "c")
+    assert [p.source for p in drop_near_duplicates(passages, threshold=0.8)] == ["a", "c"]
+
+
+def test_mmr_prefers_diverse_passages_within_the_budget():
+    vectors = [[1, 0], [1, 0.1], [0, 1]]
+    assert mmr_select([1, 0], vectors, [5, 5, 5], budget=10, lambda_mult=1.0) == [0, 1]
+    assert mmr_select([1, 0], vectors, [5, 5, 5], budget=10, lambda_mult=0.3) == [0, 2]
+    # A passage too big for what is left is skipped, not the end of the selection
+    assert mmr_select([1, 0], vectors, [20, 5, 5], budget=10, lambda_mult=1.0) == [1, 2]
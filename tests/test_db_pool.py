@@ -0,0 +1,115 @@
+# tests/test_db_pool.py
+
+import psycopg2.extensions
+import pytest
+from app.core import db
+from app.core.db import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.log.append((sql, params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Stands in for a traced psycopg2 connection and records what ran on it."""
+
+    class info:
+        transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.log = []
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append(("COMMIT", None))
+
+    def rollback(self):
+        self.log.append(("ROLLBACK", None))
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    connections = []
+
+    def connect(dsn, **kwargs):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(db, "traced_connect", connect)
+    return connections
+
+
+def test_statement_timeout_runs_in_one_transaction(opened):
+    pool = ConnectionPool(dsn="fake", max_size=1)
+    with pool.cursor(statement_timeout=1.5) as cur:
+        cur.execute("SELECT 1;")
+    conn = opened[0]
+    assert conn.log == [("SET LOCAL statement_timeout = %s;", (1500,)), ("SELECT 1;", None), ("COMMIT", None)]
+    assert conn.autocommit is True
+
+
+def test_statement_timeout_rolls_back_on_error(opened):
+    pool = ConnectionPool(dsn="fake", max_size=1)
+    with pytest.raises(RuntimeError):
+        with pool.cursor(statement_timeout=0.0001) as cur:
+            raise RuntimeError("canceling statement due to statement timeout")
+    conn = opened[0]
+    assert conn.log == [("SET LOCAL statement_timeout = %s;", (1,)), ("ROLLBACK", None)]
+    assert conn.autocommit is True
+    assert pool.stats()["idle"] == 1
+
+
+def test_plain_cursor_sets_no_timeout(opened):
+    pool = ConnectionPool(dsn="fake", max_size=1)
+    with pool.cursor() as cur:
+        cur.execute("SELECT 1;")
+    assert opened[0].log == [("SELECT 1;", None)]
+
+
+def test_connections_are_reused_and_capped(opened):
+    pool = ConnectionPool(dsn="fake", max_size=1, timeout=0.01)
+    conn = pool.getconn()
+    with pytest.raises(db.PoolTimeout):
+        pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(opened) == 1
+
+
+def test_close_refuses_checkouts_and_closes_returned_connections(opened):
+    pool = ConnectionPool(dsn="fake", max_size=2)
+    idle, busy = pool.getconn(), pool.getconn()
+    pool.putconn(idle)
+    pool.close()
+    assert idle.closed and not busy.closed
+    with pytest.raises(db.PoolClosed):
+        pool.getconn()
+
+    pool.putconn(busy)
+    assert busy.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_a_foreign_connection_is_closed_on_return(opened):
+    pool = ConnectionPool(dsn="fake")
+    stray = FakeConnection()
+    pool.putconn(stray)
+    assert stray.closed
+    assert pool.stats()["size"] == 0
@@ -0,0 +1,94 @@
+# tests/test_dedup.py
+
+import asyncio
+import pytest
+from app.utils.dedup import MemoryDedupBackend, SQLiteDedupBackend, MessageDeduplicator
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryDedupBackend(max_entries=100, ttl_seconds=100)
+    return SQLiteDedupBackend(path=str(tmp_path / "dedup.sqlite3"), max_entries=100, ttl_seconds=100)
+
+
+def test_second_delivery_is_a_duplicate(backend):
+    assert backend.mark_seen("wamid.1", 0) is False
+    assert backend.mark_seen("wamid.1", 1) is True
+    assert backend.mark_seen("wamid.2", 2) is False
+
+
+def test_retry_after_ttl_counts_as_new(backend):
+    assert backend.mark_seen("wamid.1", 0) is False
+    assert backend.mark_seen("wamid.1", 101) is False
+    assert backend.mark_seen("wamid.1", 102) is True
+
+
+def test_discard_lets_a_retry_through(backend):
+    backend.mark_seen("wamid.1", 0)
+    backend.discard("wamid.1")
+    assert backend.mark_seen("wamid.1", 1) is False
+
+
+def test_ttl_runs_from_first_sighting(backend):
+    backend.mark_seen("a", 0)
+    backend.mark_seen("b", 10)
+    assert backend.mark_seen("a", 50) is True
+    # A hit does not extend the window: "a" expires at 100 and "b" at 110
+    assert backend.mark_seen("a", 105) is False
+    assert backend.mark_seen("b", 105) is True
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryDedupBackend(max_entries=3, ttl_seconds=100)
+    for i in range(5):
+        backend.mark_seen(f"wamid.{i}", i)
+    assert backend.size() == 3
+    assert backend.mark_seen("wamid.0", 5) is False
+    assert backend.mark_seen("wamid.4", 5) is True
+
+
+def test_deduplicator_counts_and_fails_open():
+    class Broken(MemoryDedupBackend):
+        def mark_seen(self, msg_id, now):
+            raise RuntimeError("store down")
+
+    dedup = MessageDeduplicator(MemoryDedupBackend())
+    assert asyncio.run(dedup.is_duplicate("wamid.1")) is False
+    assert asyncio.run(dedup.is_duplicate("wamid.1")) is True
+    assert (dedup.hits, dedup.misses) == (1, 1)
+
+    broken = MessageDeduplicator(Broken())
+    assert asyncio.run(broken.is_duplicate("wamid.1")) is False
+    assert broken.errors == 1
+
+
+def test_postgres_backend_prunes_to_ttl_and_cap(monkeypatch):
+    from contextlib import contextmanager
+    from app.core import db
+    from app.utils.dedup import PostgresDedupBackend
+
+    executed = []
+
+    class Cursor:
+        def execute(self, sql, params=None):
+            executed.append((" ".join(sql.split()), params))
+
+        def fetchone(self):
+            return ("wamid",)
+
+    class Pool:
+        @contextmanager
+        def cursor(self, **kwargs):
+            yield Cursor()
+
+    monkeypatch.setattr(db, "db_pool", Pool())
+    backend = PostgresDedupBackend(max_entries=50, ttl_seconds=100)
+    backend.PRUNE_EVERY = 3
+    executed.clear()
+    for i in range(3):
+        assert backend.mark_seen(f"wamid.{i}", 1000) is False
+
+    deletes = [(sql, params) for sql, params in executed if sql.startswith("DELETE")]
+    assert deletes[0] == ("DELETE FROM processed_messages WHERE seen_at < TO_TIMESTAMP(%s);", (900,))
+    assert "OFFSET %s" in deletes[1][0] and deletes[1][1] == (50,)
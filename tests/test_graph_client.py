@@ -0,0 +1,74 @@
+# tests/test_graph_client.py
+
+import asyncio
+import httpx
+import pytest
+from app.api.graph_client import GraphClient
+
+
+def client(script: list) -> tuple:
+    """
+    A GraphClient whose requests get the scripted outcomes in order: a status
+    code, "connect" (never sent) or "read_timeout" (sent, no answer). Once the
+    script runs out every request gets a 200.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        outcome = script.pop(0) if script else 200
+        if outcome == "connect":
+            raise httpx.ConnectError("connection refused", request=request)
+        if outcome == "read_timeout":
+            raise httpx.ReadTimeout("no response", request=request)
+        return httpx.Response(outcome, json={"ok": outcome < 400})
+
+    graph = GraphClient(base_url="http://mock", token="test", max_retries=3, backoff_base=0)
+    graph._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return graph, calls
+
+
+def run(graph: GraphClient, method: str):
+    async def call():
+        try:
+            return await graph.request(method, "PHONE/messages")
+        finally:
+            await graph.close()
+
+    return asyncio.run(call())
+
+
+@pytest.mark.parametrize("outcome", [429, "connect"])
+def test_post_is_retried_when_meta_never_took_it(outcome):
+    graph, calls = client([outcome, outcome])
+    assert run(graph, "POST").status_code == 200
+    assert calls == ["POST"] * 3
+    assert graph.retries == 2
+
+
+def test_post_is_not_retried_after_a_5xx():
+    graph, calls = client([503])
+    assert run(graph, "POST").status_code == 503
+    assert calls == ["POST"]
+    assert graph.failures == 1
+
+
+def test_post_is_not_retried_after_a_read_timeout():
+    graph, calls = client(["read_timeout"])
+    with pytest.raises(httpx.ReadTimeout):
+        run(graph, "POST")
+    assert calls == ["POST"]
+
+
+@pytest.mark.parametrize("outcome", [503, "read_timeout"])
+def test_get_is_retried_after_a_5xx_or_timeout(outcome):
+    graph, calls = client([outcome])
+    assert run(graph, "GET").status_code == 200
+    assert calls == ["GET", "GET"]
+
+
+def test_retries_stop_at_max_retries():
+    graph, calls = client([429] * 5)
+    assert run(graph, "POST").status_code == 429
+    assert len(calls) == 4
+    assert (graph.retries, graph.failures) == (3, 1)
@@ -0,0 +1,64 @@
+# tests/test_onboarding.py
+
+import asyncio
+import pytest
+from app.core.gazetteer import Gazetteer
+from app.graph import onboarding
+from app.graph.onboarding import resolve_typed_location, parse_row_id, row_id_for_path
+
+ROWS = [
+    ("NADIA", "RANAGHAT-I", "AISHTALA", "AISHTALA"),
+    ("NADIA", "RANAGHAT-I", "AISHTALA", "RINAPUR"),
+    ("NADIA", "KRISHNANAGAR-I", "SAHATPUR", "SAHAT"),
+    ("SOUTH 24 PARGANAS", "BARUIPUR", "DHOSA", "DHOSA"),
+]
+
+
+@pytest.fixture(autouse=True)
+def gazetteer(monkeypatch):
+    index = Gazetteer(ROWS)
+
+    async def get_gazetteer():
+        return index
+
+    monkeypatch.setattr(onboarding, "get_gazetteer", get_gazetteer)
+    return index
+
+
+def resolve(text: str, **profile):
+    return asyncio.run(resolve_typed_location(text, profile))
+
+
+def test_exact_names_resolve_at_the_next_level():
+    assert resolve("Nadia").path == ("NADIA",)
+    assert resolve("I live in baruipur", district="SOUTH 24 PARGANAS").path == ("SOUTH 24 PARGANAS", "BARUIPUR")
+    assert resolve("rinapur", district="NADIA", block="RANAGHAT-I").path == ("NADIA", "RANAGHAT-I", "RINAPUR")
+
+
+def test_fuzzy_matches_are_not_saved(gazetteer):
+    assert gazetteer.lookup("rina", level="block", district="NADIA").method != "exact"
+    assert resolve("rina", district="NADIA") is None
+    assert resolve("sita", district="NADIA") is None
+    assert resolve("rinapurr", district="NADIA", block="RANAGHAT-I") is None
+
+
+def test_other_levels_and_parents_are_not_saved():
+    # A district typed at the block step must not wipe the saved district's children
+    assert resolve("South 24 Parganas", district="NADIA") is None
+    # A village typed before its block is chosen skips nothing
+    assert resolve("rinapur", district="NADIA") is None
+    # A block from another district
+    assert resolve("baruipur", district="NADIA") is None
+
+
+def test_greetings_and_sentences_are_ignored():
+    assert resolve("hi") is None
+    assert resolve("I need a job near my village please") is None
+    assert resolve("nadia", district="NADIA", block="RANAGHAT-I", village="AISHTALA") is None
+
+
+def test_row_ids_round_trip():
+    assert parse_row_id("VILLAGE|NADIA|RANAGHAT-I|RINAPUR") == ("VILLAGE", ("NADIA", "RANAGHAT-I", "RINAPUR"))
+    assert parse_row_id("BLOCK|NADIA") is None
+    assert parse_row_id("TOWN|NADIA") is None
+    assert row_id_for_path(("NADIA", "RANAGHAT-I")) == "BLOCK|NADIA|RANAGHAT-I"
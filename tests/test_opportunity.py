@@ -0,0 +1,50 @@
+# tests/test_opportunity.py
+
+import asyncio
+from types import SimpleNamespace
+import pytest
+from langchain_core.messages import HumanMessage
+from app.graph.nodes import opportunity
+
+
+class Lookup:
+    def __init__(self, name: str, result: str = None, delay: float = 0, error: Exception = None):
+        self.name, self.result, self.delay, self.error = name, result, delay, error
+
+    async def ainvoke(self, args):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def node(monkeypatch):
+    class Model:
+        async def ainvoke(self, prompt):
+            return SimpleNamespace(content="ALL")
+
+    monkeypatch.setattr(opportunity, "get_chat_model", lambda *args, **kwargs: Model())
+    monkeypatch.setattr(opportunity, "TOOL_TIMEOUT_SECONDS", 0.05)
+
+    def run(jobs, training, shgs):
+        monkeypatch.setattr(opportunity, "match_local_jobs", jobs)
+        monkeypatch.setattr(opportunity, "get_training_programs", training)
+        monkeypatch.setattr(opportunity, "find_nearby_shgs", shgs)
+        state = {"messages": [HumanMessage(content="what is available?")],
+                 "district": "NADIA", "block": "RANAGHAT-I", "village": "RINAPUR"}
+        return asyncio.run(opportunity.opportunity_node(state))["messages"][0].content
+
+    return run
+
+
+def test_a_slow_or_failing_lookup_does_not_hold_up_the_others(node):
+    report = node(
+        Lookup("match_local_jobs", "2 jobs"),
+        Lookup("get_training_programs", "late", delay=1),
+        Lookup("find_nearby_shgs", error=RuntimeError("db down")),
+    )
+    assert "JOBS_FOUND: 2 jobs" in report
+    assert "TRAINING_FOUND: UNAVAILABLE (timed out after 0.05s)" in report
+    assert "SHG_FOUND: UNAVAILABLE (lookup failed)" in report
+    assert "PARTIAL_RESULTS: TRAINING_FOUND, SHG_FOUND" in report
@@ -0,0 +1,170 @@
+# tests/test_outbound.py
+"""OutboundDispatcher against scripts/mock_graph_server.py, served in-process over ASGI."""
+
+import time
+import random
+import asyncio
+import httpx
+import pytest
+from scripts import mock_graph_server as mock
+from app.api.graph_client import GraphClient
+from app.api.outbound import OutboundDispatcher
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """
+    Forwards to the mock, failing the next requests as scripted:
+    "connect" never reaches the server, "read_timeout" and "500" fail after it accepted the message.
+    """
+
+    def __init__(self, failures=()):
+        self.inner = httpx.ASGITransport(app=mock.app)
+        self.failures = list(failures)
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == "connect":
+            raise httpx.ConnectError("connection refused", request=request)
+        response = await self.inner.handle_async_request(request)
+        if failure == "read_timeout":
+            raise httpx.ReadTimeout("no response", request=request)
+        if failure == "500":
+            return httpx.Response(500, json={"error": {"message": "internal error"}}, request=request)
+        return response
+
+
+@pytest.fixture(autouse=True)
+def mock_server(monkeypatch):
+    monkeypatch.setattr(mock, "LATENCY_MS", 0)
+    monkeypatch.setattr(mock, "FAIL_RATE", 0)
+    monkeypatch.setattr(mock, "PHONE_RATE", 0)
+    monkeypatch.setattr(mock, "PAIR_RATE", 0)
+    # Retry backoff in the dispatcher is uniform(0.5, 1.0) * 2**attempt; keep tests fast
+    monkeypatch.setattr(random, "uniform", lambda a, b: 0.01)
+    mock.app.state.sent = []
+    mock.app.state.throttled = 0
+    mock._windows.clear()
+
+
+def dispatcher(transport, **kwargs) -> OutboundDispatcher:
+    client = GraphClient(base_url="http://mock", token="test")
+    client._client = httpx.AsyncClient(transport=transport)
+    options = dict(phone_rate=100, phone_burst=100, recipient_rate=100, recipient_burst=100, workers=2)
+    options.update(kwargs)
+    return OutboundDispatcher(client=client, **options)
+
+
+def text(to: str, body: str = "hello") -> dict:
+    return {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": body}}
+
+
+async def send_all(d: OutboundDispatcher, messages, timeout: float = 10.0) -> list:
+    await d.start()
+    try:
+        return await asyncio.wait_for(asyncio.gather(*[
+            d.send(to, text(to, body), phone_number_id="PHONE") for to, body in messages
+        ]), timeout)
+    finally:
+        await d.stop()
+        await d.client.close()
+
+
+def test_delivers_and_returns_the_graph_response():
+    d = dispatcher(FlakyTransport())
+    [result] = asyncio.run(send_all(d, [("919800000001", "hi")]))
+    assert result["messages"][0]["id"].startswith("wamid.mock.")
+    assert [m["text"]["body"] for m in mock.app.state.sent] == ["hi"]
+    assert d.stats()["sent"] == 1
+
+
+def test_unsent_request_is_retried():
+    transport = FlakyTransport(["connect"])
+    d = dispatcher(transport)
+    [result] = asyncio.run(send_all(d, [("919800000001", "hi")]))
+    assert result is not None
+    assert transport.requests == 2
+    assert len(mock.app.state.sent) == 1
+    assert d.retried == 1
+
+
+@pytest.mark.parametrize("failure", ["read_timeout", "500"])
+def test_failure_after_delivery_is_not_resent(failure):
+    transport = FlakyTransport([failure])
+    d = dispatcher(transport)
+    [result] = asyncio.run(send_all(d, [("919800000001", "hi")]))
+    assert result is None
+    assert transport.requests == 1
+    assert len(mock.app.state.sent) == 1
+    assert (d.retried, d.failed) == (0, 1)
+
+
+def test_rate_limited_send_is_retried_until_delivered(monkeypatch):
+    # The mock allows one send per second per phone number; the dispatcher thinks it may send 100
+    monkeypatch.setattr(mock, "PHONE_RATE", 1)
+    d = dispatcher(FlakyTransport(), max_attempts=6)
+    results = asyncio.run(send_all(d, [("919800000001", "one"), ("919800000002", "two")]))
+    assert all(r is not None for r in results)
+    assert sorted(m["text"]["body"] for m in mock.app.state.sent) == ["one", "two"]
+    assert mock.app.state.throttled >= 1
+    assert d.rate_limited >= 1
+
+
+def test_busy_recipient_does_not_hold_up_others():
+    d = dispatcher(FlakyTransport(), recipient_rate=1, recipient_burst=1, workers=1)
+
+    async def scenario():
+        await d.start()
+        busy = [asyncio.create_task(d.send("A", text("A", f"a{i}"), phone_number_id="PHONE")) for i in range(3)]
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await d.send("B", text("B", "b"), phone_number_id="PHONE")
+        other_latency = time.perf_counter() - started
+        await asyncio.gather(*busy)
+        await d.stop()
+        await d.client.close()
+        return other_latency
+
+    assert asyncio.run(scenario()) < 0.5
+    assert len(mock.app.state.sent) == 4
+
+
+def test_stop_resolves_deferred_sends():
+    d = dispatcher(FlakyTransport(), recipient_rate=0.1, recipient_burst=1)
+
+    async def scenario():
+        await d.start()
+        first = await d.send("A", text("A", "now"), phone_number_id="PHONE")
+        later = asyncio.create_task(d.send("A", text("A", "later"), phone_number_id="PHONE"))
+        await asyncio.sleep(0.05)
+        assert d.stats()["deferred"] == 1
+        await d.stop(timeout=0.1)
+        await d.client.close()
+        return first, await later
+
+    first, later = asyncio.run(scenario())
+    assert first is not None and later is None
+    assert [m["text"]["body"] for m in mock.app.state.sent] == ["now"]
+
+
+def test_deferred_sends_count_towards_the_buffer():
+    d = dispatcher(FlakyTransport(), recipient_rate=0.1, recipient_burst=1, max_buffer=2, enqueue_timeout=0.05)
+
+    async def scenario():
+        await d.start()
+        await d.send("A", text("A", "now"), phone_number_id="PHONE")
+        waiting = [asyncio.create_task(d.send("A", text("A", f"later{i}"), phone_number_id="PHONE")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        stats = d.stats()
+        rejected = await d.send("B", text("B", "over"), phone_number_id="PHONE")
+        await d.stop(timeout=0.1)
+        await d.client.close()
+        await asyncio.gather(*waiting)
+        return stats, rejected
+
+    stats, rejected = asyncio.run(scenario())
+    assert (stats["buffered"], stats["deferred"], stats["pending"]) == (0, 2, 2)
+    assert rejected is None
+    assert d.rejected == 1
+    assert d.stats()["pending"] == 0
@@ -0,0 +1,91 @@
+# tests/test_scheduler.py
+
+import asyncio
+import pytest
+from app.utils.scheduler import SenderScheduler, QueueFullError
+
+
+def test_each_sender_runs_in_arrival_order():
+    seen = []
+
+    async def handler(payload):
+        sender, i = payload
+        await asyncio.sleep(0.001 * (3 - i))
+        seen.append(payload)
+
+    async def scenario():
+        scheduler = SenderScheduler(handler, max_concurrency=4, max_queue_depth=100)
+        for i in range(3):
+            for sender in ("A", "B", "C"):
+                scheduler.submit(sender, (sender, i))
+        await scheduler.drain()
+
+    asyncio.run(scenario())
+    for sender in ("A", "B", "C"):
+        assert [i for s, i in seen if s == sender] == [0, 1, 2]
+
+
+def test_concurrency_is_capped():
+    running = peak = 0
+
+    async def handler(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def scenario():
+        scheduler = SenderScheduler(handler, max_concurrency=2, max_queue_depth=100)
+        for i in range(10):
+            scheduler.submit(f"sender-{i}", i)
+        await scheduler.drain()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert peak == 2
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_jobs_waiting_for_a_slot_count_towards_the_depth_limit():
+    release = None
+
+    async def handler(payload):
+        await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        scheduler = SenderScheduler(handler, max_concurrency=2, max_queue_depth=5)
+        for i in range(7):
+            scheduler.submit(f"sender-{i}", i)
+            await asyncio.sleep(0)
+        # Two running, five waiting for a slot: the next sender is turned away
+        assert scheduler.stats()["queued"] == 5
+        with pytest.raises(QueueFullError):
+            scheduler.submit("sender-late", "late")
+        release.set()
+        await scheduler.drain()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.rejected == 1
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_cancelled_lanes_do_not_leak_depth():
+    async def handler(payload):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        scheduler = SenderScheduler(handler, max_concurrency=1, max_queue_depth=10)
+        for i in range(4):
+            scheduler.submit(f"sender-{i}", i)
+        await asyncio.sleep(0.01)
+        await scheduler.drain(timeout=0.01)
+        await asyncio.sleep(0.01)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.stats()["queued"] == 0
+    assert scheduler.stats()["active_lanes"] == 0
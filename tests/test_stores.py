@@ -0,0 +1,72 @@
+# tests/test_stores.py
+
+import time
+import pytest
+from app.core.stores import FallbackStore, SQLiteStore, select_store, backend_name
+
+
+class Local:
+    def get(self):
+        return "local"
+
+
+class Shared:
+    def get(self):
+        return "shared"
+
+
+def flaky(failures: int):
+    calls = {"n": 0}
+
+    def connect():
+        calls["n"] += 1
+        if calls["n"] <= failures:
+            raise ConnectionError("database unreachable")
+        return Shared()
+    return connect, calls
+
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_nothing_opens_until_first_use():
+    connect, calls = flaky(0)
+    store = FallbackStore("Test", connect, Local)
+    assert calls["n"] == 0
+    assert backend_name(store) == "not opened"
+    assert store.get() == "shared"
+    assert backend_name(store) == "Shared"
+
+
+def test_sqlite_kind_never_touches_postgres():
+    connect, calls = flaky(0)
+    store = select_store("Test", "sqlite", connect, Local)
+    assert store.get() == "local"
+    assert calls["n"] == 0
+
+
+def test_outage_falls_back_and_recovers():
+    connect, calls = flaky(2)
+    store = FallbackStore("Test", connect, Local, reprobe_seconds=0.05)
+    assert store.get() == "local"
+    assert store.fallbacks == 1
+
+    # The first re-probe fails, the second one switches back to Postgres
+    assert wait_for(lambda: store.get() == "shared")
+    assert calls["n"] == 3
+    assert backend_name(store) == "Shared"
+
+
+def test_sqlite_store_creates_schema(tmp_path):
+    class Notes(SQLiteStore):
+        SCHEMA = "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, body TEXT);"
+
+    path = tmp_path / "nested" / "notes.sqlite3"
+    notes = Notes(str(path))
+    notes._conn.execute("INSERT INTO notes (body) VALUES ('hi');")
+    assert Notes(str(path))._conn.execute("SELECT body FROM notes;").fetchone() == ("hi",)
+    assert notes._conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
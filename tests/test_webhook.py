@@ -0,0 +1,33 @@
+# tests/test_webhook.py
+
+from app.api.whatsapp import iter_webhook_messages
+
+
+def text(msg_id: str, body: str = "hi") -> dict:
+    return {"from": "919800000001", "id": msg_id, "type": "text", "text": {"body": body}}
+
+
+def change(*messages) -> dict:
+    return {"value": {"messages": list(messages)}}
+
+
+def ids(data: dict) -> list:
+    return [event["id"] for event in iter_webhook_messages(data)]
+
+
+def test_every_message_in_a_batch_is_yielded():
+    data = {"entry": [
+        {"changes": [change(text("wamid.1"), text("wamid.2"))]},
+        {"changes": [change(text("wamid.3"))]},
+    ]}
+    assert ids(data) == ["wamid.1", "wamid.2", "wamid.3"]
+
+
+def test_malformed_elements_only_drop_themselves():
+    data = {"entry": [
+        "not an entry",
+        {"changes": ["not a change", {"value": None}, {"value": "text"}, change(text("wamid.1"))]},
+        {"changes": [change({"id": "wamid.bad", "type": "text"}, text("wamid.2"))]},
+        {"changes": {"value": {"messages": [text("wamid.3")]}}},
+    ]}
+    assert ids(data) == ["wamid.1", "wamid.2", "wamid.3"]
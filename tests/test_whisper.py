@@ -0,0 +1,74 @@
+# tests/test_whisper.py
+
+import asyncio
+import pytest
+from app.api import whatsapp
+from app.core import whisper
+from app.core.whisper import TranscriptionError, atranscribe_voice_note
+
+CHUNKS = [b"one", b"two", b"three"]
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    """Splits every note into CHUNKS and transcribes a chunk as its upper-cased bytes."""
+    failing = set()
+
+    async def prepare(data):
+        return list(CHUNKS)
+
+    async def transcribe(audio, filename, mime_type):
+        if audio in failing:
+            raise RuntimeError("upload reset")
+        return audio.decode().upper()
+
+    monkeypatch.setattr(whisper, "prepare_for_transcription", prepare)
+    monkeypatch.setattr(whisper, "_atranscribe", transcribe)
+    return failing
+
+
+def test_chunks_are_joined_in_order(chunked):
+    assert asyncio.run(atranscribe_voice_note(b"note")) == "ONE TWO THREE"
+
+
+def test_a_failed_chunk_raises_with_the_partial_text(chunked):
+    chunked.add(b"two")
+    with pytest.raises(TranscriptionError) as raised:
+        asyncio.run(atranscribe_voice_note(b"note"))
+    assert raised.value.partial == "ONE THREE"
+
+
+def test_a_partial_transcript_is_answered_but_not_cached(chunked, monkeypatch):
+    chunked.add(b"three")
+    stored = []
+
+    class Cache:
+        async def lookup_media(self, media_id):
+            return None
+
+        async def lookup_audio(self, audio_sha256, media_id):
+            return None
+
+        async def store_transcript(self, *args):
+            stored.append(args)
+
+    class Buffer:
+        def read(self):
+            return b"note"
+
+        def close(self):
+            pass
+
+    async def download(media_id):
+        return Buffer(), "audio/ogg", "sha"
+
+    monkeypatch.setattr(whatsapp, "transcript_cache", Cache())
+    monkeypatch.setattr(whatsapp, "download_whatsapp_media", download)
+    event = asyncio.run(whatsapp.transcribe_voice_note({"media_id": "m1"}))
+    assert event["content"] == "ONE TWO"
+    assert stored == []
+
+    chunked.clear()
+    event = asyncio.run(whatsapp.transcribe_voice_note({"media_id": "m1"}))
+    assert event["content"] == "ONE TWO THREE"
+    assert len(stored) == 1